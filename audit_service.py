@@ -7,7 +7,7 @@
 
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
-from db_config import execute_query, insert_operation_log
+from db_config import execute_query_async, insert_operation_log
 from models import OperationLog
 from logger_config import app_logger
 
@@ -48,7 +48,7 @@ class AuditService:
             logger.error(f"记录操作审计失败: {e}")
             return False
     
-    def query_operation_logs(
+    async def query_operation_logs(
         self,
         operator_id: Optional[str] = None,
         point_key: Optional[str] = None,
@@ -97,7 +97,7 @@ class AuditService:
                 FROM operation_log 
                 WHERE {where_clause}
             """
-            count_result = execute_query(count_sql, tuple(params))
+            count_result = await execute_query_async(count_sql, tuple(params))
             total_count = count_result[0][0] if count_result else 0
             
             # 查询日志列表
@@ -111,7 +111,7 @@ class AuditService:
                 LIMIT %s OFFSET %s
             """
             list_params = list(params) + [limit, offset]
-            rows = execute_query(list_sql, tuple(list_params)) or []
+            rows = await execute_query_async(list_sql, tuple(list_params)) or []
             
             # 转换为模型对象
             logs = []
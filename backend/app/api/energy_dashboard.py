@@ -3,6 +3,7 @@
 提供实时能耗监测、历史趋势分析、KPI指标、设备状态、同比环比对比、分类分项能耗等数据服务
 """
 
+import asyncio
 import logging
 import os
 import random
@@ -34,6 +35,7 @@ async def get_energy_overview(
     """
     获取能源总览数据
     包含总能耗、当前功率、能效比、节能收益等KPI指标
+    缓存过期后先返回旧数据并在后台刷新，cache_info 给出数据年龄（秒）及是否为过期数据
     """
     try:
         result = await energy_service.get_energy_overview(x_station_ip)
@@ -43,6 +45,7 @@ async def get_energy_overview(
                 "code": 200,
                 "message": result.get("message", "success"),
                 "data": result.get("data"),
+                "cache_info": result.get("cache_info"),
             }
         else:
             status_code = result.get("status_code", 500)
@@ -119,6 +122,7 @@ async def get_realtime_data(
             "update_time": datetime.now().isoformat(),
             "time_range_hours": hours,
             "data_source": data_source,
+            "cache_info": result.get("cache_info"),
         }
 
     except Exception as e:
@@ -199,12 +203,14 @@ async def get_trend_data(
         return {
             "values": data.get("values", []),
             "timestamps": data.get("timestamps", []),
+            "coverage": data.get("coverage", []),
             "period": period or "custom",
             "start_time": start_dt.strftime("%Y-%m-%d %H:%M:%S"),
             "end_time": end_dt.strftime("%Y-%m-%d %H:%M:%S"),
             "granularity": data.get("granularity"),
             "station_count": data.get("station_count", 0),
             "valid_points": data.get("valid_points", 0),
+            "data_source": data.get("data_source"),
             "update_time": datetime.now().isoformat(),
         }
 
@@ -243,12 +249,16 @@ async def get_equipment_status(
         equipment_list = []
         status_summary = {"normal": 0, "warning": 0, "error": 0}
 
-        for station in stations:
+        # 各站点设备功率并发查询（每个站点一次请求）
+        station_device_powers = await asyncio.gather(
+            *[realtime_service.get_station_device_powers(station) for station in stations],
+            return_exceptions=True,
+        )
+
+        for station, device_powers in zip(stations, station_device_powers):
             try:
-                # 获取站点设备功率数据
-                device_powers = await realtime_service.get_station_device_powers(
-                    station
-                )
+                if isinstance(device_powers, Exception):
+                    raise device_powers
 
                 # 如果没有获取到真实数据，使用配置中的设备列表
                 if not device_powers:
@@ -569,6 +579,7 @@ async def get_kpi_data(
         return {
             "total_kwh_today": data.get("total_consumption", 0),
             "update_time": data.get("update_time", datetime.now().isoformat()),
+            "cache_info": result.get("cache_info"),
         }
 
     except HTTPException:
@@ -738,3 +749,28 @@ async def get_classification_data(
     except Exception as e:
         logger.error(f"获取分类能耗数据失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取分类能耗数据失败: {str(e)}")
+
+
+@router.post("/rollup/backfill")
+async def backfill_energy_rollup(
+    start_time: str = Query(..., description="开始时间 YYYY-MM-DD HH:mm:ss"),
+    end_time: str = Query(..., description="结束时间 YYYY-MM-DD HH:mm:ss"),
+    line: Optional[str] = Query(None, description="地铁线路，为空时回填全部线路"),
+    energy_service: EnergyService = Depends(get_energy_service),
+):
+    """
+    回填能耗小时/日汇总
+    后台任务执行，已汇总的小时自动跳过；进度通过 /api/tasks/{task_id} 查询
+    """
+    if not energy_service.rollup_service.enabled:
+        raise HTTPException(status_code=400, detail="未配置能耗汇总存储（cache.energy_rollup_path）")
+
+    try:
+        start_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
+        end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="时间格式错误，应为 YYYY-MM-DD HH:mm:ss")
+    if start_dt >= end_dt:
+        raise HTTPException(status_code=400, detail="开始时间必须早于结束时间")
+
+    return energy_service.rollup_service.start_backfill(start_dt, end_dt, line)
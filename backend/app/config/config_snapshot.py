@@ -0,0 +1,134 @@
+"""
+电力配置快照
+
+config_electricity.py 是一个上万行的字典字面量，每次冷启动（以及 .pyc 失效或不可写时）
+都要重新编译，耗时明显。这里把 line_configs 预先编译为紧凑的 JSON 快照，并记录源文件的
+SHA-256：加载时校验一致则直接读取快照，否则回退为导入 .py 源文件，并顺带重建快照。
+
+构建快照（重启脚本会在启动后端前自动执行）：
+    python -m backend.app.config.config_snapshot
+"""
+
+import hashlib
+import json
+import logging
+import os
+import runpy
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+SOURCE_PATH = os.path.join(PROJECT_ROOT, "config_electricity.py")
+DEFAULT_SNAPSHOT_PATH = os.path.join(PROJECT_ROOT, "data", "config_electricity.snapshot.json")
+SNAPSHOT_VERSION = 1
+
+
+def get_snapshot_path() -> str:
+    return os.environ.get("CONFIG_SNAPSHOT_PATH") or DEFAULT_SNAPSHOT_PATH
+
+
+def source_checksum(source_path: str = SOURCE_PATH) -> Optional[str]:
+    """源文件的 SHA-256，源文件不存在时返回 None"""
+    try:
+        with open(source_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def write_snapshot(
+    line_configs: Dict[str, Any], checksum: str, snapshot_path: Optional[str] = None
+) -> str:
+    """原子写入快照（先写临时文件再替换），返回快照路径"""
+    snapshot_path = snapshot_path or get_snapshot_path()
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": SNAPSHOT_VERSION, "source_sha256": checksum, "line_configs": line_configs},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def build_snapshot(
+    source_path: str = SOURCE_PATH, snapshot_path: Optional[str] = None
+) -> str:
+    """由源文件构建快照，返回快照路径"""
+    checksum = source_checksum(source_path)
+    if checksum is None:
+        raise FileNotFoundError(source_path)
+    line_configs = runpy.run_path(source_path)["line_configs"]
+    return write_snapshot(line_configs, checksum, snapshot_path)
+
+
+def read_snapshot(
+    checksum: Optional[str], snapshot_path: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    读取快照中的 line_configs
+
+    checksum 与快照记录的源文件校验和不一致（源文件已修改）或快照无法读取时返回 None；
+    checksum 为 None（源文件不存在）时直接信任快照。
+    """
+    snapshot_path = snapshot_path or get_snapshot_path()
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("电力配置快照读取失败，回退为源文件: %s", exc)
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    if checksum is not None and snapshot.get("source_sha256") != checksum:
+        logger.info("电力配置源文件已修改，快照失效")
+        return None
+    return snapshot.get("line_configs")
+
+
+def _load_from_source(checksum: Optional[str]) -> Dict[str, Any]:
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    import config_electricity
+
+    line_configs = config_electricity.line_configs
+    if checksum is not None:
+        try:
+            write_snapshot(line_configs, checksum)
+        except OSError as exc:
+            logger.warning("电力配置快照写入失败: %s", exc)
+    return line_configs
+
+
+_line_configs: Optional[Dict[str, Any]] = None
+_load_lock = threading.Lock()
+
+
+def load_line_configs() -> Dict[str, Any]:
+    """加载 line_configs：快照有效时读取快照，否则导入 config_electricity.py；进程内只加载一次"""
+    global _line_configs
+    if _line_configs is None:
+        with _load_lock:
+            if _line_configs is None:
+                checksum = source_checksum()
+                line_configs = read_snapshot(checksum)
+                if line_configs is None:
+                    line_configs = _load_from_source(checksum)
+                    logger.info("电力配置已从源文件加载")
+                _line_configs = line_configs
+    return _line_configs
+
+
+if __name__ == "__main__":
+    path = build_snapshot()
+    print(f"电力配置快照已生成: {path} (sha256={source_checksum()})")
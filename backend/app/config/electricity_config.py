@@ -8,6 +8,14 @@ import os
 from typing import List, Dict, Optional, Any
 import logging
 
+from backend.app.config.config_snapshot import load_line_configs
+from backend.app.config.station_registry import (
+    StationRegistry,
+    classify_device_type,
+    extract_line_code,
+    get_station_registry,
+)
+
 logger = logging.getLogger(__name__)
 
 class ElectricityConfig:
@@ -15,25 +23,27 @@ class ElectricityConfig:
     
     def __init__(self):
         self.config_data = None
+        self.registry: Optional[StationRegistry] = None
         self._load_config()
     
     def _load_config(self):
-        """加载电力配置文件"""
+        """加载电力配置文件，并构建站点注册表"""
         try:
             # 添加项目根目录到Python路径
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
             if project_root not in sys.path:
                 sys.path.insert(0, project_root)
             
-            # 导入配置文件
-            import config_electricity
-            self.config_data = config_electricity.line_configs
+            # 加载配置（优先读取预编译快照；注册表在进程内只构建一次）
+            self.config_data = load_line_configs()
+            self.registry = get_station_registry()
             logger.info(f"成功加载电力配置，包含 {len(self.config_data)} 条线路")
             
         except Exception as e:
             logger.error(f"加载电力配置失败: {e}")
             # 使用默认配置
             self.config_data = self._get_default_config()
+            self.registry = StationRegistry(self.config_data)
     
     def _get_default_config(self) -> Dict[str, Any]:
         """获取默认配置"""
@@ -60,91 +70,23 @@ class ElectricityConfig:
     
     def get_all_stations(self) -> List[Dict[str, Any]]:
         """获取所有站点配置"""
-        stations = []
-        
-        for line_name, line_config in self.config_data.items():
-            line_code = self._extract_line_code(line_name)
-            
-            for station_name, station_config in line_config.items():
-                station_info = {
-                    "name": station_name,
-                    "ip": station_config.get("ip", ""),
-                    "line": line_code,
-                    "line_name": line_name,
-                    "station_code": station_config.get("站点名称", station_name),
-                    "energy_object_code": station_config.get("节能对象代码", ""),
-                    "non_energy_object_code": station_config.get("非节能对象代码", ""),
-                    "energy_data_code": station_config.get("节能数据代码", ""),
-                    "non_energy_data_code": station_config.get("非节能数据代码", ""),
-                    "device_count": len(station_config.get("data_list", []))
-                }
-                stations.append(station_info)
-        
-        return stations
+        return [station.to_dict() for station in self.registry.stations]
     
     def get_station_by_ip(self, ip: str) -> Optional[Dict[str, Any]]:
         """根据IP获取站点配置"""
-        for line_name, line_config in self.config_data.items():
-            for station_name, station_config in line_config.items():
-                if station_config.get("ip") == ip:
-                    return {
-                        "name": station_name,
-                        "ip": ip,
-                        "line": self._extract_line_code(line_name),
-                        "line_name": line_name,
-                        "station_code": station_config.get("站点名称", station_name),
-                        "energy_object_code": station_config.get("节能对象代码", ""),
-                        "non_energy_object_code": station_config.get("非节能对象代码", ""),
-                        "energy_data_code": station_config.get("节能数据代码", ""),
-                        "non_energy_data_code": station_config.get("非节能数据代码", ""),
-                        "device_count": len(station_config.get("data_list", []))
-                    }
-        return None
+        station = self.registry.by_ip(ip)
+        return station.to_dict() if station else None
     
     def get_stations_by_line(self, line_code: str) -> List[Dict[str, Any]]:
         """根据线路代码获取站点列表"""
-        stations = []
-        
-        for line_name, line_config in self.config_data.items():
-            if self._extract_line_code(line_name) == line_code:
-                for station_name, station_config in line_config.items():
-                    station_info = {
-                        "name": station_name,
-                        "ip": station_config.get("ip", ""),
-                        "line": line_code,
-                        "line_name": line_name,
-                        "station_code": station_config.get("站点名称", station_name),
-                        "energy_object_code": station_config.get("节能对象代码", ""),
-                        "non_energy_object_code": station_config.get("非节能对象代码", ""),
-                        "energy_data_code": station_config.get("节能数据代码", ""),
-                        "non_energy_data_code": station_config.get("非节能数据代码", ""),
-                        "device_count": len(station_config.get("data_list", []))
-                    }
-                    stations.append(station_info)
-        
-        return stations
+        return [station.to_dict() for station in self.registry.by_line(line_code)]
     
     def get_station_devices(self, station_ip: str) -> List[Dict[str, Any]]:
         """获取指定站点的设备列表"""
-        for line_name, line_config in self.config_data.items():
-            for station_name, station_config in line_config.items():
-                if station_config.get("ip") == station_ip:
-                    devices = station_config.get("data_list", [])
-                    # 标准化设备信息
-                    standardized_devices = []
-                    for device in devices:
-                        standardized_device = {
-                            "name": device.get("name", "未知设备"),
-                            "location": device.get("location", "未知位置"),
-                            "power": device.get("power", 0),
-                            "ct_ratio": device.get("ct_ratio", 1),
-                            "type": self._classify_device_type(device.get("name", "")),
-                            "station_name": station_name,
-                            "station_ip": station_ip
-                        }
-                        standardized_devices.append(standardized_device)
-                    return standardized_devices
-        return []
+        station = self.registry.by_ip(station_ip)
+        if station is None:
+            return []
+        return [device.to_dict(station) for device in station.devices]
     
     def get_line_summary(self) -> List[Dict[str, Any]]:
         """获取线路汇总信息"""
@@ -168,42 +110,11 @@ class ElectricityConfig:
     
     def _extract_line_code(self, line_name: str) -> str:
         """从线路名称中提取线路代码"""
-        if "3号线" in line_name:
-            return "M3"
-        elif "8号线" in line_name:
-            return "M8"
-        elif "11号线" in line_name:
-            return "M11"
-        elif "1号线" in line_name:
-            return "M1"
-        elif "2号线" in line_name:
-            return "M2"
-        else:
-            # 尝试从名称中提取数字
-            import re
-            match = re.search(r'(\d+)号线', line_name)
-            if match:
-                return f"M{match.group(1)}"
-            return "M0"  # 默认值
+        return extract_line_code(line_name)
     
     def _classify_device_type(self, device_name: str) -> str:
         """根据设备名称分类设备类型"""
-        device_name_lower = device_name.lower()
-        
-        if any(keyword in device_name_lower for keyword in ['冷机', '制冷', 'chiller']):
-            return "冷机"
-        elif any(keyword in device_name_lower for keyword in ['水泵', 'pump']):
-            return "水泵"
-        elif any(keyword in device_name_lower for keyword in ['冷却塔', 'cooling_tower']):
-            return "冷却塔"
-        elif any(keyword in device_name_lower for keyword in ['风机', 'fan']):
-            return "风机"
-        elif any(keyword in device_name_lower for keyword in ['照明', 'light']):
-            return "照明"
-        elif any(keyword in device_name_lower for keyword in ['电梯', 'elevator']):
-            return "电梯"
-        else:
-            return "其他"
+        return classify_device_type(device_name)
     
     def get_device_by_name(self, station_ip: str, device_name: str) -> Optional[Dict[str, Any]]:
         """根据站点IP和设备名称获取设备信息"""
@@ -215,7 +126,7 @@ class ElectricityConfig:
     
     def validate_station_ip(self, ip: str) -> bool:
         """验证站点IP是否存在于配置中"""
-        return self.get_station_by_ip(ip) is not None
+        return self.registry.by_ip(ip) is not None
     
     def get_config_stats(self) -> Dict[str, Any]:
         """获取配置统计信息"""
@@ -0,0 +1,248 @@
+"""
+站点注册表
+
+加载时将 config_electricity.line_configs 一次性解析为不可变的站点/设备条目，并建立
+ip→站点、线路→站点、(线路, 站点名)→站点 的索引；额定功率与设备类型在构建时解析好。
+ElectricityConfig、RealtimeEnergyService 与 main.py 的能源驾驶舱接口共用同一份注册表，
+不再各自遍历整个配置字典。
+
+线路查找与原先各调用方的行为保持一致：by_line 按提取出的线路代码（ElectricityConfig），
+stations_in / by_name 按 line_configs 中的线路键（main.py 与 RealtimeEnergyService）。
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RATED_POWER_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*KW")
+
+_DEVICE_CATEGORY_KEYWORDS = (
+    ("冷机", ("冷机", "制冷", "chiller")),
+    ("水泵", ("水泵", "pump")),
+    ("冷却塔", ("冷却塔", "cooling_tower")),
+    ("风机", ("风机", "fan")),
+    ("照明", ("照明", "light")),
+    ("电梯", ("电梯", "elevator")),
+)
+
+
+def extract_line_code(line_name: str) -> str:
+    """从线路名称中提取线路代码"""
+    if "3号线" in line_name:
+        return "M3"
+    elif "8号线" in line_name:
+        return "M8"
+    elif "11号线" in line_name:
+        return "M11"
+    elif "1号线" in line_name:
+        return "M1"
+    elif "2号线" in line_name:
+        return "M2"
+    match = re.search(r"(\d+)号线", line_name)
+    if match:
+        return f"M{match.group(1)}"
+    return "M0"  # 默认值
+
+
+def classify_device_type(device_name: str) -> str:
+    """根据设备名称分类设备类型"""
+    device_name_lower = device_name.lower()
+    for category, keywords in _DEVICE_CATEGORY_KEYWORDS:
+        if any(keyword in device_name_lower for keyword in keywords):
+            return category
+    return "其他"
+
+
+def parse_rated_power(value: Any) -> float:
+    """解析额定功率（kW），支持数值和 "137KW" 形式的字符串，无法解析时返回 0"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _RATED_POWER_PATTERN.search(str(value or "").upper())
+    return float(match.group(1)) if match else 0.0
+
+
+def _freeze(value: Any) -> Any:
+    """深拷贝为只读结构：字典转为 MappingProxyType，列表转为元组，与原配置不共享可变对象"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class DeviceEntry:
+    """设备条目"""
+
+    name: str
+    location: str
+    rated_power: float
+    ct_ratio: Any
+    category: str
+    data_code: Optional[str]
+
+    def to_dict(self, station: "StationEntry") -> Dict[str, Any]:
+        """ElectricityConfig.get_station_devices 返回的标准化设备信息"""
+        return {
+            "name": self.name,
+            "location": self.location,
+            "power": self.rated_power,
+            "ct_ratio": self.ct_ratio,
+            "type": self.category,
+            "data_code": self.data_code,
+            "station_name": station.name,
+            "station_ip": station.ip,
+        }
+
+
+@dataclass(frozen=True)
+class StationEntry:
+    """站点条目，config 为原始站点配置的只读深拷贝（嵌套的字典、列表同样只读）"""
+
+    name: str
+    ip: str
+    line: str
+    line_name: str
+    station_code: str
+    object_codes: Tuple[str, ...]
+    data_codes: Tuple[str, ...]
+    devices: Tuple[DeviceEntry, ...]
+    rated_power_kw: float
+    config: Mapping[str, Any]
+
+    @property
+    def data_list(self) -> Tuple[Mapping[str, Any], ...]:
+        return self.config.get("data_list", ())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ElectricityConfig 对外返回的站点信息"""
+        return {
+            "name": self.name,
+            "ip": self.ip,
+            "line": self.line,
+            "line_name": self.line_name,
+            "station_code": self.station_code,
+            "energy_object_code": self.config.get("节能对象代码", ""),
+            "non_energy_object_code": self.config.get("非节能对象代码", ""),
+            "energy_data_code": self.config.get("节能数据代码", ""),
+            "non_energy_data_code": self.config.get("非节能数据代码", ""),
+            "device_count": len(self.devices),
+        }
+
+
+def _build_device(
+    index: int, device: Dict[str, Any], data_codes: Tuple[str, ...]
+) -> DeviceEntry:
+    # 兼容两种设备格式：name/location/power 字段，或 config_electricity 的 p1~p10 字段
+    name = device.get("name") or device.get("p3") or "未知设备"
+    return DeviceEntry(
+        name=name,
+        location=device.get("location") or device.get("p6") or "未知位置",
+        rated_power=parse_rated_power(device.get("power", device.get("p5"))),
+        ct_ratio=device.get("ct_ratio", 1),
+        category=classify_device_type(name),
+        data_code=data_codes[index] if index < len(data_codes) else None,
+    )
+
+
+def _build_station(line_name: str, station_name: str, config: Dict[str, Any]) -> StationEntry:
+    data_codes = tuple(config.get("data_codes", []))
+    devices = tuple(
+        _build_device(index, device, data_codes)
+        for index, device in enumerate(config.get("data_list", []))
+    )
+    return StationEntry(
+        name=station_name,
+        ip=config.get("ip", ""),
+        line=extract_line_code(line_name),
+        line_name=line_name,
+        station_code=config.get("站点名称", station_name),
+        object_codes=tuple(config.get("object_codes", [])),
+        data_codes=data_codes,
+        devices=devices,
+        rated_power_kw=sum(device.rated_power for device in devices),
+        config=_freeze(config),
+    )
+
+
+class StationRegistry:
+    """由 line_configs 构建的不可变站点注册表"""
+
+    def __init__(self, line_configs: Dict[str, Dict[str, Any]]) -> None:
+        stations = tuple(
+            _build_station(line_name, station_name, station_config)
+            for line_name, line_config in line_configs.items()
+            for station_name, station_config in line_config.items()
+        )
+        by_ip: Dict[str, StationEntry] = {}
+        by_line: Dict[str, List[StationEntry]] = {}
+        by_line_name: Dict[str, List[StationEntry]] = {}
+        by_name: Dict[Tuple[str, str], StationEntry] = {}
+        for station in stations:
+            # 重复 IP 保留第一个，与原先按顺序遍历查找的结果一致
+            if station.ip:
+                by_ip.setdefault(station.ip, station)
+            by_line.setdefault(station.line, []).append(station)
+            by_line_name.setdefault(station.line_name, []).append(station)
+            by_name[(station.line_name, station.name)] = station
+
+        self.stations = stations
+        self._by_ip = MappingProxyType(by_ip)
+        self._by_line = MappingProxyType({key: tuple(items) for key, items in by_line.items()})
+        self._by_line_name = MappingProxyType(
+            {key: tuple(items) for key, items in by_line_name.items()}
+        )
+        self._by_name = MappingProxyType(by_name)
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    @property
+    def line_names(self) -> Tuple[str, ...]:
+        """line_configs 中的线路键，按配置顺序"""
+        return tuple(self._by_line_name.keys())
+
+    def by_ip(self, ip: Optional[str]) -> Optional[StationEntry]:
+        return self._by_ip.get(ip) if ip else None
+
+    def by_line(self, line_code: str) -> Tuple[StationEntry, ...]:
+        """线路代码（extract_line_code 的结果）下的站点"""
+        return self._by_line.get(line_code, ())
+
+    def stations_in(self, line_name: str) -> Tuple[StationEntry, ...]:
+        """line_configs 中线路键 line_name 下的站点"""
+        return self._by_line_name.get(line_name, ())
+
+    def by_name(
+        self, line_name: Optional[str], station_name: Optional[str]
+    ) -> Optional[StationEntry]:
+        """按 line_configs 中的线路键与站点名查找"""
+        if not line_name or not station_name:
+            return None
+        return self._by_name.get((line_name, station_name))
+
+
+_registry: Optional[StationRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_station_registry() -> StationRegistry:
+    """由 line_configs（见 config_snapshot.load_line_configs）构建的共享注册表，首次调用时构建"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from backend.app.config.config_snapshot import load_line_configs
+
+                _registry = StationRegistry(load_line_configs())
+                logger.info(
+                    "站点注册表已构建: %d 条线路, %d 个站点",
+                    len(_registry.line_names),
+                    len(_registry),
+                )
+    return _registry
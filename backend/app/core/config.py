@@ -78,6 +78,15 @@ class ConfigManager:
         app_config["port"] = int(os.getenv("PORT", str(app_config.get("port", 8000))))
         app_config["debug"] = os.getenv("DEBUG", "").lower() in ("true", "1", "yes")
         
+        # 缓存配置覆盖
+        cache_config = self._config["cache"]
+        if os.getenv("METER_READING_STORE_PATH"):
+            cache_config["meter_reading_store_path"] = os.getenv("METER_READING_STORE_PATH")
+        if os.getenv("ENERGY_ROLLUP_PATH"):
+            cache_config["energy_rollup_path"] = os.getenv("ENERGY_ROLLUP_PATH")
+        if os.getenv("POWER_COLLECTOR_INTERVAL"):
+            cache_config["power_collector_interval"] = float(os.getenv("POWER_COLLECTOR_INTERVAL"))
+        
         # 安全配置覆盖
         security_config = self._config["security"]
         if os.getenv("SECRET_KEY"):
@@ -4,18 +4,53 @@
 定义服务层的基础接口和通用功能。
 """
 
+import asyncio
+import copy
 import logging
+import threading
 from abc import ABC
 from datetime import datetime
-from typing import Any, Dict, Generic, List, Optional, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
 
 from backend.app.core.config import get_config
+from backend.app.utils.ttl_cache import TTLCache
 
 config = get_config()
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
+# 服务层共享的进程内缓存（缓存键包含服务类名和方法名，各服务之间互不冲突）
+_service_cache: Optional[TTLCache] = None
+_service_cache_lock = threading.Lock()
+
+
+def get_service_cache() -> TTLCache:
+    """
+    按 cache.* 配置创建进程内 TTL/LRU 缓存
+
+    cache.max_entries 限制条目数，cache.max_bytes 限制按对象大小估算的总字节数，
+    超出任一上限时淘汰最久未使用的条目；
+    cache.backend 为 redis 时目前同样使用进程内缓存。
+    """
+    global _service_cache
+    if _service_cache is None:
+        with _service_cache_lock:
+            if _service_cache is None:
+                backend = config.get("cache.backend", "memory")
+                if backend not in ("memory", "dummy"):
+                    logger.warning(f"缓存后端 {backend} 暂未接入，使用进程内缓存")
+                _service_cache = TTLCache(
+                    ttl=config.get("cache.default_timeout", 300),
+                    max_entries=config.get("cache.max_entries", 1024),
+                    max_bytes=config.get("cache.max_bytes"),
+                )
+    return _service_cache
+
+
+# 正在执行中的缓存方法调用：cache_key -> Task，用于合并并发的相同请求
+_inflight_calls: Dict[str, "asyncio.Task[Any]"] = {}
+
 
 class BaseService(ABC, Generic[T]):
     """基础服务类"""
@@ -88,24 +123,46 @@ class CacheableService(BaseService[T]):
             return None
 
         try:
-            # 这里应该集成实际的缓存系统（Redis等）
-            # 暂时返回None，表示缓存未命中
+            value = get_service_cache().get(key)
+            # 返回副本，避免调用方修改结果影响缓存内容
+            return copy.deepcopy(value) if value is not None else None
+        except Exception as e:
+            self.logger.warning(f"缓存读取失败: {e}")
+            return None
+
+    async def get_cache_entry(self, key: str) -> Optional[Tuple[Any, float, bool]]:
+        """从缓存获取数据及其年龄：(数据副本, 已缓存秒数, 是否已过期)，包含保留期内的过期数据"""
+        if not self.cache_enabled:
             return None
+
+        try:
+            entry = get_service_cache().get_entry(key)
+            if entry is None:
+                return None
+            value, age, stale = entry
+            return copy.deepcopy(value), age, stale
         except Exception as e:
             self.logger.warning(f"缓存读取失败: {e}")
             return None
 
     async def set_cache(
-        self, key: str, value: Any, timeout: Optional[int] = None
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[int] = None,
+        stale_timeout: Optional[int] = None,
     ) -> None:
-        """设置缓存数据"""
-        if not self.cache_enabled:
+        """设置缓存数据；stale_timeout 为过期后仍可作为旧数据返回的时长"""
+        if not self.cache_enabled or value is None:
             return
 
         try:
-            # 这里应该集成实际的缓存系统（Redis等）
-            # 暂时跳过缓存设置
-            pass
+            get_service_cache().set(
+                key,
+                copy.deepcopy(value),
+                timeout if timeout else self.cache_timeout,
+                stale_ttl=stale_timeout or 0,
+            )
         except Exception as e:
             self.logger.warning(f"缓存设置失败: {e}")
 
@@ -115,12 +172,16 @@ class CacheableService(BaseService[T]):
             return
 
         try:
-            # 这里应该集成实际的缓存系统（Redis等）
-            # 暂时跳过缓存删除
-            pass
+            get_service_cache().invalidate(key)
         except Exception as e:
             self.logger.warning(f"缓存删除失败: {e}")
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """缓存统计：条目数、容量上限、命中/未命中次数、命中率和淘汰次数"""
+        stats = get_service_cache().stats()
+        stats["enabled"] = self.cache_enabled
+        return stats
+
 
 class AsyncService(BaseService[T]):
     """异步服务基类"""
@@ -196,8 +257,27 @@ class ServiceRegistry:
             logger.info(f"服务已注销: {name}")
 
 
-def service_method(cache_timeout: Optional[int] = None):
-    """服务方法装饰器"""
+def _is_error_result(result: Any) -> bool:
+    """format_error_response 生成的失败结果不写入缓存"""
+    return isinstance(result, dict) and result.get("success") is False
+
+
+def _with_cache_info(result: Any, age: float, stale: bool) -> Any:
+    """在字典结果中附加缓存元数据（数据年龄、是否为过期数据）"""
+    if isinstance(result, dict):
+        result["cache_info"] = {"age_seconds": round(age, 1), "stale": stale}
+    return result
+
+
+def service_method(cache_timeout: Optional[int] = None, stale_timeout: Optional[int] = None):
+    """
+    服务方法装饰器
+
+    Args:
+        cache_timeout: 缓存有效期（秒），仅对 CacheableService 生效
+        stale_timeout: 过期后继续返回旧数据的时长（秒）。设置后缓存过期的请求立即返回旧数据，
+            并在后台重新计算（stale-while-revalidate），结果中附加 cache_info 说明数据年龄
+    """
 
     def decorator(func):
         async def wrapper(self, *args, **kwargs):
@@ -207,20 +287,59 @@ def service_method(cache_timeout: Optional[int] = None):
                 # 记录操作开始
                 self.log_operation(operation_name, call_args=args, call_kwargs=kwargs)
 
-                # 检查缓存（如果是CacheableService）
-                if isinstance(self, CacheableService) and cache_timeout:
-                    cache_key = self.get_cache_key(operation_name, *args, **kwargs)
+                if not (isinstance(self, CacheableService) and cache_timeout):
+                    return await func(self, *args, **kwargs)
+
+                loop = asyncio.get_running_loop()
+                cache_key = self.get_cache_key(operation_name, *args, **kwargs)
+
+                def start_compute() -> "asyncio.Task[Any]":
+                    # 相同缓存键的调用正在执行时直接复用（single-flight）
+                    inflight = _inflight_calls.get(cache_key)
+                    if inflight is not None and inflight.get_loop() is loop:
+                        self.logger.debug(f"合并并发请求: {operation_name}")
+                        return inflight
+
+                    async def compute():
+                        result = await func(self, *args, **kwargs)
+                        if not _is_error_result(result):
+                            await self.set_cache(cache_key, result, cache_timeout, stale_timeout)
+                        return result
+
+                    task = loop.create_task(compute())
+                    _inflight_calls[cache_key] = task
+
+                    def release(done_task):
+                        if _inflight_calls.get(cache_key) is done_task:
+                            del _inflight_calls[cache_key]
+                        # 所有等待者都已取消时也要取走异常，避免未读取异常的告警
+                        if not done_task.cancelled() and done_task.exception() is not None:
+                            self.logger.warning(
+                                f"{operation_name} 执行失败: {done_task.exception()}"
+                            )
+
+                    task.add_done_callback(release)
+                    return task
+
+                # 检查缓存
+                if stale_timeout:
+                    entry = await self.get_cache_entry(cache_key)
+                    if entry is not None:
+                        cached_result, age, stale = entry
+                        if stale:
+                            # 先返回旧数据，后台刷新
+                            start_compute()
+                        return _with_cache_info(cached_result, age, stale)
+                else:
                     cached_result = await self.get_from_cache(cache_key)
                     if cached_result is not None:
                         return cached_result
 
-                # 执行实际操作
-                result = await func(self, *args, **kwargs)
-
-                # 设置缓存（如果是CacheableService）
-                if isinstance(self, CacheableService) and cache_timeout:
-                    await self.set_cache(cache_key, result, cache_timeout)
-
+                task = start_compute()
+                # shield：发起方被取消（如客户端断开）时，共享的计算仍为其他等待者继续执行
+                result = copy.deepcopy(await asyncio.shield(task))
+                if stale_timeout and not _is_error_result(result):
+                    result = _with_cache_info(result, 0.0, False)
                 return result
 
             except Exception as e:
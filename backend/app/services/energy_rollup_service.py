@@ -0,0 +1,399 @@
+"""
+能耗汇总服务
+
+由电表起止码计算各站点、各设备每小时的电耗并写入汇总存储（见 energy_rollup_store），
+趋势接口读取汇总结果。提供两种写入方式：
+- backfill：回填指定时间范围，已完成的小时自动跳过，可作为后台任务重复执行
+- update_recent：增量汇总最近结束的小时，由定时循环 run_periodic 调用
+
+每个整点只取一个读数，同一天内相邻小时共用（前一小时的止码即后一小时的起码），
+一天 24 小时共读取 25 个边界值，各小时之和与按整天直接计算的结果一致。
+
+读取时只返回已汇总的数据；尚未到汇总时间的当前小时/当天从站点实时计算（带超时并短时缓存），
+已结束但汇总缺失的部分不实时查询，只在后台安排回填，本次按部分站点覆盖返回。
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.app.config.electricity_config import ElectricityConfig
+from backend.app.services.realtime_energy_service import RealtimeEnergyService
+from backend.app.utils.ttl_cache import TTLCache
+from backend.app.utils.energy_rollup_store import (
+    DAY,
+    HOUR,
+    EnergyRollupStore,
+    floor_day,
+    floor_hour,
+    get_energy_rollup_store,
+    to_ms,
+)
+from task_manager import TaskStatus, task_manager
+
+logger = logging.getLogger(__name__)
+
+# 同时汇总的站点数上限
+ROLLUP_MAX_CONCURRENT_STATIONS = int(os.environ.get("ENERGY_ROLLUP_MAX_CONCURRENT_STATIONS", "4"))
+# 增量汇总回看的时长，服务停机后重启时补齐这段时间内缺失的小时
+ROLLUP_LOOKBACK = timedelta(hours=int(os.environ.get("ENERGY_ROLLUP_LOOKBACK_HOURS", "48")))
+# 小时结束后等待的时长，避免站点数据尚未上报完整
+ROLLUP_SETTLE = timedelta(minutes=10)
+# 读取时发现汇总缺失的已结束小时，是否自动在后台回填（ENERGY_ROLLUP_AUTO_BACKFILL=0 关闭）
+ROLLUP_AUTO_BACKFILL = os.environ.get("ENERGY_ROLLUP_AUTO_BACKFILL", "1") != "0"
+# 读取时实时计算当前时间桶的单站超时（秒），超时的站点本次不计入
+ROLLUP_LIVE_TIMEOUT = float(os.environ.get("ENERGY_ROLLUP_LIVE_TIMEOUT", "5"))
+# 当前时间桶实时计算结果的缓存时长（秒）
+ROLLUP_LIVE_CACHE_SECONDS = 60
+
+
+class EnergyRollupService:
+    """能耗小时/日汇总服务"""
+
+    def __init__(
+        self,
+        realtime_service: Optional[RealtimeEnergyService] = None,
+        store: Optional[EnergyRollupStore] = None,
+    ) -> None:
+        self.realtime_service = realtime_service or RealtimeEnergyService()
+        self.electricity_config = ElectricityConfig()
+        self.max_concurrent_stations = ROLLUP_MAX_CONCURRENT_STATIONS
+        self._store = store
+        self.auto_backfill = ROLLUP_AUTO_BACKFILL
+        self._background_tasks: set = set()
+        # 正在自动回填的 (站点IP, 开始, 结束)，避免重复请求触发重复回填
+        self._auto_backfills: set = set()
+        # 当前时间桶的实时计算结果，键为 (站点IP, ((桶起点, 桶名义终点), ...))
+        self._live_cache = TTLCache(ttl=ROLLUP_LIVE_CACHE_SECONDS, max_entries=1024)
+        # 自动回填共用的并发限制，按事件循环创建
+        self._backfill_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._backfill_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def store(self) -> Optional[EnergyRollupStore]:
+        return self._store if self._store is not None else get_energy_rollup_store()
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了汇总存储"""
+        return self.store is not None
+
+    async def rollup_station(
+        self,
+        station: Dict[str, Any],
+        start_time: datetime,
+        end_time: datetime,
+        should_continue: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[int, int]:
+        """
+        汇总单个站点 [start_time, end_time) 内尚未完成的小时
+
+        Returns:
+            (完成的小时数, 失败的小时数)；失败的小时不记录，下次执行时重试
+        """
+        store = self.store
+        station_ip = station.get("ip")
+        if store is None or not station_ip:
+            return 0, 0
+
+        start, end = floor_hour(start_time), floor_hour(end_time)
+        done = await asyncio.to_thread(store.completed_hours, station_ip, start, end)
+        pending = []
+        hour = start
+        while hour < end:
+            if to_ms(hour) not in done:
+                pending.append(hour)
+            hour += timedelta(hours=1)
+
+        # 按自然日分批，每批一次读取当天缺失小时的全部边界
+        days: Dict[datetime, List[datetime]] = {}
+        for hour in pending:
+            days.setdefault(floor_day(hour), []).append(hour)
+
+        completed = failed = 0
+        for batch in days.values():
+            if should_continue is not None and not should_continue():
+                break
+            periods = [(hour, hour + timedelta(hours=1)) for hour in batch]
+            # 当天内部的整点作为下一小时的起点读取（与相邻小时共用一个读数），零点按止码读取，
+            # 这样各小时首尾相接，无论分几次汇总，当天各小时之和都等于按整天直接计算的值
+            boundaries = [end for _, end in periods if end != floor_day(end)]
+            results = await self.realtime_service.get_station_period_device_consumptions(
+                station, periods, start_boundaries=boundaries
+            )
+            # 空字典表示有读数但没有有效设备，同样视为失败，不写完成标记，下次重试
+            hours = [(hour, devices) for hour, devices in zip(batch, results) if devices]
+            await asyncio.to_thread(store.save_hours, station_ip, hours)
+            completed += len(hours)
+            failed += len(batch) - len(hours)
+
+        if pending:
+            logger.info(
+                "能耗汇总 [%s] %s ~ %s: 完成 %d 小时, 失败 %d 小时",
+                station.get("name"), start, end, completed, failed,
+            )
+        return completed, failed
+
+    async def backfill(
+        self,
+        stations: List[Dict[str, Any]],
+        start_time: datetime,
+        end_time: datetime,
+        task_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """回填多个站点的汇总数据，站点间并发（上限 max_concurrent_stations）；传入 task_id 时上报进度"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_stations)
+        should_continue = (lambda: not task_manager.is_cancelled(task_id)) if task_id else None
+        summary: Dict[str, Any] = {
+            "station_count": len(stations),
+            "completed_hours": 0,
+            "failed_hours": 0,
+            "failed_stations": [],
+        }
+
+        async def run(station):
+            async with semaphore:
+                try:
+                    return station, await self.rollup_station(
+                        station, start_time, end_time, should_continue
+                    )
+                except Exception as exc:
+                    logger.error("能耗汇总回填异常 [%s]: %s", station.get("name"), exc)
+                    return station, None
+
+        if task_id:
+            task_manager.update_task_status(task_id, TaskStatus.RUNNING)
+            task_manager.update_task_progress(task_id, 0, len(stations), "开始回填能耗汇总")
+
+        for finished, future in enumerate(asyncio.as_completed([run(s) for s in stations]), 1):
+            station, outcome = await future
+            if outcome is None:
+                summary["failed_stations"].append(station.get("name"))
+            else:
+                summary["completed_hours"] += outcome[0]
+                summary["failed_hours"] += outcome[1]
+            if task_id:
+                task_manager.update_task_progress(
+                    task_id, finished, len(stations), f"已完成 {station.get('name')}"
+                )
+
+        if task_id and not task_manager.is_cancelled(task_id):
+            task_manager.set_task_result(task_id, summary)
+            task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+        return summary
+
+    def start_backfill(
+        self, start_time: datetime, end_time: datetime, line: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """创建回填任务并在当前事件循环后台执行，进度通过 task_manager 查询"""
+        stations = (
+            self.electricity_config.get_stations_by_line(line)
+            if line
+            else self.electricity_config.get_all_stations()
+        )
+        task_id = task_manager.create_task("energy_rollup", line or "ALL", start_time, end_time)
+
+        async def run():
+            try:
+                await self.backfill(stations, start_time, end_time, task_id)
+            except Exception as exc:
+                logger.error("能耗汇总回填任务失败: %s", exc)
+                task_manager.update_task_status(task_id, TaskStatus.FAILED, str(exc))
+
+        task = asyncio.get_running_loop().create_task(run())
+        # 保留引用，避免后台任务在完成前被回收
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return {"task_id": task_id, "status": "started", "station_count": len(stations)}
+
+    async def update_recent(
+        self, stations: Optional[List[Dict[str, Any]]] = None, now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        增量汇总最近 ROLLUP_LOOKBACK 内已结束的小时
+
+        已完成的小时直接跳过，因此每次只请求新结束的小时，以及此前失败或服务停机期间遗漏的小时。
+        """
+        if self.store is None:
+            return {
+                "station_count": 0, "completed_hours": 0, "failed_hours": 0, "failed_stations": []
+            }
+        stations = stations if stations is not None else self.electricity_config.get_all_stations()
+        end = floor_hour((now or datetime.now()) - ROLLUP_SETTLE)
+        return await self.backfill(stations, end - ROLLUP_LOOKBACK, end)
+
+    async def run_periodic(self, interval_seconds: float) -> None:
+        """定时执行增量汇总，直到任务被取消"""
+        logger.info("能耗汇总定时任务已启动，间隔 %.0f 秒", interval_seconds)
+        while True:
+            try:
+                summary = await self.update_recent()
+                if summary["completed_hours"] or summary["failed_hours"]:
+                    logger.info(
+                        "能耗增量汇总完成: %d 小时, 失败 %d 小时",
+                        summary["completed_hours"], summary["failed_hours"],
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("能耗增量汇总失败: %s", exc)
+            await asyncio.sleep(interval_seconds)
+
+    async def get_series(
+        self,
+        stations: List[Dict[str, Any]],
+        start_time: datetime,
+        end_time: datetime,
+        granularity: str,
+        device: Optional[str] = None,
+        fill_missing: bool = True,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[datetime, Optional[float], int]]:
+        """
+        从汇总存储读取电耗序列
+
+        granularity 为 hourly / daily / monthly；返回按时间排列的 (桶起点, kWh, 有数据的站点数)。
+        kWh 为有数据站点的合计，没有任何站点有数据的桶为 None（不按 0 处理）；月度的站点数
+        取当月各天的最小值。fill_missing 时尚未到汇总时间的桶从站点实时计算，已结束但汇总
+        缺失的站点只在后台安排回填，本次不计入。
+        """
+        store = self.store
+        if store is None:
+            raise RuntimeError("能耗汇总存储未启用")
+        stations = [s for s in stations if s.get("ip")]
+        station_ips = [s["ip"] for s in stations]
+
+        if granularity == "hourly":
+            start, step, level = floor_hour(start_time), timedelta(hours=1), HOUR
+        else:
+            start, step, level = floor_day(start_time), timedelta(days=1), DAY
+        stored = await asyncio.to_thread(
+            store.series_by_station, station_ips, level, start, end_time, device
+        )
+
+        periods: List[Tuple[datetime, datetime]] = []
+        cursor = start
+        while cursor < end_time:
+            periods.append((cursor, min(cursor + step, end_time)))
+            cursor += step
+        per_bucket = [dict(stored.get(to_ms(bucket_start), {})) for bucket_start, _ in periods]
+
+        if fill_missing and stations:
+            settled_end = floor_hour((now or datetime.now()) - ROLLUP_SETTLE)
+            unique_stations = list({s["ip"]: s for s in stations}.values())
+            await self._fill_live(unique_stations, periods, per_bucket, step, device, settled_end)
+            if self.auto_backfill:
+                self._schedule_gap_backfills(unique_stations, periods, per_bucket, settled_end)
+
+        buckets: List[Tuple[datetime, Optional[float], int]] = [
+            (bucket_start, sum(values.values()) if values else None, len(values))
+            for (bucket_start, _), values in zip(periods, per_bucket)
+        ]
+
+        if granularity != "monthly":
+            return buckets
+
+        # 按自然月累加日汇总，缺失的天不计入
+        months: Dict[datetime, Tuple[Optional[float], int]] = {}
+        for day, kwh, count in buckets:
+            month = day.replace(day=1)
+            total, covered = months.get(month, (None, count))
+            if kwh is not None:
+                total = kwh if total is None else total + kwh
+            months[month] = (total, min(covered, count))
+        return [(month, total, covered) for month, (total, covered) in months.items()]
+
+    def _schedule_gap_backfills(
+        self,
+        stations: List[Dict[str, Any]],
+        periods: List[Tuple[datetime, datetime]],
+        per_bucket: List[Dict[str, float]],
+        settled_end: datetime,
+    ) -> None:
+        """已结束但汇总缺失的 (站点, 时间桶) 安排后台回填，本次请求不等待"""
+        for station in stations:
+            ip = station["ip"]
+            gaps = [
+                period for period, values in zip(periods, per_bucket)
+                if ip not in values and period[0] < settled_end
+            ]
+            if gaps:
+                self._schedule_backfill(station, gaps[0][0], min(gaps[-1][1], settled_end))
+
+    async def _fill_live(
+        self,
+        stations: List[Dict[str, Any]],
+        periods: List[Tuple[datetime, datetime]],
+        per_bucket: List[Dict[str, float]],
+        step: timedelta,
+        device: Optional[str],
+        settled_end: datetime,
+    ) -> None:
+        """尚未到汇总时间的时间桶从站点实时计算，结果写回 per_bucket；每站带超时，结果短时缓存"""
+        live = [i for i, (_, bucket_end) in enumerate(periods) if bucket_end > settled_end]
+        if not live:
+            return
+        semaphore = asyncio.Semaphore(self.max_concurrent_stations)
+
+        async def fill(station):
+            ip = station["ip"]
+            indexes = [i for i in live if ip not in per_bucket[i]]
+            if not indexes:
+                return
+            # 桶终点随请求时间变化，缓存键使用名义终点，缓存期内复用同一结果
+            key = (ip, tuple((periods[i][0], periods[i][0] + step) for i in indexes))
+            results = self._live_cache.get(key)
+            if results is None:
+                async with semaphore:
+                    try:
+                        results = await asyncio.wait_for(
+                            self.realtime_service.get_station_period_device_consumptions(
+                                station, [periods[i] for i in indexes]
+                            ),
+                            ROLLUP_LIVE_TIMEOUT,
+                        )
+                    except asyncio.TimeoutError:
+                        logger.warning("实时计算当前能耗超时 [%s]", station.get("name"))
+                        results = [None] * len(indexes)
+                    except Exception as exc:
+                        logger.warning("实时计算当前能耗失败 [%s]: %s", station.get("name"), exc)
+                        results = [None] * len(indexes)
+                # 失败结果同样缓存，避免不可达的站点让缓存期内的每次请求都等待超时
+                self._live_cache.set(key, results)
+            for i, devices in zip(indexes, results):
+                if devices:
+                    per_bucket[i][ip] = devices.get(device, 0.0) if device else sum(devices.values())
+
+        await asyncio.gather(*(fill(station) for station in stations))
+
+    def _backfill_semaphore(self) -> asyncio.Semaphore:
+        """自动回填的并发限制；信号量绑定事件循环，循环变化时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._backfill_loop is not loop or self._backfill_slots is None:
+            self._backfill_loop = loop
+            self._backfill_slots = asyncio.Semaphore(self.max_concurrent_stations)
+        return self._backfill_slots
+
+    def _schedule_backfill(self, station: Dict[str, Any], start_time: datetime, end_time: datetime) -> None:
+        """在后台回填单个站点的汇总缺口；同一缺口正在回填时不重复发起"""
+        key = (station["ip"], start_time, end_time)
+        if key in self._auto_backfills:
+            return
+        self._auto_backfills.add(key)
+
+        semaphore = self._backfill_semaphore()
+
+        async def run():
+            try:
+                async with semaphore:
+                    await self.rollup_station(station, start_time, end_time)
+            except Exception as exc:
+                logger.warning("自动回填能耗汇总失败 [%s]: %s", station.get("name"), exc)
+            finally:
+                self._auto_backfills.discard(key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
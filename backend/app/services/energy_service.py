@@ -11,7 +11,9 @@ from typing import Any, Dict, List, Optional
 
 from backend.app.config.electricity_config import ElectricityConfig
 from backend.app.services.base import CacheableService, service_method
+from backend.app.services.energy_rollup_service import EnergyRollupService
 from backend.app.services.realtime_energy_service import RealtimeEnergyService
+from backend.app.services.station_power_collector import StationPowerCollector
 
 
 class EnergyService(CacheableService):
@@ -21,8 +23,17 @@ class EnergyService(CacheableService):
         super().__init__()
         self.electricity_config = ElectricityConfig()
         self.realtime_service = RealtimeEnergyService()
+        self.rollup_service = EnergyRollupService(self.realtime_service)
+        self.power_collector = StationPowerCollector(self.realtime_service)
 
-    @service_method(cache_timeout=60)
+    async def _get_current_power(self, station: Dict[str, Any]) -> Optional[float]:
+        """站点当前功率：优先读取后台采集的最新采样，没有新鲜采样时实时查询"""
+        current_power = self.power_collector.latest(station["ip"])
+        if current_power is not None:
+            return current_power
+        return await self.realtime_service.get_station_realtime_power(station)
+
+    @service_method(cache_timeout=60, stale_timeout=600)
     async def get_energy_overview(
         self, station_ip: Optional[str] = None
     ) -> Dict[str, Any]:
@@ -62,7 +73,7 @@ class EnergyService(CacheableService):
             self.log_error("get_energy_overview", e, station_ip=station_ip)
             return self.format_error_response(f"获取能源总览数据失败: {str(e)}")
 
-    @service_method(cache_timeout=30)
+    @service_method(cache_timeout=30, stale_timeout=300)
     async def get_realtime_data(
         self, line: Optional[str] = None, station_ip: Optional[str] = None
     ) -> Dict[str, Any]:
@@ -154,7 +165,7 @@ class EnergyService(CacheableService):
             self.log_error("get_historical_trends", e)
             return self.format_error_response(f"获取历史趋势数据失败: {str(e)}")
 
-    @service_method(cache_timeout=120)
+    @service_method(cache_timeout=120, stale_timeout=600)
     async def get_kpi_metrics(self, station_ip: Optional[str] = None) -> Dict[str, Any]:
         """
         获取KPI指标数据
@@ -203,10 +214,8 @@ class EnergyService(CacheableService):
 
             self.logger.info("📊 [%s] 开始获取总览数据 - 设备数量: %d", station_name, device_count)
 
-            # 从平台API获取实时功率（取消模拟数据fallback）
-            current_power = await self.realtime_service.get_station_realtime_power(
-                station
-            )
+            # 优先使用后台采集的功率，没有时从平台API实时获取（取消模拟数据fallback）
+            current_power = await self._get_current_power(station)
 
             data_source = "real"
             error_detail: Optional[str] = None
@@ -291,10 +300,8 @@ class EnergyService(CacheableService):
 
             self.logger.info("📈 [%s] 开始获取实时数据 - 设备数量: %d", station_name, device_count)
 
-            # 从平台API获取实时功率（取消模拟数据fallback）
-            current_power = await self.realtime_service.get_station_realtime_power(
-                station
-            )
+            # 优先使用后台采集的功率，没有时从平台API实时获取（取消模拟数据fallback）
+            current_power = await self._get_current_power(station)
 
             data_source = "real"
             error_detail: Optional[str] = None
@@ -305,11 +312,17 @@ class EnergyService(CacheableService):
                 current_power = 0.0
                 data_source = "unavailable"
 
-            # 生成24小时功率曲线（基于当前功率估算历史曲线）
-            hourly_data: List[float] = []
+            # 24小时功率曲线：有后台采集数据时取各小时平均功率，未采集到的小时为 None；
+            # 否则基于当前功率估算历史曲线
+            hourly_data: List[Optional[float]] = []
             now = datetime.now()
+            hourly_means = self.power_collector.hourly_means(station["ip"], 24)
 
-            if data_source == "real":
+            if any(value is not None for value in hourly_means):
+                hourly_data = [
+                    round(value, 1) if value is not None else None for value in hourly_means
+                ]
+            elif data_source == "real":
                 base_power = current_power
                 for i in range(24):
                     hour = (now - timedelta(hours=23 - i)).hour
@@ -494,7 +507,7 @@ class EnergyService(CacheableService):
             power_sum = sum(
                 item["hourly_data"][i]
                 for item in station_data_list
-                if len(item["hourly_data"]) > i
+                if len(item["hourly_data"]) > i and item["hourly_data"][i] is not None
             )
             chart_data.append(
                 {
@@ -556,7 +569,12 @@ class EnergyService(CacheableService):
         end_date: datetime,
         granularity: str,
     ) -> Dict[str, Any]:
-        """生成历史趋势数据"""
+        """生成历史趋势数据；启用能耗汇总存储时使用真实汇总数据，否则生成模拟数据"""
+        if self.rollup_service.enabled:
+            return await self._historical_trends_from_rollup(
+                stations, start_date, end_date, granularity
+            )
+
         # 根据粒度计算时间点
         time_points = []
         current_date = start_date
@@ -615,6 +633,55 @@ class EnergyService(CacheableService):
             },
         }
 
+    async def _historical_trends_from_rollup(
+        self,
+        stations: List[Dict[str, Any]],
+        start_date: datetime,
+        end_date: datetime,
+        granularity: str,
+    ) -> Dict[str, Any]:
+        """由能耗汇总生成历史趋势（结束日期当天包含在内）"""
+        series = await self.rollup_service.get_series(
+            stations, start_date, end_date + timedelta(days=1), granularity
+        )
+        trends_data = []
+        for bucket_start, kwh, station_count in series:
+            if granularity == "hourly":
+                hours = 1
+            elif granularity == "monthly":
+                next_month = (bucket_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+                hours = (next_month - bucket_start).total_seconds() / 3600
+            else:
+                hours = 24
+            trends_data.append(
+                {
+                    "time": bucket_start.strftime(
+                        "%Y-%m-%d %H:%M" if granularity == "hourly" else "%Y-%m-%d"
+                    ),
+                    "consumption": round(kwh, 1) if kwh is not None else None,
+                    "power": round(kwh / hours, 1) if kwh is not None else None,
+                    "station_count": station_count,
+                }
+            )
+
+        valid = [item for item in trends_data if item["consumption"] is not None]
+        return {
+            "trends": trends_data,
+            "summary": {
+                "total_consumption": round(sum(item["consumption"] for item in valid), 1),
+                "avg_power": round(sum(item["power"] for item in valid) / len(valid), 1)
+                if valid
+                else 0.0,
+                "valid_points": len(valid),
+            },
+            "granularity": granularity,
+            "period": {
+                "start": start_date.strftime("%Y-%m-%d"),
+                "end": end_date.strftime("%Y-%m-%d"),
+            },
+            "data_source": "rollup",
+        }
+
     async def get_comparison_data(
         self,
         start_time: datetime,
@@ -641,41 +708,29 @@ class EnergyService(CacheableService):
             # 计算时间跨度
             time_diff = end_time - start_time
 
-            # 并行获取当前周期、去年同期、上一周期的能耗数据
-            current_tasks = [
-                self.realtime_service.get_station_energy_consumption(
-                    station, start_time, end_time
-                )
-                for station in stations
-            ]
-
-            # 去年同期（同比）
+            # 当前周期、去年同期（同比）、上一周期（环比，向前推同样的时间跨度）
             year_delta = timedelta(days=365)
-            yoy_start = start_time - year_delta
-            yoy_end = end_time - year_delta
-            yoy_tasks = [
-                self.realtime_service.get_station_energy_consumption(
-                    station, yoy_start, yoy_end
-                )
-                for station in stations
+            periods = [
+                (start_time, end_time),
+                (start_time - year_delta, end_time - year_delta),
+                (start_time - time_diff, start_time),
             ]
 
-            # 上一周期（环比）- 向前推同样的时间跨度
-            mom_end = start_time
-            mom_start = start_time - time_diff
-            mom_tasks = [
-                self.realtime_service.get_station_energy_consumption(
-                    station, mom_start, mom_end
-                )
-                for station in stations
+            # 每个站点一次性获取三个周期共用的起止码（相同时刻只请求一次），各站点并行
+            station_results = await asyncio.gather(
+                *[
+                    self.realtime_service.get_station_period_consumptions(station, periods)
+                    for station in stations
+                ],
+                return_exceptions=True,
+            )
+            station_results = [
+                r if not isinstance(r, Exception) else [r] * len(periods)
+                for r in station_results
             ]
-
-            # 执行所有任务
-            current_results = await asyncio.gather(
-                *current_tasks, return_exceptions=True
+            current_results, yoy_results, mom_results = (
+                [r[i] for r in station_results] for i in range(len(periods))
             )
-            yoy_results = await asyncio.gather(*yoy_tasks, return_exceptions=True)
-            mom_results = await asyncio.gather(*mom_tasks, return_exceptions=True)
 
             # 过滤有效结果
             current_consumptions = [
@@ -728,6 +783,7 @@ class EnergyService(CacheableService):
             self.log_error("get_comparison_data", e, station_ip=station_ip)
             return self.format_error_response(f"获取同比环比数据失败: {str(e)}")
 
+    @service_method(cache_timeout=60)
     async def get_trend_series(
         self,
         start_time: datetime,
@@ -758,38 +814,57 @@ class EnergyService(CacheableService):
                 granularity = "daily"
 
             timestamps: List[str] = []
-            values: List[float] = []
+            values: List[Optional[float]] = []
+            # 各时间桶计入合计的站点数
+            coverage: List[int] = []
             valid_points = 0
 
-            current_start = start_time
-            while current_start < end_time:
-                current_end = min(current_start + step, end_time)
-                tasks = [
-                    self.realtime_service.get_station_energy_consumption(
-                        station, current_start, current_end
-                    )
-                    for station in stations
-                ]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                consumptions = [
-                    r for r in results if not isinstance(r, Exception) and r is not None
-                ]
-                total_consumption = sum(consumptions) if consumptions else 0.0
-                if consumptions:
-                    valid_points += 1
-
-                timestamps.append(current_start.strftime(time_format))
-                values.append(round(total_consumption, 1))
-
-                current_start = current_end
+            if self.rollup_service.enabled:
+                # 从小时/日汇总读取，只有当前时间桶实时计算；没有任何站点数据的桶为 None
+                series = await self.rollup_service.get_series(
+                    stations, start_time, end_time, granularity
+                )
+                for bucket_start, kwh, station_count in series:
+                    timestamps.append(bucket_start.strftime(time_format))
+                    values.append(round(kwh, 1) if kwh is not None else None)
+                    coverage.append(station_count)
+                    if kwh is not None:
+                        valid_points += 1
+                data_source = "rollup"
+            else:
+                data_source = "realtime"
+                current_start = start_time
+                while current_start < end_time:
+                    current_end = min(current_start + step, end_time)
+                    tasks = [
+                        self.realtime_service.get_station_energy_consumption(
+                            station, current_start, current_end
+                        )
+                        for station in stations
+                    ]
+                    results = await asyncio.gather(*tasks, return_exceptions=True)
+                    consumptions = [
+                        r for r in results if not isinstance(r, Exception) and r is not None
+                    ]
+                    total_consumption = sum(consumptions) if consumptions else 0.0
+                    if consumptions:
+                        valid_points += 1
+
+                    timestamps.append(current_start.strftime(time_format))
+                    values.append(round(total_consumption, 1))
+                    coverage.append(len(consumptions))
+
+                    current_start = current_end
 
             return self.format_response(
                 {
                     "timestamps": timestamps,
                     "values": values,
+                    "coverage": coverage,
                     "granularity": granularity,
                     "station_count": len(stations),
                     "valid_points": valid_points,
+                    "data_source": data_source,
                 },
                 "趋势数据获取成功",
             )
@@ -2,22 +2,32 @@
 真实能源数据服务
 从平台API获取实时能源数据
 参考export_service中的能耗数据获取方式，使用 /data/selectHisData 接口
+站点请求通过共享的异步客户端发出（按站点限制连接数），全线并发查询不占用线程池
 """
 
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
 
 from backend.app.config.electricity_config import ElectricityConfig
+from backend.app.config.station_registry import get_station_registry
+from backend.app.utils.his_data_index import HisDataIndex
+from backend.app.utils.meter_reading_store import get_meter_reading_store
+from backend.app.utils.meter_readings import (
+    MeterBoundarySnapshot,
+    fetch_boundary_snapshot,
+    fetch_period_snapshots,
+)
+from backend.app.utils.station_client import get_station_client
 
 logger = logging.getLogger(__name__)
 
-try:  # noqa: SIM105
-    import requests  # type: ignore
-except Exception as exc:  # pragma: no cover - 环境缺失requests依赖时的兼容处理
-    requests = None  # type: ignore
-    logging.getLogger(__name__).warning("requests模块无法导入，能源数据将回退至估算模式: %s", exc)
+# 实时查询的单次请求超时（秒）
+SELECT_HIS_DATA_TIMEOUT = 5.0
 
 
 class RealtimeEnergyService:
@@ -25,7 +35,6 @@ class RealtimeEnergyService:
 
     def __init__(self) -> None:
         self.electricity_config = ElectricityConfig()
-        self.requests_available = requests is not None
 
     def _get_station_api_url(self, station_ip: str) -> str:
         """构建站点API URL，参考export_service使用9898端口"""
@@ -44,12 +53,6 @@ class RealtimeEnergyService:
             "开始获取站点实时功率 - 站点: %s, IP: %s, 线路: %s", station_name, station_ip, line_code
         )
 
-        if not self.requests_available:
-            logger.error(
-                "❌ [%s] requests模块不可用，无法查询实时数据。" "请确保已安装requests依赖包。", station_name
-            )
-            return None
-
         if not station_ip:
             logger.error(
                 "❌ [%s] 站点配置缺少IP地址，无法查询实时数据。" "请检查站点配置中是否正确配置了'ip'字段。", station_name
@@ -150,10 +153,6 @@ class RealtimeEnergyService:
             end_time,
         )
 
-        if not self.requests_available:
-            logger.error("❌ [%s] requests模块不可用，无法查询能耗数据", station_name)
-            return None
-
         if not station_ip:
             logger.error("❌ [%s] 站点配置缺少IP地址", station_name)
             return None
@@ -206,97 +205,137 @@ class RealtimeEnergyService:
 
         这个方法完全复制export_service.py中process_data函数的逻辑
         """
-        start_timestamp = int(start_time.timestamp() * 1000)
-        end_timestamp = int(end_time.timestamp() * 1000)
+        # 起码、止码两个窗口并发获取，窗口定义与export_service一致
+        snapshot = await fetch_boundary_snapshot(
+            self._fetch_select_his_data, api_url, object_codes, data_codes, start_time, end_time,
+            store=get_meter_reading_store(),
+        )
+        return self._consumption_from_snapshot(snapshot, object_codes, data_codes, station_name)
 
-        # 获取结束时间的电表读数（止码）
-        # 参考export_service.py第182-192行
-        end_obj = {
-            "dataCodes": data_codes,
-            "endTime": end_timestamp,
-            "fill": "0",
-            "funcName": "mean",
-            "funcTime": "",
-            "measurement": "realData",
-            "objectCodes": object_codes,
-            "startTime": end_timestamp - 10 * 60000,  # 10分钟前
-        }
+    async def get_station_period_consumptions(
+        self, station: Dict[str, Any], periods: List[Tuple[datetime, datetime]]
+    ) -> List[Optional[float]]:
+        """
+        获取单个站点在多个时间段的能耗，返回顺序与 periods 一致
+
+        每个时刻只读取一个窗口，相邻时间段共用边界读数（见 fetch_period_snapshots），
+        用于同比/环比等多区间对比；获取失败的时间段为 None。
+        """
+        results = await self.get_station_period_device_consumptions(station, periods)
+        return [
+            round(sum(devices.values()), 2) if devices else None for devices in results
+        ]
 
-        loop = asyncio.get_running_loop()
-        end_data = await loop.run_in_executor(
-            None, self._fetch_select_his_data, api_url, end_obj
+    async def get_station_period_device_consumptions(
+        self,
+        station: Dict[str, Any],
+        periods: List[Tuple[datetime, datetime]],
+        start_boundaries: Iterable[datetime] = (),
+    ) -> List[Optional[Dict[str, float]]]:
+        """
+        获取单个站点在多个时间段内各设备（dataCode）的能耗；获取失败的时间段为 None
+
+        start_boundaries 中的时刻作为止点时与后续时间段共用起码窗口（见 fetch_period_snapshots）。
+        """
+        station_name = station.get("name", "未知站点")
+        station_ip = station.get("ip")
+        jieneng_config = (
+            self._get_jieneng_config(station.get("line", "未知线路"), station_name)
+            if station_ip
+            else None
         )
+        if not jieneng_config:
+            logger.error("❌ [%s] 站点缺少IP地址或节能数据配置", station_name)
+            return [None] * len(periods)
 
-        if not end_data:
-            logger.error("❌ [%s] 获取结束时间电表读数失败", station_name)
-            return None
+        object_codes = jieneng_config.get("object_codes", [])
+        data_codes = jieneng_config.get("data_codes", [])
+        if not object_codes or not data_codes:
+            logger.error("❌ [%s] 节能配置不完整", station_name)
+            return [None] * len(periods)
 
-        # 获取开始时间的电表读数（起码）
-        # 参考export_service.py第200-210行
-        start_obj = {
-            "dataCodes": data_codes,
-            "endTime": start_timestamp + 3 * 60000,  # 3分钟后
-            "fill": "0",
-            "funcName": "mean",
-            "funcTime": "",
-            "measurement": "realData",
-            "objectCodes": object_codes,
-            "startTime": start_timestamp,
-        }
+        try:
+            snapshots = await fetch_period_snapshots(
+                self._fetch_select_his_data,
+                self._get_station_api_url(station_ip),
+                object_codes,
+                data_codes,
+                periods,
+                store=get_meter_reading_store(),
+                start_boundaries=start_boundaries,
+            )
+        except Exception as exc:
+            logger.error(
+                "❌ [%s] 获取能耗异常: %s (类型: %s)", station_name, str(exc), type(exc).__name__
+            )
+            return [None] * len(periods)
+
+        return [
+            self._device_consumptions_from_snapshot(snapshot, object_codes, data_codes, station_name)
+            for snapshot in snapshots
+        ]
 
-        start_data = await loop.run_in_executor(
-            None, self._fetch_select_his_data, api_url, start_obj
+    def _consumption_from_snapshot(
+        self,
+        snapshot: MeterBoundarySnapshot,
+        object_codes: List[str],
+        data_codes: List[str],
+        station_name: str = "未知站点",
+    ) -> Optional[float]:
+        """由起止码快照计算能耗（止码 - 起码，差值小于 -1 视为电表异常）"""
+        device_consumptions = self._device_consumptions_from_snapshot(
+            snapshot, object_codes, data_codes, station_name
         )
+        if device_consumptions:
+            total_consumption = sum(device_consumptions.values())
+            logger.info(
+                "📊 [%s] 能耗计算完成 - 有效设备数: %d/%d, 总能耗: %.2f kWh",
+                station_name,
+                len(device_consumptions),
+                len(data_codes),
+                total_consumption,
+            )
+            return round(total_consumption, 2)
+        if device_consumptions is not None:
+            logger.warning("⚠️ [%s] 没有有效的能耗数据", station_name)
+        return None
 
-        if not start_data:
+    def _device_consumptions_from_snapshot(
+        self,
+        snapshot: MeterBoundarySnapshot,
+        object_codes: List[str],
+        data_codes: List[str],
+        station_name: str = "未知站点",
+    ) -> Optional[Dict[str, float]]:
+        """按设备（dataCode）计算能耗；起码或止码整体缺失时返回 None，读数异常的设备不计入结果"""
+        if not snapshot.end_data:
+            logger.error("❌ [%s] 获取结束时间电表读数失败", station_name)
+            return None
+
+        if not snapshot.start_data:
             logger.error("❌ [%s] 获取开始时间电表读数失败", station_name)
             return None
 
-        # 计算总能耗
         # 参考export_service.py第218-230行的逻辑
-        total_consumption = 0.0
-        valid_count = 0
+        device_consumptions: Dict[str, float] = {}
 
         for data_code in data_codes:
             for object_code in object_codes:
-                # 查找匹配的起始和结束读数
-                start_entry = next(
-                    (
-                        item
-                        for item in start_data
-                        if item.get("tags", {}).get("dataCode") == data_code
-                        and item.get("tags", {}).get("objectCode") == object_code
-                    ),
-                    None,
-                )
-                end_entry = next(
-                    (
-                        item
-                        for item in end_data
-                        if item.get("tags", {}).get("dataCode") == data_code
-                        and item.get("tags", {}).get("objectCode") == object_code
-                    ),
-                    None,
-                )
-
-                if not start_entry or not end_entry:
+                readings = snapshot.readings(data_code, object_code)
+                if readings is None:
                     continue
 
-                start_values = start_entry.get("values", [])
-                end_values = end_entry.get("values", [])
-                if not start_values or not end_values:
-                    continue
-
-                start_reading = self._safe_float(start_values[0].get("value"))
-                end_reading = self._safe_float(end_values[0].get("value"))
+                start_raw, end_raw = readings
+                start_reading = self._safe_float(start_raw)
+                end_reading = self._safe_float(end_raw)
                 if start_reading is None or end_reading is None:
                     logger.warning(
                         "⚠️ [%s] 设备 %s/%s 读数无法解析: start=%s, end=%s",
                         station_name,
                         data_code,
                         object_code,
-                        start_values[0].get("value"),
-                        end_values[0].get("value"),
+                        start_raw,
+                        end_raw,
                     )
                     continue
 
@@ -305,8 +344,7 @@ class RealtimeEnergyService:
                 difference = end_reading - start_reading
                 if difference >= -1:
                     consumption = round(difference, 2)
-                    total_consumption += consumption
-                    valid_count += 1
+                    device_consumptions[data_code] = consumption
                     logger.debug(
                         "📊 [%s] 设备 %s/%s: 起码=%.2f, 止码=%.2f, 耗电=%.2f kWh",
                         station_name,
@@ -329,26 +367,13 @@ class RealtimeEnergyService:
                 # 找到匹配的就跳出object_code循环
                 break
 
-        if valid_count > 0:
-            logger.info(
-                "📊 [%s] 能耗计算完成 - 有效设备数: %d/%d, 总能耗: %.2f kWh",
-                station_name,
-                valid_count,
-                len(data_codes),
-                total_consumption,
-            )
-            return round(total_consumption, 2)
-        logger.warning("⚠️ [%s] 没有有效的能耗数据", station_name)
-        return None
+        return device_consumptions
 
     def check_data_availability(self, station: Dict[str, Any]) -> bool:
         """
         检查站点是否能获取到真实数据
         返回True表示配置正确且可能获取到真实数据，False表示必定使用模拟数据
         """
-        if not self.requests_available:
-            return False
-
         station_ip = station.get("ip")
         if not station_ip:
             return False
@@ -367,11 +392,8 @@ class RealtimeEnergyService:
         self, api_url: str, object_codes: List[str], data_codes: List[str]
     ) -> Optional[float]:
         """查询最近10分钟的功率平均值"""
-        loop = asyncio.get_running_loop()
         payload = self._build_select_payload(object_codes, data_codes)
-        data = await loop.run_in_executor(
-            None, self._fetch_select_his_data, api_url, payload
-        )
+        data = await self._fetch_select_his_data(api_url, payload)
         if not data:
             return None
         return self._aggregate_power_from_data(data)
@@ -395,7 +417,7 @@ class RealtimeEnergyService:
             "startTime": start_timestamp,
         }
 
-    def _fetch_select_his_data(
+    async def _fetch_select_his_data(
         self, api_url: str, payload: Dict[str, Any]
     ) -> Optional[List[Dict[str, Any]]]:
         """调用selectHisData接口并返回数据"""
@@ -412,17 +434,16 @@ class RealtimeEnergyService:
         )
 
         try:
-            response = requests.post(  # type: ignore[union-attr]
-                endpoint,
-                json=payload,
-                timeout=5.0,
+            started = time.monotonic()
+            response = await get_station_client().select_his_data(
+                api_url, payload, timeout=SELECT_HIS_DATA_TIMEOUT
             )
 
             logger.debug(
                 "📥 API响应 - URL: %s, 状态码: %d, 响应时间: %.2fs",
                 endpoint,
                 response.status_code,
-                response.elapsed.total_seconds(),
+                time.monotonic() - started,
             )
 
             if response.status_code != 200:
@@ -444,20 +465,20 @@ class RealtimeEnergyService:
             logger.info("✅ API请求成功 - URL: %s, 返回数据条数: %d", endpoint, len(data))
             return data
 
-        except requests.Timeout:  # type: ignore[attr-defined]
+        except httpx.TimeoutException:
             logger.error(
                 "❌ API请求超时(>5s) - URL: %s, " "可能原因: 1) 网络延迟 2) 站点服务响应慢 3) 数据量过大",
                 endpoint,
             )
             return None
-        except requests.ConnectionError as exc:  # type: ignore[attr-defined]
+        except httpx.TransportError as exc:
             logger.error(
                 "❌ API连接失败 - URL: %s, 错误: %s, " "可能原因: 1) 站点IP不可达 2) 端口9898未开放 3) 网络故障",
                 endpoint,
                 str(exc),
             )
             return None
-        except requests.RequestException as exc:  # type: ignore[attr-defined]
+        except httpx.HTTPError as exc:
             logger.error(
                 "❌ API请求异常 - URL: %s, 错误类型: %s, 错误信息: %s",
                 endpoint,
@@ -509,32 +530,25 @@ class RealtimeEnergyService:
         而不是jienengfeijieneng节点（该节点仅用于获取节能状态）
         """
         try:
-            from config_electricity import line_configs
-
-            line_config = line_configs.get(line_code)
-            if not line_config:
-                return None
-
-            station_config = line_config.get(station_name)
-            if not station_config:
-                return None
-
-            # 使用data_codes和object_codes数组，而不是jienengfeijieneng节点
-            # 这样可以与导出功能保持一致，获取所有设备的实时功率
-            data_codes = station_config.get("data_codes", [])
-            object_codes = station_config.get("object_codes", [])
-
-            if not data_codes or not object_codes:
-                logger.warning(
-                    "站点 %s (线路 %s) 缺少data_codes或object_codes配置", station_name, line_code
-                )
-                return None
-
-            return {"data_codes": data_codes, "object_codes": object_codes}
-
-        except Exception as exc:
+            station_config = get_station_registry().by_name(line_code, station_name)
+        except Exception as exc:  # pragma: no cover - 配置导入异常
             logger.error("获取节能配置失败: %s", exc)
             return None
+        if station_config is None:
+            return None
+
+        # 使用data_codes和object_codes数组，而不是jienengfeijieneng节点
+        # 这样可以与导出功能保持一致，获取所有设备的实时功率
+        if not station_config.data_codes or not station_config.object_codes:
+            logger.warning(
+                "站点 %s (线路 %s) 缺少data_codes或object_codes配置", station_name, line_code
+            )
+            return None
+
+        return {
+            "data_codes": list(station_config.data_codes),
+            "object_codes": list(station_config.object_codes),
+        }
 
     async def get_multiple_stations_power(
         self, stations: List[Dict[str, Any]]
@@ -557,46 +571,37 @@ class RealtimeEnergyService:
     ) -> Optional[Tuple[str, List[str], List[str], List[Dict[str, Any]]]]:
         """解析站点配置，返回 (api_url, object_codes, data_codes, data_list)"""
         station_ip = station.get("ip")
-        line_code = station.get("line")
-        station_name = station.get("name")
-
         if not station_ip:
             return None
 
         try:
-            from config_electricity import line_configs
+            station_config = get_station_registry().by_name(
+                station.get("line"), station.get("name")
+            )
         except Exception as exc:  # pragma: no cover - 配置导入异常
             logger.error("导入配置失败: %s", exc)
             return None
-
-        line_config = line_configs.get(line_code)
-        if not line_config:
-            return None
-
-        station_config = line_config.get(station_name)
-        if not station_config:
+        if station_config is None:
             return None
-
-        object_codes = station_config.get("object_codes", [])
-        data_codes = station_config.get("data_codes", [])
-        data_list = station_config.get("data_list", [])
-        if not object_codes or not data_codes:
+        if not station_config.object_codes or not station_config.data_codes:
             return None
 
         return (
             self._get_station_api_url(station_ip),
-            object_codes,
-            data_codes,
-            data_list,
+            list(station_config.object_codes),
+            list(station_config.data_codes),
+            station_config.data_list,
         )
 
     async def get_station_device_powers(
         self, station: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """获取站点所有设备的实时功率"""
-        if not self.requests_available:
-            return []
+        """
+        获取站点所有设备的实时功率
 
+        所有设备的 dataCode 合并为一次 selectHisData 查询，按 (objectCode, dataCode) 索引结果，
+        未返回数据的设备标记为离线。
+        """
         resolved = self._resolve_station_config(station)
         if not resolved:
             return []
@@ -606,15 +611,16 @@ class RealtimeEnergyService:
         if not object_code:
             return []
 
-        max_queries = min(len(data_codes), 20)
-        device_powers: List[Dict[str, Any]] = []
+        payload = self._build_select_payload([object_code], list(data_codes))
+        index = HisDataIndex(await self._fetch_select_his_data(api_url, payload))
 
-        for index, data_code in enumerate(data_codes[:max_queries]):
-            device_name = self._build_device_name(index, data_list)
-            power = await self._query_recent_power(api_url, [object_code], [data_code])
+        device_powers: List[Dict[str, Any]] = []
+        for device_index, data_code in enumerate(data_codes):
+            values = index.values(object_code, data_code)
+            power = self._safe_float(values[-1].get("value")) if values else None
             device_powers.append(
                 {
-                    "device_name": device_name,
+                    "device_name": self._build_device_name(device_index, data_list),
                     "data_code": data_code,
                     "object_code": object_code,
                     "power": power if power is not None else 0.0,
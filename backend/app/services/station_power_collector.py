@@ -0,0 +1,139 @@
+"""
+站点功率后台采集
+
+按固定周期轮询所有已配置站点的实时总功率（并发数受限），采样写入每个站点的环形缓冲区，
+实时监控接口直接读取内存中的数据，站点请求量不再随看板访问量线性增长。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.app.config.electricity_config import ElectricityConfig
+from backend.app.services.realtime_energy_service import RealtimeEnergyService
+from backend.app.utils.power_ring_buffer import PowerRingBuffer
+
+logger = logging.getLogger(__name__)
+
+# 内存中保留的小时数
+POWER_COLLECTOR_RETENTION_HOURS = int(os.environ.get("POWER_COLLECTOR_RETENTION_HOURS", "24"))
+# 同时轮询的站点数上限
+POWER_COLLECTOR_MAX_CONCURRENT = int(os.environ.get("POWER_COLLECTOR_MAX_CONCURRENT", "8"))
+
+
+def _configured_interval() -> float:
+    """轮询周期（秒）取配置 cache.power_collector_interval，默认 0 即不启用后台采集"""
+    from backend.app.core.config import get_config
+
+    try:
+        return float(get_config().get("cache.power_collector_interval") or 0)
+    except Exception as exc:
+        logger.warning("读取站点功率采集配置失败，后台采集不启用: %s", exc)
+        return 0.0
+
+
+class StationPowerCollector:
+    """站点功率后台采集器"""
+
+    def __init__(
+        self,
+        realtime_service: Optional[RealtimeEnergyService] = None,
+        interval: Optional[float] = None,
+        retention_hours: int = POWER_COLLECTOR_RETENTION_HOURS,
+        max_concurrent: int = POWER_COLLECTOR_MAX_CONCURRENT,
+    ) -> None:
+        self.realtime_service = realtime_service or RealtimeEnergyService()
+        self.electricity_config = ElectricityConfig()
+        self.interval = interval if interval is not None else _configured_interval()
+        self.retention_hours = retention_hours
+        self.max_concurrent = max(1, max_concurrent)
+        self._buffers: Dict[str, PowerRingBuffer] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def capacity(self) -> int:
+        """每个站点缓冲区的采样数"""
+        return max(1, int(self.retention_hours * 3600 / max(self.interval, 1)))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _buffer(self, station_ip: str) -> PowerRingBuffer:
+        buffer = self._buffers.get(station_ip)
+        if buffer is None:
+            buffer = self._buffers[station_ip] = PowerRingBuffer(self.capacity)
+        return buffer
+
+    async def poll_once(self, stations: Optional[List[Dict[str, Any]]] = None) -> int:
+        """轮询一次所有站点，返回成功采样的站点数"""
+        stations = stations if stations is not None else self.electricity_config.get_all_stations()
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def poll(station):
+            async with semaphore:
+                try:
+                    return station, await self.realtime_service.get_station_realtime_power(station)
+                except Exception as exc:
+                    logger.warning("站点功率采集失败 [%s]: %s", station.get("name"), exc)
+                    return station, None
+
+        polled = await asyncio.gather(*[poll(s) for s in stations if s.get("ip")])
+        timestamp = time.time()
+        collected = 0
+        for station, power in polled:
+            if power is not None:
+                self._buffer(station["ip"]).append(timestamp, power)
+                collected += 1
+        return collected
+
+    async def run(self) -> None:
+        """按周期轮询，直到任务被取消"""
+        logger.info(
+            "站点功率采集已启动：间隔 %.0f 秒，保留 %d 小时", self.interval, self.retention_hours
+        )
+        while True:
+            started = time.monotonic()
+            try:
+                collected = await self.poll_once()
+                logger.debug("站点功率采集完成: %d 个站点", collected)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("站点功率采集异常: %s", exc)
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self) -> None:
+        """在当前事件循环启动后台采集"""
+        if self.interval > 0 and not self.running:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def latest(self, station_ip: str, max_age: Optional[float] = None) -> Optional[float]:
+        """
+        站点最近一次采集的功率
+
+        max_age 默认为 3 个采集周期；采样过旧或没有采样时返回 None，由调用方实时查询。
+        """
+        buffer = self._buffers.get(station_ip)
+        sample = buffer.latest() if buffer is not None else None
+        if sample is None:
+            return None
+        max_age = max_age if max_age is not None else 3 * self.interval
+        timestamp, power = sample
+        return power if time.time() - timestamp <= max_age else None
+
+    def hourly_means(
+        self, station_ip: str, hours: int = 24, now: Optional[float] = None
+    ) -> List[Optional[float]]:
+        """截至 now 的最近 hours 个小时各自的平均功率，没有采样的小时为 None"""
+        buffer = self._buffers.get(station_ip)
+        if buffer is None:
+            return [None] * hours
+        return buffer.bucket_means(now if now is not None else time.time(), 3600, hours)
@@ -0,0 +1,202 @@
+"""
+分段拉取与断点续传
+
+长时间范围的 selectHisData 查询容易超时。这里将时间范围切分为固定长度的窗口逐段拉取，
+每完成一段就把该段结果写入磁盘检查点；任务失败或取消后重新执行时，
+已完成的分段直接从检查点读取，只拉取剩余分段。全部分段完成后检查点即被清除。
+导出任务还会以记录形式保存已完成站点的输出，续传时整站跳过；
+被放弃的任务留下的检查点目录按存放时间由 cleanup 回收。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = os.environ.get("EXPORT_CHECKPOINT_DIR", "export_checkpoints")
+DEFAULT_CHUNK = timedelta(days=float(os.environ.get("EXPORT_CHUNK_DAYS", "7")))
+# 超过该时长未更新的检查点目录视为已放弃（任务本身只保留24小时，之后无法续传）
+DEFAULT_MAX_AGE = float(os.environ.get("EXPORT_CHECKPOINT_MAX_AGE_HOURS", "24")) * 3600
+
+# fetch_chunk(start, end) -> 数据列表；失败时返回 None
+ChunkFetcher = Callable[[datetime, datetime], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+def split_time_range(
+    start_time: datetime, end_time: datetime, chunk: timedelta = DEFAULT_CHUNK
+) -> List[Tuple[datetime, datetime]]:
+    """将 [start_time, end_time] 切分为首尾相接、长度不超过 chunk 的窗口"""
+    if chunk <= timedelta(0):
+        raise ValueError("chunk 必须大于0")
+    windows = []
+    cursor = start_time
+    while cursor < end_time:
+        window_end = min(cursor + chunk, end_time)
+        windows.append((cursor, window_end))
+        cursor = window_end
+    return windows or [(start_time, end_time)]
+
+
+class ChunkCheckpointStore:
+    """以 JSON 文件保存分段结果的检查点存储：<root>/<job_key>/<index>.json"""
+
+    def __init__(self, root_dir: str = DEFAULT_CHECKPOINT_DIR) -> None:
+        self.root_dir = root_dir
+
+    @staticmethod
+    def job_key(*parts: Any) -> str:
+        """由任务参数（站点、点位、时间范围、分段长度等）生成稳定的作业键"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _job_dir(self, job_key: str) -> str:
+        return os.path.join(self.root_dir, job_key)
+
+    def load(self, job_key: str, index: int) -> Optional[List[Dict[str, Any]]]:
+        """读取分段检查点，不存在或损坏时返回 None"""
+        path = os.path.join(self._job_dir(job_key), f"{index}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("检查点损坏，将重新拉取: %s (%s)", path, exc)
+            return None
+
+    def save(self, job_key: str, index: int, data: List[Dict[str, Any]]) -> None:
+        """写入分段检查点（先写临时文件再替换，避免中断时留下半个文件）"""
+        job_dir = self._job_dir(job_key)
+        os.makedirs(job_dir, exist_ok=True)
+        path = os.path.join(job_dir, f"{index}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def completed(self, job_key: str) -> List[int]:
+        """已完成的分段下标"""
+        try:
+            names = os.listdir(self._job_dir(job_key))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].isdigit())
+
+    def clear(self, job_key: str) -> None:
+        """删除作业的全部检查点"""
+        shutil.rmtree(self._job_dir(job_key), ignore_errors=True)
+
+    def _record_path(self, job_key: str, name: Any) -> str:
+        digest = hashlib.sha1(json.dumps(name, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+        return os.path.join(self._job_dir(job_key), f"record_{digest}.json")
+
+    def save_record(self, job_key: str, name: Any, record: Dict[str, Any]) -> None:
+        """保存作业内按名称区分的记录（如已完成站点的导出结果）"""
+        path = self._record_path(job_key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load_record(self, job_key: str, name: Any) -> Optional[Dict[str, Any]]:
+        """读取记录，不存在或损坏时返回 None"""
+        try:
+            with open(self._record_path(job_key, name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cleanup(self, max_age: float = DEFAULT_MAX_AGE) -> int:
+        """删除超过 max_age 秒未更新的作业目录，返回删除数量"""
+        try:
+            entries = list(os.scandir(self.root_dir))
+        except FileNotFoundError:
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in entries:
+            try:
+                if not entry.is_dir():
+                    continue
+                # 目录 mtime 在写入新文件时更新；取目录内最新的文件时间，避免误删仍在续传的作业
+                latest = max(
+                    [entry.stat().st_mtime]
+                    + [child.stat().st_mtime for child in os.scandir(entry.path)]
+                )
+            except OSError:
+                continue
+            if latest < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info("已清理 %d 个过期的导出检查点目录", removed)
+        return removed
+
+
+def merge_series_chunks(chunks: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """按 (objectCode, dataCode) 拼接各分段的序列，序列顺序以首次出现为准；相邻分段边界上的重复采样只保留一个"""
+    merged: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for chunk in chunks:
+        for item in chunk or []:
+            tags = item.get("tags") or {}
+            key = (tags.get("objectCode"), tags.get("dataCode"))
+            values = item.get("values") or []
+            series = merged.get(key)
+            if series is None:
+                merged[key] = {**item, "values": list(values)}
+                continue
+            existing = series["values"]
+            if existing and values and existing[-1].get("time") == values[0].get("time"):
+                values = values[1:]
+            existing.extend(values)
+    return list(merged.values())
+
+
+async def fetch_in_chunks(
+    fetch_chunk: ChunkFetcher,
+    start_time: datetime,
+    end_time: datetime,
+    store: ChunkCheckpointStore,
+    job_key: str,
+    chunk: timedelta = DEFAULT_CHUNK,
+    should_continue: Optional[Callable[[], bool]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    分段拉取并合并结果
+
+    任一分段失败或 should_continue() 返回 False 时返回 None，已完成分段的检查点保留以便续传；
+    全部完成后返回合并后的序列并清除检查点。
+    """
+    windows = split_time_range(start_time, end_time, chunk)
+    chunks: List[List[Dict[str, Any]]] = []
+    resumed = 0
+    for index, (window_start, window_end) in enumerate(windows):
+        data = store.load(job_key, index)
+        if data is not None:
+            resumed += 1
+        else:
+            if should_continue is not None and not should_continue():
+                logger.info("分段拉取已中止: %s, 完成 %d/%d", job_key, index, len(windows))
+                return None
+            data = await fetch_chunk(window_start, window_end)
+            if data is None:
+                logger.warning(
+                    "分段 %d/%d 拉取失败 (%s ~ %s)，已完成的分段保留检查点",
+                    index + 1, len(windows), window_start, window_end,
+                )
+                return None
+            if len(windows) > 1:
+                store.save(job_key, index, data)
+        chunks.append(data)
+
+    if resumed:
+        logger.info("断点续传: %s 复用 %d/%d 个分段", job_key, resumed, len(windows))
+    store.clear(job_key)
+    return merge_series_chunks(chunks) if len(chunks) > 1 else chunks[0]
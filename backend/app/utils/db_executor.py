@@ -0,0 +1,65 @@
+"""
+数据库专用线程池
+
+pymysql 是同步驱动，直接在 async 接口中调用会阻塞整个事件循环。这里把同步数据库调用
+放到一个有上限的专用线程池中执行，并按主机限制同时占用的线程数：某个车站数据库变慢时，
+最多占住 max_per_host 个线程，其他主机的查询和事件循环上的其他请求不受影响。
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 默认参数，可通过环境变量覆盖
+DEFAULT_MAX_WORKERS = int(os.environ.get("DB_EXECUTOR_MAX_WORKERS", "16"))
+DEFAULT_MAX_PER_HOST = int(os.environ.get("DB_EXECUTOR_MAX_PER_HOST", "4"))
+
+
+class DatabaseExecutor:
+    """按主机限流的数据库线程池"""
+
+    def __init__(
+        self, max_workers: int = DEFAULT_MAX_WORKERS, max_per_host: int = DEFAULT_MAX_PER_HOST
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, min(max_per_host, self.max_workers))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # asyncio.Semaphore 绑定事件循环，按循环分别维护 {主机: Semaphore}
+        self._semaphores: "weakref.WeakKeyDictionary[Any, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="db"
+            )
+        return self._executor
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = per_loop.get(host)
+        if semaphore is None:
+            semaphore = per_loop[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+    async def run(self, host: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行 func(*args, **kwargs)，同一主机同时最多 max_per_host 个"""
+        async with self._semaphore(host):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), functools.partial(func, *args, **kwargs)
+            )
+
+    def shutdown(self) -> None:
+        """关闭线程池（不等待执行中的任务），之后的调用会重新创建线程池"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
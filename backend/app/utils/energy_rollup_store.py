@@ -0,0 +1,239 @@
+"""
+能耗小时/日汇总存储
+
+按 (站点, 设备 dataCode, 粒度, 时间桶) 保存预先计算好的电耗（kWh），趋势接口直接读取汇总结果，
+不必在每次请求时逐段扫描站点历史数据。小时汇总由电表起止码差值得到，日汇总由当天的小时汇总累加。
+energy_rollup_hours 记录已完成汇总的小时，回填任务据此跳过已完成部分，失败的小时下次重试。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+HOUR = "hour"
+DAY = "day"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS energy_rollup (
+        granularity TEXT NOT NULL,
+        station TEXT NOT NULL,
+        bucket_ms INTEGER NOT NULL,
+        device TEXT NOT NULL,
+        kwh REAL NOT NULL,
+        PRIMARY KEY (granularity, station, bucket_ms, device)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS energy_rollup_hours (
+        station TEXT NOT NULL,
+        bucket_ms INTEGER NOT NULL,
+        PRIMARY KEY (station, bucket_ms)
+    )
+    """,
+)
+
+
+def to_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class EnergyRollupStore:
+    """基于 SQLite 的能耗汇总存储"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def completed_hours(self, station: str, start_time: datetime, end_time: datetime) -> set:
+        """[start_time, end_time) 内已完成汇总的小时（毫秒时间戳）"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT bucket_ms FROM energy_rollup_hours "
+                "WHERE station = ? AND bucket_ms >= ? AND bucket_ms < ?",
+                (station, to_ms(start_time), to_ms(end_time)),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def save_hours(self, station: str, hours: Iterable[Tuple[datetime, Dict[str, float]]]) -> None:
+        """
+        写入若干小时的设备电耗，并重新计算涉及日期的日汇总
+
+        hours 为 (小时起点, {设备: kWh}) 序列；同一小时重复写入时覆盖旧值。
+        """
+        hours = list(hours)
+        if not hours:
+            return
+        hour_rows = []
+        marker_rows = []
+        days = set()
+        for hour_start, devices in hours:
+            bucket_ms = to_ms(hour_start)
+            marker_rows.append((station, bucket_ms))
+            hour_rows.extend(
+                (HOUR, station, bucket_ms, device, kwh) for device, kwh in devices.items()
+            )
+            days.add(floor_day(hour_start))
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "DELETE FROM energy_rollup WHERE granularity = ? AND station = ? AND bucket_ms = ?",
+                [(HOUR, station, bucket_ms) for _, bucket_ms in marker_rows],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO energy_rollup "
+                "(granularity, station, bucket_ms, device, kwh) VALUES (?, ?, ?, ?, ?)",
+                hour_rows,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO energy_rollup_hours (station, bucket_ms) VALUES (?, ?)",
+                marker_rows,
+            )
+            for day in days:
+                day_ms, next_day_ms = to_ms(day), to_ms(day + timedelta(days=1))
+                conn.execute(
+                    "DELETE FROM energy_rollup "
+                    "WHERE granularity = ? AND station = ? AND bucket_ms = ?",
+                    (DAY, station, day_ms),
+                )
+                conn.execute(
+                    "INSERT INTO energy_rollup (granularity, station, bucket_ms, device, kwh) "
+                    "SELECT ?, station, ?, device, SUM(kwh) FROM energy_rollup "
+                    "WHERE granularity = ? AND station = ? AND bucket_ms >= ? AND bucket_ms < ? "
+                    "GROUP BY device",
+                    (DAY, day_ms, HOUR, station, day_ms, next_day_ms),
+                )
+
+    def _covered(
+        self, conn: sqlite3.Connection, stations: List[str], granularity: str,
+        start_time: datetime, end_time: datetime,
+    ) -> Dict[int, Set[str]]:
+        """每个时间桶已完整汇总的站点：小时桶需有完成标记，日桶需当天每个小时都有完成标记"""
+        placeholders = ",".join("?" for _ in stations)
+        rows = conn.execute(
+            "SELECT station, bucket_ms FROM energy_rollup_hours "
+            f"WHERE station IN ({placeholders}) AND bucket_ms >= ? AND bucket_ms < ?",
+            [*stations, to_ms(start_time), to_ms(end_time)],
+        ).fetchall()
+        covered: Dict[int, Set[str]] = {}
+        if granularity == HOUR:
+            for station, bucket_ms in rows:
+                covered.setdefault(bucket_ms, set()).add(station)
+            return covered
+
+        hours_per_day: Dict[Tuple[str, int], int] = {}
+        for station, bucket_ms in rows:
+            day_ms = to_ms(floor_day(datetime.fromtimestamp(bucket_ms / 1000)))
+            hours_per_day[(station, day_ms)] = hours_per_day.get((station, day_ms), 0) + 1
+        for (station, day_ms), count in hours_per_day.items():
+            day = datetime.fromtimestamp(day_ms / 1000)
+            if count * 3600_000 >= to_ms(day + timedelta(days=1)) - day_ms:
+                covered.setdefault(day_ms, set()).add(station)
+        return covered
+
+    def series_by_station(
+        self,
+        stations: List[str],
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime,
+        device: Optional[str] = None,
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        按时间桶、站点返回电耗 {桶起点毫秒: {站点: kWh}}
+
+        只包含该桶已完整汇总的站点；站点已完成汇总但没有所选设备时记为 0。
+        """
+        stations = list(dict.fromkeys(stations))
+        if not stations:
+            return {}
+        placeholders = ",".join("?" for _ in stations)
+        sql = (
+            "SELECT bucket_ms, station, SUM(kwh) FROM energy_rollup "
+            f"WHERE granularity = ? AND station IN ({placeholders}) "
+            "AND bucket_ms >= ? AND bucket_ms < ?"
+        )
+        params: list = [granularity, *stations, to_ms(start_time), to_ms(end_time)]
+        if device is not None:
+            sql += " AND device = ?"
+            params.append(device)
+        sql += " GROUP BY bucket_ms, station"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+            covered = self._covered(conn, stations, granularity, start_time, end_time)
+        values = {(row[0], row[1]): row[2] for row in rows}
+        return {
+            bucket_ms: {station: values.get((bucket_ms, station), 0.0) for station in bucket_stations}
+            for bucket_ms, bucket_stations in covered.items()
+        }
+
+    def series(
+        self,
+        stations: List[str],
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime,
+        device: Optional[str] = None,
+    ) -> Dict[int, float]:
+        """
+        按时间桶汇总多个站点（可选单个设备）的电耗，返回 {桶起点毫秒: kWh}
+
+        只返回所有站点都已完整汇总的桶，部分站点缺失的桶不出现，避免把部分合计当作总量。
+        """
+        wanted = set(stations)
+        return {
+            bucket_ms: sum(per_station.values())
+            for bucket_ms, per_station in self.series_by_station(
+                stations, granularity, start_time, end_time, device
+            ).items()
+            if wanted and wanted.issubset(per_station)
+        }
+
+
+_store: Optional[EnergyRollupStore] = None
+_store_lock = threading.Lock()
+
+
+def get_energy_rollup_store() -> Optional[EnergyRollupStore]:
+    """按配置 cache.energy_rollup_path 返回共享存储；未配置时返回 None（不启用）"""
+    global _store
+    if _store is not None:
+        return _store
+    from backend.app.core.config import get_config
+
+    path = get_config().get("cache.energy_rollup_path")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = EnergyRollupStore(path)
+                logger.info("能耗汇总存储已启用: %s", path)
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("能耗汇总存储初始化失败，趋势数据实时计算: %s", exc)
+                return None
+        return _store
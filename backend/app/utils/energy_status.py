@@ -0,0 +1,66 @@
+"""
+节能状态游程编码
+
+将站点节能/非节能状态采样序列压缩为 [开始时间, 结束时间, 状态] 区间：
+- 空值（'' / None）不触发状态切换，首个采样无论取值都作为第一个区间的起点
+- 只对区间边界的时间戳做一次批量解析，而不是逐采样 strptime/strftime
+- 支持任意数量的子系统序列（如8号线水系统、风系统分开）
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TIME_INPUT_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+TIME_OUTPUT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _run_starts(raw: np.ndarray) -> np.ndarray:
+    """返回每个状态区间起点在原序列中的下标"""
+    # object 数组上的逐元素比较由 numpy 整列完成，不再逐个采样走 Python 循环
+    valid = np.not_equal(raw, "") & np.not_equal(raw, None)
+    valid[0] = True
+    kept_idx = np.flatnonzero(valid)
+    kept = raw[kept_idx]
+    changed = np.ones(len(kept), dtype=bool)
+    changed[1:] = np.not_equal(kept[1:], kept[:-1])
+    return kept_idx[changed]
+
+
+def encode_status_runs(values: Sequence[Dict[str, Any]], system: str = "") -> List[Dict[str, str]]:
+    """对单个子系统的采样序列做游程编码"""
+    if not values:
+        return []
+
+    # 以 object 类型整列提取，避免 pandas 把 None 转成 NaN、把 1/0 转成数值列
+    frame = pd.DataFrame(values, columns=["time", "value"], dtype=object)
+    raw = frame["value"].to_numpy()
+    starts = _run_starts(raw)
+
+    # 区间 k 的结束时间为区间 k+1 的开始时间，最后一个区间以最后一个采样结束
+    boundary_idx = np.append(starts, len(raw) - 1)
+    boundary_times = (
+        pd.to_datetime(frame["time"].iloc[boundary_idx], format=TIME_INPUT_FORMAT)
+        .dt.strftime(TIME_OUTPUT_FORMAT)
+        .tolist()
+    )
+    saving = (raw[starts] == 1).tolist()
+
+    return [
+        {
+            "开始时间": boundary_times[k],
+            "结束时间": boundary_times[k + 1],
+            "节能状态": "节能" if saving[k] else "非节能",
+            "系统": system,
+        }
+        for k in range(len(starts))
+    ]
+
+
+def encode_status_series(series: Iterable[Tuple[str, Sequence[Dict[str, Any]]]]) -> List[Dict[str, str]]:
+    """按顺序编码多个 (系统名称, 采样序列)，结果依次拼接"""
+    status_list: List[Dict[str, str]] = []
+    for system, values in series:
+        status_list.extend(encode_status_runs(values, system))
+    return status_list
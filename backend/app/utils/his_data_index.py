@@ -0,0 +1,41 @@
+"""
+selectHisData 结果索引
+
+接口返回的每个序列带有 tags.objectCode / tags.dataCode。按点位查找时，
+先对整份结果建一次 (objectCode, dataCode) 哈希索引，避免对每个点位线性扫描结果列表。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PointKey = Tuple[Optional[str], Optional[str]]
+
+
+class HisDataIndex:
+    """按 (objectCode, dataCode) 索引的 selectHisData 结果"""
+
+    __slots__ = ("_entries",)
+
+    def __init__(self, data: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+        self._entries: Dict[PointKey, Dict[str, Any]] = {}
+        for item in data or ():
+            tags = item.get("tags") or {}
+            key = (tags.get("objectCode"), tags.get("dataCode"))
+            # 与原先 next(...) 的语义一致：重复点位取第一条
+            self._entries.setdefault(key, item)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def get(self, object_code: str, data_code: str) -> Optional[Dict[str, Any]]:
+        """返回指定点位的序列，不存在时返回 None"""
+        return self._entries.get((object_code, data_code))
+
+    def values(self, object_code: str, data_code: str) -> List[Dict[str, Any]]:
+        """返回指定点位的 values 列表，不存在时返回空列表"""
+        entry = self._entries.get((object_code, data_code))
+        if entry is None:
+            return []
+        return entry.get("values") or []
@@ -0,0 +1,215 @@
+"""
+电表历史读数本地存储
+
+起码/止码是某个历史时刻附近窗口的均值，一旦该时刻足够久远就不会再变化。
+这里把站点返回的读数按 (站点, objectCode, dataCode, 窗口类型, 边界时间) 存入本地 SQLite，
+导出、同比/环比和分类统计再次用到同一时刻的读数时直接读取本地数据，
+只有本地缺失的点位才请求站点（read-through）。
+
+只保存站点实际返回的点位：某个点位在窗口定型时仍缺失，可能是站点稍后才补录，
+因此缺失的点位每次都回源站点（只请求缺失部分），不会被本地存储永久固化为空。
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.app.utils.his_data_index import HisDataIndex
+
+logger = logging.getLogger(__name__)
+
+# 窗口结束后超过该时长才视为已定型，可写入本地存储（避免缓存站点尚未补录完整的数据）
+DEFAULT_SETTLE_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meter_readings (
+    station TEXT NOT NULL,
+    object_code TEXT NOT NULL,
+    data_code TEXT NOT NULL,
+    window TEXT NOT NULL,
+    boundary_ms INTEGER NOT NULL,
+    value,
+    sample_time TEXT,
+    PRIMARY KEY (station, window, boundary_ms, object_code, data_code)
+)
+"""
+
+HisDataFetcher = Callable[[str, Dict[str, Any]], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+class MeterReadingStore:
+    """基于 SQLite 的电表读数存储"""
+
+    def __init__(self, path: str, settle_seconds: float = DEFAULT_SETTLE_SECONDS) -> None:
+        self.path = path
+        self.settle_seconds = settle_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def is_settled(self, window_end_ms: int) -> bool:
+        """窗口结束时间是否已足够久远"""
+        return window_end_ms <= (time.time() - self.settle_seconds) * 1000
+
+    def lookup_partial(
+        self,
+        station: str,
+        window: str,
+        boundary_ms: int,
+        object_codes: List[str],
+        data_codes: List[str],
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+        """
+        读取某个窗口的读数，返回 (已入库点位的序列, 未入库的 (objectCode, dataCode) 列表)
+
+        序列格式与 selectHisData 返回的一致。
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT object_code, data_code, value, sample_time FROM meter_readings "
+                "WHERE station = ? AND window = ? AND boundary_ms = ?",
+                (station, window, boundary_ms),
+            ).fetchall()
+        stored = {(row[0], row[1]): row for row in rows}
+
+        data = []
+        missing = []
+        for object_code in object_codes:
+            for data_code in data_codes:
+                row = stored.get((object_code, data_code))
+                if row is None:
+                    missing.append((object_code, data_code))
+                    continue
+                data.append({
+                    "tags": {"objectCode": object_code, "dataCode": data_code},
+                    "values": [{"time": row[3], "value": row[2]}],
+                })
+        return data, missing
+
+    def lookup(
+        self,
+        station: str,
+        window: str,
+        boundary_ms: int,
+        object_codes: List[str],
+        data_codes: List[str],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """读取某个窗口的读数；请求的点位只要有一个未入库就返回 None"""
+        if not object_codes or not data_codes:
+            return None
+        data, missing = self.lookup_partial(station, window, boundary_ms, object_codes, data_codes)
+        return None if missing else data
+
+    def save(
+        self,
+        station: str,
+        window: str,
+        boundary_ms: int,
+        object_codes: List[str],
+        data_codes: List[str],
+        data: List[Dict[str, Any]],
+    ) -> None:
+        """保存一次窗口查询的结果；只保存站点返回了数据的点位，缺失的点位下次继续回源"""
+        index = HisDataIndex(data)
+        rows = []
+        for object_code in object_codes:
+            for data_code in data_codes:
+                values = index.values(object_code, data_code)
+                if values:
+                    first = values[0]
+                    rows.append((station, object_code, data_code, window, boundary_ms,
+                                 first.get("value"), first.get("time")))
+        if not rows:
+            return
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO meter_readings "
+                "(station, object_code, data_code, window, boundary_ms, value, sample_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    async def read_through(
+        self,
+        fetch: HisDataFetcher,
+        api_url: str,
+        payload: Dict[str, Any],
+        window: str,
+        boundary_ms: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """先查本地，缺失的点位回源站点；已定型的窗口回源成功后写入本地"""
+        object_codes = payload.get("objectCodes") or []
+        data_codes = payload.get("dataCodes") or []
+        settled = self.is_settled(payload["endTime"])
+        cached: List[Dict[str, Any]] = []
+        if settled and object_codes and data_codes:
+            try:
+                cached, missing = await asyncio.to_thread(
+                    self.lookup_partial, api_url, window, boundary_ms, object_codes, data_codes
+                )
+            except sqlite3.Error as exc:
+                logger.warning("读取本地电表读数失败，回源站点: %s", exc)
+                cached, missing = [], []
+            else:
+                if not missing:
+                    return cached
+                # 只请求缺失点位涉及的 objectCode/dataCode
+                object_codes = list(dict.fromkeys(o for o, _ in missing))
+                data_codes = list(dict.fromkeys(d for _, d in missing))
+                payload = {**payload, "objectCodes": object_codes, "dataCodes": data_codes}
+
+        data = await fetch(api_url, payload)
+        if data is None:
+            return None
+        if settled and data:
+            try:
+                await asyncio.to_thread(
+                    self.save, api_url, window, boundary_ms, object_codes, data_codes, data
+                )
+            except sqlite3.Error as exc:
+                logger.warning("保存本地电表读数失败: %s", exc)
+        if not cached:
+            return data
+        # 缺失部分的查询是 objectCode × dataCode 的组合，可能包含已从本地读取的点位
+        seen = {(item["tags"]["objectCode"], item["tags"]["dataCode"]) for item in cached}
+        return cached + [
+            item for item in data
+            if ((item.get("tags") or {}).get("objectCode"), (item.get("tags") or {}).get("dataCode")) not in seen
+        ]
+
+
+_store: Optional[MeterReadingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_meter_reading_store() -> Optional[MeterReadingStore]:
+    """按配置 cache.meter_reading_store_path 返回共享存储；未配置时返回 None（不启用）"""
+    global _store
+    if _store is not None:
+        return _store
+    from backend.app.core.config import get_config
+
+    path = get_config().get("cache.meter_reading_store_path")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = MeterReadingStore(path)
+                logger.info("电表读数本地存储已启用: %s", path)
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("电表读数本地存储初始化失败，直接请求站点: %s", exc)
+                return None
+        return _store
@@ -0,0 +1,186 @@
+"""
+电表起止码读取
+
+能耗 = 止码 - 起码。起码取查询开始后 3 分钟内的均值，止码取查询结束前 10 分钟内的均值。
+两个时间窗口互不依赖，这里并发发出两次 /data/selectHisData 请求，
+得到的起止码快照可供导出、同比/环比对比和分类统计等路径共用。
+
+同时计算多个区间（如当前、同比、环比、逐小时汇总）时，fetch_period_snapshots 每个时刻只读取一个窗口：
+某区间的起点（或调用方指定的衔接时刻）统一读起码窗口，同一时刻作为前一区间的止点时也使用这次读数，
+相邻区间首尾相接、不重不漏；只作为止点的时刻读止码窗口。区间起点的读数与单独查询时相同。
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.app.utils.his_data_index import HisDataIndex
+
+if TYPE_CHECKING:
+    from backend.app.utils.meter_reading_store import MeterReadingStore
+
+# 起码窗口：开始时间之后 3 分钟；止码窗口：结束时间之前 10 分钟
+START_WINDOW_MS = 3 * 60_000
+END_WINDOW_MS = 10 * 60_000
+
+# fetch(api_url, payload) -> 数据列表；失败时返回空列表或 None
+HisDataFetcher = Callable[[str, Dict[str, Any]], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+def _build_payload(
+    object_codes: List[str], data_codes: List[str], start_ms: int, end_ms: int
+) -> Dict[str, Any]:
+    return {
+        "dataCodes": data_codes,
+        "endTime": end_ms,
+        "fill": "0",
+        "funcName": "mean",
+        "funcTime": "",
+        "measurement": "realData",
+        "objectCodes": object_codes,
+        "startTime": start_ms,
+    }
+
+
+def build_window_payload(
+    object_codes: List[str], data_codes: List[str], boundary: datetime, window: str
+) -> Dict[str, Any]:
+    """构建某个时刻的读数窗口请求体：window 为 "start" 时取该时刻之后 3 分钟，为 "end" 时取之前 10 分钟"""
+    timestamp = int(boundary.timestamp() * 1000)
+    if window == "start":
+        return _build_payload(object_codes, data_codes, timestamp, timestamp + START_WINDOW_MS)
+    return _build_payload(object_codes, data_codes, timestamp - END_WINDOW_MS, timestamp)
+
+
+def build_boundary_payloads(
+    object_codes: List[str],
+    data_codes: List[str],
+    start_time: datetime,
+    end_time: datetime,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """构建起码、止码两个窗口的 selectHisData 请求体，返回 (start_payload, end_payload)"""
+    return (
+        build_window_payload(object_codes, data_codes, start_time, "start"),
+        build_window_payload(object_codes, data_codes, end_time, "end"),
+    )
+
+
+def plan_period_windows(
+    periods: List[Tuple[datetime, datetime]], start_boundaries: Iterable[datetime] = ()
+) -> List[Tuple[Tuple[datetime, str], Tuple[datetime, str]]]:
+    """
+    为每个区间选择起码、止码使用的窗口，返回 [((起点, 窗口类型), (止点, 窗口类型)), ...]
+
+    每个时刻只使用一个窗口：是某个区间的起点或属于 start_boundaries 的时刻读起码窗口，
+    作为止点时共用这次读数；其余止点读止码窗口。
+    """
+    starts = {start_time for start_time, _ in periods}
+    starts.update(start_boundaries)
+    return [
+        ((start_time, "start"), (end_time, "start" if end_time in starts else "end"))
+        for start_time, end_time in periods
+    ]
+
+
+def plan_boundary_windows(
+    periods: List[Tuple[datetime, datetime]], start_boundaries: Iterable[datetime] = ()
+) -> List[Tuple[datetime, str]]:
+    """计算多个区间需要读取的不同窗口 (时刻, 窗口类型)，按首次出现的顺序返回（规则见 plan_period_windows）"""
+    plan: Dict[Tuple[datetime, str], None] = {}
+    for start_window, end_window in plan_period_windows(periods, start_boundaries):
+        plan[start_window] = None
+        plan[end_window] = None
+    return list(plan)
+
+
+@dataclass
+class MeterBoundarySnapshot:
+    """一次查询区间的电表起码/止码快照"""
+
+    start_data: List[Dict[str, Any]] = field(default_factory=list)
+    end_data: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """起码与止码均已获取"""
+        return bool(self.start_data) and bool(self.end_data)
+
+    def __post_init__(self) -> None:
+        self._start_index = HisDataIndex(self.start_data)
+        self._end_index = HisDataIndex(self.end_data)
+
+    def readings(self, data_code: str, object_code: str) -> Optional[Tuple[Any, Any]]:
+        """返回指定点位的 (起码, 止码) 原始值；任一端缺失时返回 None"""
+        start_values = self._start_index.values(object_code, data_code)
+        end_values = self._end_index.values(object_code, data_code)
+        if not start_values or not end_values:
+            return None
+        return start_values[0].get("value"), end_values[0].get("value")
+
+
+async def _fetch_window(
+    fetch: HisDataFetcher,
+    api_url: str,
+    payload: Dict[str, Any],
+    window: str,
+    store: Optional["MeterReadingStore"],
+) -> Optional[List[Dict[str, Any]]]:
+    if store is None:
+        return await fetch(api_url, payload)
+    boundary_ms = payload["startTime"] if window == "start" else payload["endTime"]
+    return await store.read_through(fetch, api_url, payload, window, boundary_ms)
+
+
+async def fetch_boundary_snapshot(
+    fetch: HisDataFetcher,
+    api_url: str,
+    object_codes: List[str],
+    data_codes: List[str],
+    start_time: datetime,
+    end_time: datetime,
+    store: Optional["MeterReadingStore"] = None,
+) -> MeterBoundarySnapshot:
+    """并发获取起码、止码两个窗口的数据；传入 store 时先读本地存储，只有缺失的窗口才请求站点"""
+    start_payload, end_payload = build_boundary_payloads(
+        object_codes, data_codes, start_time, end_time
+    )
+    start_data, end_data = await asyncio.gather(
+        _fetch_window(fetch, api_url, start_payload, "start", store),
+        _fetch_window(fetch, api_url, end_payload, "end", store),
+    )
+    return MeterBoundarySnapshot(start_data=start_data or [], end_data=end_data or [])
+
+
+async def fetch_period_snapshots(
+    fetch: HisDataFetcher,
+    api_url: str,
+    object_codes: List[str],
+    data_codes: List[str],
+    periods: List[Tuple[datetime, datetime]],
+    store: Optional["MeterReadingStore"] = None,
+    start_boundaries: Iterable[datetime] = (),
+) -> List[MeterBoundarySnapshot]:
+    """
+    获取多个区间的起止码快照，返回顺序与 periods 一致
+
+    每个时刻只读取一个窗口（见 plan_period_windows），去重后并发请求；
+    start_boundaries 为需要与后续区间衔接的额外时刻（如逐小时汇总中未在本次请求的下一小时起点）。
+    """
+    start_boundaries = set(start_boundaries)
+    windows = plan_boundary_windows(periods, start_boundaries)
+    results = await asyncio.gather(*[
+        _fetch_window(
+            fetch,
+            api_url,
+            build_window_payload(object_codes, data_codes, boundary, window),
+            window,
+            store,
+        )
+        for boundary, window in windows
+    ])
+    readings = {key: data or [] for key, data in zip(windows, results)}
+    return [
+        MeterBoundarySnapshot(start_data=readings[start_window], end_data=readings[end_window])
+        for start_window, end_window in plan_period_windows(periods, start_boundaries)
+    ]
@@ -0,0 +1,234 @@
+"""
+按主机划分的 MySQL 连接池
+
+各车站数据库位于远端，建立连接（TCP + 认证握手）的耗时远大于执行一条简单查询。
+这里为每个主机维护一个有上限的连接池：
+- 借出前对空闲较久的连接做 ping 健康检查，失效的连接直接丢弃并重建
+- 空闲超过 idle_timeout 的连接在借还时被回收
+- 语句执行异常且回滚失败的连接视为损坏，不再放回池中
+- 每个主机单独统计创建、复用、丢弃、等待等指标
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认参数，可通过环境变量覆盖
+DEFAULT_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "8"))
+DEFAULT_ACQUIRE_TIMEOUT = float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))
+DEFAULT_PING_INTERVAL = float(os.environ.get("DB_POOL_PING_INTERVAL", "30"))
+
+
+class PoolTimeoutError(TimeoutError):
+    """等待可用连接超时"""
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class HostConnectionPool:
+    """单个主机的连接池"""
+
+    def __init__(
+        self,
+        host: str,
+        connect: Callable[[], Any],
+        max_size: int = DEFAULT_MAX_SIZE,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        ping_interval: float = DEFAULT_PING_INTERVAL,
+    ) -> None:
+        self.host = host
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        # 空闲连接 (连接, 归还时间)，右端为最近归还
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted = 0
+        self.health_check_failures = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def _evict_idle_locked(self, now: float) -> None:
+        # 最久未用的连接在左端
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            _close_quietly(conn)
+            self.evicted += 1
+
+    def _healthy(self, conn: Any, idle_since: float, now: float) -> bool:
+        if now - idle_since < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception as exc:
+            logger.info("数据库连接健康检查失败 [%s]: %s", self.host, exc)
+            return False
+
+    def acquire(self) -> Any:
+        """借出一个连接；池满时最多等待 acquire_timeout 秒"""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"连接池已关闭: {self.host}")
+                now = time.monotonic()
+                self._evict_idle_locked(now)
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.max_size:
+                    conn, idle_since = None, now
+                    self._in_use += 1
+                else:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeoutError(
+                            f"等待数据库连接超时: {self.host} (上限 {self.max_size})"
+                        )
+                    self.waits += 1
+                    self._cond.wait(remaining)
+                    continue
+
+            # 健康检查与建立连接都在锁外进行，不阻塞其他线程借还
+            if conn is not None:
+                if self._healthy(conn, idle_since, now):
+                    with self._cond:
+                        self.reused += 1
+                    return conn
+                _close_quietly(conn)
+                with self._cond:
+                    self.health_check_failures += 1
+                    self.discarded += 1
+            try:
+                conn = self._connect()
+            except BaseException:
+                self._release_slot()
+                raise
+            with self._cond:
+                self.created += 1
+            return conn
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """归还连接；discard 为 True 或连接池已关闭时关闭该连接"""
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self.discarded += int(discard)
+                _close_quietly(conn)
+            else:
+                now = time.monotonic()
+                self._idle.append((conn, now))
+                self._evict_idle_locked(now)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """借出连接的上下文；异常时回滚，回滚失败则丢弃该连接"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+                broken = False
+            except Exception:
+                broken = True
+            self.release(conn, discard=broken)
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self) -> int:
+        """立即回收超时的空闲连接，返回回收数量"""
+        with self._cond:
+            before = self.evicted
+            self._evict_idle_locked(time.monotonic())
+            return self.evicted - before
+
+    def close(self) -> None:
+        """关闭所有空闲连接；借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                _close_quietly(self._idle.popleft()[0])
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "host": self.host,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "evicted": self.evicted,
+                "health_check_failures": self.health_check_failures,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+            }
+
+
+class MySQLPoolManager:
+    """按主机维护连接池，connect(host) 负责建立到指定主机的新连接"""
+
+    def __init__(self, connect: Callable[[str], Any], **pool_options: Any) -> None:
+        self._connect = connect
+        self._pool_options = pool_options
+        self._pools: Dict[str, HostConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, host: str) -> HostConnectionPool:
+        pool = self._pools.get(host)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(host)
+                if pool is None:
+                    pool = HostConnectionPool(
+                        host, lambda: self._connect(host), **self._pool_options
+                    )
+                    self._pools[host] = pool
+        return pool
+
+    def connection(self, host: str):
+        return self.get_pool(host).connection()
+
+    def evict_idle(self) -> int:
+        return sum(pool.evict_idle() for pool in list(self._pools.values()))
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [pool.stats() for pool in list(self._pools.values())]
@@ -0,0 +1,74 @@
+"""
+站点功率环形缓冲区
+
+固定容量，时间戳与功率分别存放在 array('d') 中，写满后覆盖最旧的采样。
+相比保存字典列表，每个采样只占 16 字节，且不会随运行时间增长。
+"""
+
+import math
+import threading
+from array import array
+from typing import List, Optional, Tuple
+
+
+class PowerRingBuffer:
+    """按时间顺序追加的 (时间戳秒, 功率kW) 环形缓冲区"""
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于0")
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, value: float) -> None:
+        """追加一个采样，写满后覆盖最旧的采样"""
+        with self._lock:
+            self._times[self._next] = timestamp
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """最近一个采样 (时间戳, 功率)，缓冲区为空时返回 None"""
+        with self._lock:
+            if not self._size:
+                return None
+            index = (self._next - 1) % self.capacity
+            return self._times[index], self._values[index]
+
+    def since(self, start_ts: float) -> List[Tuple[float, float]]:
+        """按时间顺序返回时间戳不早于 start_ts 的采样"""
+        with self._lock:
+            first = (self._next - self._size) % self.capacity
+            samples = []
+            for offset in range(self._size):
+                index = (first + offset) % self.capacity
+                if self._times[index] >= start_ts:
+                    samples.append((self._times[index], self._values[index]))
+            return samples
+
+    def bucket_means(
+        self, end_ts: float, bucket_seconds: float, buckets: int
+    ) -> List[Optional[float]]:
+        """
+        将 end_ts 之前的 buckets 个等长时间段内的采样取平均
+
+        时间段左开右闭，最后一个时间段以 end_ts 结束；没有采样的时间段为 None。
+        """
+        start_ts = end_ts - buckets * bucket_seconds
+        sums = [0.0] * buckets
+        counts = [0] * buckets
+        for timestamp, value in self.since(start_ts):
+            if timestamp <= start_ts or timestamp > end_ts:
+                continue
+            index = min(buckets - 1, int(math.ceil((timestamp - start_ts) / bucket_seconds)) - 1)
+            sums[index] += value
+            counts[index] += 1
+        return [sums[i] / counts[i] if counts[i] else None for i in range(buckets)]
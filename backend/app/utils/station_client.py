@@ -0,0 +1,131 @@
+"""
+站点 HTTP 客户端
+
+为各车站平台接口（9898 端口 /data/selectHisData 等）提供共享的异步客户端：
+- 每个站点一个 keep-alive 连接池，同一站点的多次请求复用 TCP 连接
+- 按事件循环维护实例，导出后台线程与 FastAPI 主循环互不干扰
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+SELECT_HIS_DATA_PATH = "/data/selectHisData"
+
+# 默认参数，可通过环境变量覆盖
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_MAX_CONNECTIONS_PER_HOST = int(
+    os.environ.get("STATION_MAX_CONNECTIONS_PER_HOST", "4")
+)
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+class StationHttpClient:
+    """按站点复用连接的异步 HTTP 客户端"""
+
+    def __init__(
+        self,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.timeout = timeout
+        self.keepalive_expiry = keepalive_expiry
+        self._transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._closed = False
+
+    def _get_client(self, base_url: str) -> httpx.AsyncClient:
+        """获取（或创建）指定站点的连接池"""
+        base_url = base_url.rstrip("/")
+        client = self._clients.get(base_url)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections_per_host,
+                max_keepalive_connections=self.max_connections_per_host,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=limits,
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+            self._clients[base_url] = client
+            logger.debug("创建站点连接池: %s (max=%d)", base_url, self.max_connections_per_host)
+        return client
+
+    async def post_json(
+        self,
+        api_url: str,
+        path: str,
+        payload: Any,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """向站点发送 JSON POST 请求；网络异常以 httpx 异常抛出，由调用方处理"""
+        if self._closed:
+            raise RuntimeError("StationHttpClient 已关闭")
+        client = self._get_client(api_url)
+        return await client.post(
+            path, json=payload, timeout=timeout if timeout is not None else self.timeout
+        )
+
+    async def select_his_data(
+        self, api_url: str, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """调用站点 /data/selectHisData 接口"""
+        return await self.post_json(api_url, SELECT_HIS_DATA_PATH, payload, timeout)
+
+    @property
+    def host_count(self) -> int:
+        """当前已建立连接池的站点数量"""
+        return len(self._clients)
+
+    async def aclose(self) -> None:
+        """关闭所有站点连接池"""
+        self._closed = True
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as exc:  # pragma: no cover - 关闭阶段的网络异常
+                logger.debug("关闭站点连接池失败: %s", exc)
+
+    async def __aenter__(self) -> "StationHttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+# httpx 的连接绑定在创建它的事件循环上，因此按循环维护共享实例
+_clients_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, StationHttpClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_station_client() -> StationHttpClient:
+    """获取当前事件循环共享的站点客户端（必须在协程中调用）"""
+    loop = asyncio.get_running_loop()
+    client = _clients_by_loop.get(loop)
+    if client is None or client._closed:
+        client = StationHttpClient()
+        _clients_by_loop[loop] = client
+    return client
+
+
+async def close_station_client() -> None:
+    """关闭当前事件循环共享的站点客户端"""
+    loop = asyncio.get_running_loop()
+    client = _clients_by_loop.pop(loop, None)
+    if client is not None:
+        await client.aclose()
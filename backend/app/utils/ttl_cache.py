@@ -0,0 +1,212 @@
+"""
+进程内 TTL 缓存
+
+线程安全的键值缓存：每个条目带过期时间，可按条目数和估算字节数上限以最近最少使用（LRU）淘汰。
+get_or_load 对同一个键加锁加载，多个线程同时未命中时只执行一次加载函数。
+写入时可指定 stale_ttl，过期后的条目在该时长内仍保留，可通过 get_entry 读取旧值（stale-while-revalidate）。
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+_SCALAR_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def approximate_size(value: Any) -> int:
+    """
+    估算对象占用的字节数
+
+    逐层累加容器元素与对象属性（__dict__）的 sys.getsizeof，同一对象只计一次；
+    DataFrame 等自行实现 __sizeof__ 的对象按其返回值计算。结果只用于缓存容量控制，并不精确。
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        if isinstance(obj, _SCALAR_TYPES):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(getattr(obj, "__dict__", None), dict):
+            stack.append(obj.__dict__)
+    return total
+
+
+class TTLCache:
+    """带过期时间的线程安全缓存"""
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = approximate_size,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # 按 sizeof 估算的总字节数上限；超过单条上限的值不缓存
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        # key -> (过期时间, 保留截止时间, 写入时间, 值, 估算字节数)
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Hashable, threading.Lock] = {}
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key) is not _MISSING
+
+    def _remove(self, key: Hashable) -> bool:
+        """删除条目并扣减字节数（调用方需持有锁），返回是否存在"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[4]
+        return True
+
+    def _lookup(self, key: Hashable) -> Any:
+        """读取未过期的条目（调用方需持有锁），不存在或已过期时返回 _MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, retain_until, _, value, _ = entry
+        now = self._clock()
+        if expires_at <= now:
+            if retain_until <= now:
+                self._remove(key)
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取未过期的条目，不存在或已过期时返回 default"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float, bool]]:
+        """
+        读取条目及其年龄，返回 (值, 写入后经过的秒数, 是否已过期)
+
+        已过期但仍在 stale_ttl 保留期内的条目同样返回；不存在或超出保留期时返回 None。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = self._clock()
+            if entry is None or (entry[0] <= now and entry[1] <= now):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            expires_at, _, stored_at, value, _ = entry
+            stale = expires_at <= now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            self._entries.move_to_end(key)
+            return value, now - stored_at, stale
+
+    def set(
+        self, key: Hashable, value: Any, ttl: Optional[float] = None, stale_ttl: float = 0
+    ) -> None:
+        """
+        写入条目，ttl 为空时使用默认过期时间；stale_ttl 为过期后继续保留旧值的时长
+
+        超出条目数或字节数上限时淘汰最久未使用的条目；单个值超过 max_bytes 时不缓存。
+        """
+        now = self._clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.evictions += 1
+                return
+            self._entries[key] = (expires_at, expires_at + stale_ttl, now, value, size)
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """命中时直接返回，否则调用 loader 加载并写入；loader 抛出的异常不会被缓存"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        try:
+            with load_lock:
+                # 等待期间其他线程可能已完成加载
+                with self._lock:
+                    value = self._lookup(key)
+                if value is not _MISSING:
+                    return value
+                value = loader()
+                self.set(key, value, ttl)
+                return value
+        finally:
+            with self._lock:
+                if self._load_locks.get(key) is load_lock and not load_lock.locked():
+                    del self._load_locks[key]
+
+    def invalidate(self, key: Hashable) -> bool:
+        """删除指定条目，返回是否存在"""
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self) -> None:
+        """清空所有条目"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率与容量统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -84,4 +84,14 @@ CACHE_CONFIG: Dict[str, Any] = {
     "backend": "memory",
     "default_timeout": 60,
     "key_prefix": "test_hk_tool:",
+    # 进程内缓存最多保留的条目数（按最近最少使用淘汰）
+    "max_entries": 256,
+    # 进程内缓存按对象大小估算的总字节数上限（16MB）
+    "max_bytes": 16 * 1024 * 1024,
+    # 电表历史读数本地存储（SQLite），为空时不启用
+    "meter_reading_store_path": None,
+    # 站点功率后台采集周期（秒），0 表示不启用；每个工作进程各自轮询所有站点
+    "power_collector_interval": 0,
+    # 能耗小时/日汇总存储（SQLite），为空时趋势数据实时计算
+    "energy_rollup_path": None,
 }
\ No newline at end of file
@@ -6,6 +6,11 @@
 """
 
 import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import os
 import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
@@ -13,15 +18,44 @@ import requests
 import logging
 from threading import RLock
 
-from db_config import execute_query, insert_operation_log, execute_query_with_host
+from db_config import execute_query_async, execute_query_with_host_async, insert_operation_log_async
 from models import (
     PointMetadata, DeviceTreeNode, RealtimeResponse, WriteCommand, 
-    WriteResult, BatchWriteResponse, DeviceTreeResponse, PointListResponse
+    WriteResult, BatchWriteResponse, DeviceTreeResponse, DeviceTreePage, PointListResponse
 )
 from logger_config import app_logger
 
 logger = app_logger
 
+# 设备树缓存：每隔 DEVICE_TREE_CHECK_INTERVAL 秒用表指纹校验一次，
+# 指纹包含设备树用到的各列的校验和，原地修改（改名、可写标记、限值、数据源等）在下次校验时即可发现；
+# DEVICE_TREE_MAX_AGE 秒后无论指纹是否变化都重建一次，兜底校验和碰撞。
+# 代价：指纹查询对 bus_object_info 与 bus_object_point_data 全表逐行计算 CRC32，
+# 耗时随两表行数线性增长（只返回一行，不传输数据，但数据库端的扫描量与完整查询相当）。
+# 校验只在请求到来时按需进行，每个车站每个周期最多一次；点位表很大的车站可调大
+# DEVICE_TREE_CHECK_INTERVAL，以更长的变更发现延迟换取更少的全表扫描
+DEVICE_TREE_CHECK_INTERVAL = float(os.environ.get("DEVICE_TREE_CHECK_INTERVAL", "30"))
+DEVICE_TREE_MAX_AGE = float(os.environ.get("DEVICE_TREE_MAX_AGE", "3600"))
+
+# QUOTE 区分 NULL 与空串/字符串 'NULL'，BIT_XOR 聚合与行顺序无关
+_DEVICE_TREE_FINGERPRINT_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM bus_object_info),
+        (SELECT MAX(object_id) FROM bus_object_info),
+        (SELECT BIT_XOR(CRC32(CONCAT_WS(',',
+            QUOTE(object_id), QUOTE(parent_id), QUOTE(status), QUOTE(object_code),
+            QUOTE(object_name), QUOTE(object_type)
+        ))) FROM bus_object_info),
+        (SELECT COUNT(*) FROM bus_object_point_data),
+        (SELECT MAX(data_id) FROM bus_object_point_data),
+        (SELECT BIT_XOR(CRC32(CONCAT_WS(',',
+            QUOTE(data_id), QUOTE(object_id), QUOTE(data_code), QUOTE(data_name), QUOTE(unit),
+            QUOTE(is_set), QUOTE(lower_control), QUOTE(point_key), QUOTE(data_type),
+            QUOTE(data_source), QUOTE(border_min), QUOTE(border_max), QUOTE(warn_min),
+            QUOTE(warn_max), QUOTE(error_min), QUOTE(error_max)
+        ))) FROM bus_object_point_data)
+"""
+
 class PlatformAPIService:
     """环控平台API服务类"""
     
@@ -178,11 +212,190 @@ class PlatformAPIService:
         return await loop.run_in_executor(None, _do_request)
 
 
+def _build_point_node(object_code: str, point: Tuple) -> DeviceTreeNode:
+    (
+        data_code, data_name, unit, is_set, lower_control, point_key,
+        border_min, border_max, warn_min, warn_max, error_min, error_max, data_type, data_source
+    ) = point
+    
+    # 判断是否可写
+    is_writable = (is_set == 1) or (lower_control == 1)
+    
+    return DeviceTreeNode(
+        id=f"{object_code}:{data_code}",
+        label=f"{'✔ ' if is_writable else ''}{data_code} ({data_name})",
+        children=None,
+        meta={
+            "object_code": object_code,
+            "data_code": data_code,
+            "data_name": data_name,
+            "unit": unit or "",
+            "is_writable": is_writable,
+            "point_key": point_key,
+            "data_type": data_type,
+            "data_source": data_source,
+            "border_min": border_min,
+            "border_max": border_max,
+            "warn_min": warn_min,
+            "warn_max": warn_max,
+            "error_min": error_min,
+            "error_max": error_max
+        }
+    )
+
+def build_device_tree(root_rows: List[Tuple], child_rows: List[Tuple], point_rows: List[Tuple]) -> List[DeviceTreeNode]:
+    """
+    由三条集合查询的结果组装设备树：项目 -> 子设备 -> 点位
+    
+    child_rows 为 (parent_id, object_id, object_code, object_name, object_type, point_count)，
+    point_rows 为 (object_id, 点位字段...)；各自已按 object_code / data_code 排序，按 object_id 建索引后挂接。
+    """
+    points_by_object: Dict[Any, List[Tuple]] = {}
+    for row in point_rows:
+        points_by_object.setdefault(row[0], []).append(row[1:])
+    
+    children_by_parent: Dict[Any, List[DeviceTreeNode]] = {}
+    points_by_parent: Dict[Any, int] = {}
+    for parent_id, child_id, child_code, child_name, child_type, point_count in child_rows:
+        points_by_parent[parent_id] = points_by_parent.get(parent_id, 0) + (point_count or 0)
+        children_by_parent.setdefault(parent_id, []).append(DeviceTreeNode(
+            id=child_code,
+            label=f"{child_name} ({child_code}) [{point_count or 0}点]",
+            children=[_build_point_node(child_code, point) for point in points_by_object.get(child_id, [])],
+            meta={
+                "object_code": child_code,
+                "object_name": child_name,
+                "object_type": child_type,
+                "point_count": point_count or 0
+            }
+        ))
+    
+    tree_nodes = []
+    for object_id, object_code, object_name, object_type in root_rows:
+        total_points = points_by_parent.get(object_id, 0)
+        tree_nodes.append(DeviceTreeNode(
+            id=object_code,
+            label=f"{object_name} ({object_code}) [{total_points}点]",
+            children=children_by_parent.get(object_id, []),
+            meta={
+                "object_code": object_code,
+                "object_name": object_name,
+                "object_type": object_type,
+                "total_points": total_points
+            }
+        ))
+    return tree_nodes
+
+def _encode_tree_cursor(node_id: str) -> str:
+    return base64.urlsafe_b64encode(node_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode_tree_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"无效的游标: {cursor}")
+
+def paginate_tree_nodes(
+    nodes: List[DeviceTreeNode],
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    keyword: Optional[str] = None,
+    writable: Optional[bool] = None,
+    positions: Optional[Dict[str, int]] = None,
+) -> DeviceTreePage:
+    """
+    对同一层节点做过滤和游标分页，只返回节点本身（children 置空，meta 中附带 child_count）
+    
+    keyword 对 id/名称做不区分大小写的包含匹配；writable 只对点位生效。
+    游标记录上一页最后一个节点的 id，树重建后仍能从原位置继续；该节点已不存在时抛出 ValueError。
+    positions 为 id → 在 nodes 中的位置（见 _index_tree_nodes），传入时直接定位游标，不再从头查找。
+    """
+    needle = keyword.strip().lower() if keyword else None
+
+    def matches(node: DeviceTreeNode) -> bool:
+        if needle and needle not in node.id.lower() and needle not in node.label.lower():
+            return False
+        if writable is not None and bool((node.meta or {}).get("is_writable")) != writable:
+            return False
+        return True
+
+    filtered = needle is not None or writable is not None
+    start = 0
+    if cursor:
+        last_id = _decode_tree_cursor(cursor)
+        if positions is not None:
+            position = positions.get(last_id)
+        else:
+            position = next((i for i, node in enumerate(nodes) if node.id == last_id), None)
+        stale = position is None or position >= len(nodes) or nodes[position].id != last_id
+        if stale or not matches(nodes[position]):
+            raise ValueError("游标已失效，请从第一页重新加载")
+        start = position + 1
+
+    if filtered:
+        remaining = [node for node in nodes[start:] if matches(node)]
+        total = sum(1 for node in nodes[:start] if matches(node)) + len(remaining)
+    else:
+        remaining = nodes[start:]
+        total = len(nodes)
+    page = remaining[:limit]
+    items = []
+    for node in page:
+        meta = dict(node.meta or {})
+        if node.children is not None:
+            meta["child_count"] = len(node.children)
+        items.append(DeviceTreeNode(id=node.id, label=node.label, children=None, meta=meta))
+    has_more = len(remaining) > limit
+    return DeviceTreePage(
+        items=items,
+        total=total,
+        next_cursor=_encode_tree_cursor(page[-1].id) if has_more and page else None,
+    )
+
+def _node_positions(nodes: List[DeviceTreeNode]) -> Dict[str, int]:
+    return {node.id: position for position, node in enumerate(nodes)}
+
+def _index_tree_nodes(tree: List[DeviceTreeNode]) -> Dict[str, Dict[Any, Any]]:
+    """
+    项目与设备节点分别按 id（object_code）建索引，供逐层展开时按节点类型查找；
+    position 按 (parent_kind, parent_id) 记录每一层节点 id 在该层中的位置，供分页游标直接定位
+    """
+    index: Dict[str, Dict[Any, Any]] = {
+        "project": {}, "device": {}, "position": {("project", None): _node_positions(tree)}
+    }
+    for root in tree:
+        index["project"][root.id] = root
+        index["position"][("project", root.id)] = _node_positions(root.children or [])
+        for child in root.children or []:
+            index["device"][child.id] = child
+            index["position"][("device", child.id)] = _node_positions(child.children or [])
+    return index
+
+class DeviceTreeUnavailableError(RuntimeError):
+    """车站数据库不可用且没有缓存的设备树"""
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中当前 ETag（忽略弱校验前缀 W/）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def _device_tree_etag(response: DeviceTreeResponse) -> str:
+    """按内容计算 ETag：重建后内容不变时 ETag 也不变"""
+    payload = json.dumps(response.dict(), ensure_ascii=False, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
 class DeviceControlService:
     """设备控制核心服务类"""
     
     def __init__(self):
         self.platform_api = PlatformAPIService()
+        # 设备树缓存 {station_ip: {fingerprint, etag, response, index, built_at, checked_at}}
+        self._tree_cache: Dict[str, Dict[str, Any]] = {}
+        self._tree_locks: Dict[str, asyncio.Lock] = {}
     
     async def get_device_tree(self, operator_id: str = "system", station_ip: str | None = None) -> DeviceTreeResponse:
         """
@@ -190,201 +403,249 @@ class DeviceControlService:
         构建层级：项目 -> 子项目/设备 -> 点位
         支持小系统传感器数据模式
         """
+        response, _ = await self.get_device_tree_versioned(operator_id, station_ip)
+        return response
+    
+    async def get_device_tree_versioned(
+        self,
+        operator_id: str = "system",
+        station_ip: str | None = None,
+        if_none_match: Optional[str] = None,
+    ) -> Tuple[DeviceTreeResponse, Optional[str]]:
+        """
+        获取设备树及其 ETag（按车站缓存）
+        
+        缓存命中且未到检查周期时不访问数据库；到期后只查询一次表指纹，指纹未变则继续使用缓存，
+        变化或超过最长缓存时间才重新执行完整查询。数据库不可用时优先返回上一次的缓存，
+        都没有时返回测试数据，此时 ETag 为 None。
+        if_none_match 命中 ETag（调用方将返回 304）时不写查询审计。
+        """
+        key = station_ip or ""
+        lock = self._tree_locks.setdefault(key, asyncio.Lock())
+        # 同一车站并发请求只重建一次
+        async with lock:
+            entry, cached = await self._refresh_device_tree(key, station_ip)
+        
+        if entry is None:
+            return self._fallback_device_tree(station_ip), None
+        if etag_matches(if_none_match, entry["etag"]):
+            return entry["response"], entry["etag"]
+        
+        # 记录审计
         try:
-            # 查询项目根节点（parent_id = 0）
-            root_sql = """
-                SELECT object_id, object_code, object_name, object_type
-                FROM bus_object_info 
-                WHERE status = 1 AND parent_id = 0
-                ORDER BY object_code
-            """
-            # 按车站IP切换数据源
-            from db_config import execute_query_with_host
-            root_nodes = execute_query_with_host(root_sql, None, station_ip) or []
-            
-            # 构建设备树
-            tree_nodes = []
-            
-            for root in root_nodes:
-                object_id, object_code, object_name, object_type = root
-                
-                # 查询子设备
-                children_sql = """
-                    SELECT 
-                        o.object_id, 
-                        o.object_code, 
-                        o.object_name, 
-                        o.object_type,
-                        COUNT(p.data_id) as point_count
-                    FROM bus_object_info o
-                    LEFT JOIN bus_object_point_data p ON o.object_id = p.object_id
-                    WHERE o.status = 1 AND o.parent_id = %s
-                    GROUP BY o.object_id, o.object_code, o.object_name, o.object_type
-                    ORDER BY o.object_code
-                """
-                children = execute_query_with_host(children_sql, (object_id,), station_ip) or []
-                
-                child_nodes = []
-                total_points = 0
-                
-                for child in children:
-                    child_id, child_code, child_name, child_type, point_count = child
-                    total_points += point_count or 0
-                    
-                    # 查询该子设备的所有点位信息
-                    points_sql = """
-                        SELECT 
-                            p.data_code,
-                            p.data_name,
-                            p.unit,
-                            p.is_set,
-                            p.lower_control,
-                            p.point_key,
-                            p.border_min,
-                            p.border_max,
-                            p.warn_min,
-                            p.warn_max,
-                            p.error_min,
-                            p.error_max,
-                            p.data_type,
-                            p.data_source
-                        FROM bus_object_point_data p
-                        WHERE p.object_id = %s
-                        ORDER BY p.data_code
-                        LIMIT 100
-                    """
-                    points = execute_query_with_host(points_sql, (child_id,), station_ip) or []
-                    
-                    point_nodes = []
-                    for point in points:
-                        (
-                            data_code, data_name, unit, is_set, lower_control, point_key,
-                            border_min, border_max, warn_min, warn_max, error_min, error_max, data_type, data_source
-                        ) = point
-                        
-                        # 判断是否可写
-                        is_writable = (is_set == 1) or (lower_control == 1)
-                        
-                        point_nodes.append(DeviceTreeNode(
-                            id=f"{child_code}:{data_code}",
-                            label=f"{'✔ ' if is_writable else ''}{data_code} ({data_name})",
-                            children=None,
-                            meta={
-                                "object_code": child_code,
-                                "data_code": data_code,
-                                "data_name": data_name,
-                                "unit": unit or "",
-                                "is_writable": is_writable,
-                                "point_key": point_key,
-                                "data_type": data_type,
-                                "data_source": data_source,
-                                "border_min": border_min,
-                                "border_max": border_max,
-                                "warn_min": warn_min,
-                                "warn_max": warn_max,
-                                "error_min": error_min,
-                                "error_max": error_max
-                            }
-                        ))
-                    
-                    child_nodes.append(DeviceTreeNode(
-                        id=child_code,
-                        label=f"{child_name} ({child_code}) [{point_count or 0}点]",
-                        children=point_nodes,
-                        meta={
-                            "object_code": child_code,
-                            "object_name": child_name,
-                            "object_type": child_type,
-                            "point_count": point_count or 0
-                        }
-                    ))
-                
-                tree_nodes.append(DeviceTreeNode(
-                    id=object_code,
-                    label=f"{object_name} ({object_code}) [{total_points}点]",
-                    children=child_nodes,
-                    meta={
-                        "object_code": object_code,
-                        "object_name": object_name,
-                        "object_type": object_type,
-                        "total_points": total_points
-                    }
-                ))
-            
-            # 记录审计
-            try:
-                insert_operation_log(
-                    operator_id=operator_id,
-                    point_key=":device-tree:load",
-                    object_code=None,
-                    data_code=None,
-                    before_value=None,
-                    after_value=str(len(tree_nodes)),
-                    result="query",
-                    message=f"load_device_tree station_ip={station_ip or ''}",
-                    duration_ms=None,
-                )
-            except Exception as e:
-                logger.debug(f"设备树查询审计写入失败: {e}")
-            
-            return DeviceTreeResponse(tree=tree_nodes, count=len(tree_nodes))
-            
+            await insert_operation_log_async(
+                operator_id=operator_id,
+                point_key=":device-tree:load",
+                object_code=None,
+                data_code=None,
+                before_value=None,
+                after_value=str(entry["response"].count),
+                result="query",
+                message=f"load_device_tree station_ip={station_ip or ''} cached={int(cached)}",
+                duration_ms=None,
+            )
+        except Exception as e:
+            logger.debug(f"设备树查询审计写入失败: {e}")
+        
+        return entry["response"], entry["etag"]
+    
+    async def get_device_tree_page(
+        self,
+        station_ip: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        keyword: Optional[str] = None,
+        writable: Optional[bool] = None,
+        parent_kind: str = "project",
+    ) -> Tuple[DeviceTreePage, Optional[str]]:
+        """
+        逐层展开设备树：不传 parent_id 返回项目列表，传项目编码返回其设备，
+        parent_kind="device" 时传设备编码返回其点位
+        
+        与完整设备树共用同一份按车站缓存，展开节点不会触发额外的数据库查询；
+        返回的 ETag 与完整设备树一致。parent_id 不是 parent_kind 类型的节点时抛出 LookupError；
+        数据库不可用且没有缓存时抛出 DeviceTreeUnavailableError，不返回测试数据。
+        """
+        key = station_ip or ""
+        lock = self._tree_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry, _ = await self._refresh_device_tree(key, station_ip)
+        
+        if entry is None:
+            raise DeviceTreeUnavailableError(f"设备树暂不可用 station_ip={key}")
+        
+        if parent_id:
+            parent = entry["index"][parent_kind].get(parent_id)
+            if parent is None:
+                kind_name = "设备" if parent_kind == "device" else "项目"
+                raise LookupError(f"设备树中不存在{kind_name}: {parent_id}")
+            nodes = parent.children or []
+        elif parent_kind == "project":
+            nodes = entry["response"].tree
+        else:
+            raise ValueError("展开设备点位需要指定设备编码")
+        positions = entry["index"]["position"].get((parent_kind, parent_id or None))
+        page = paginate_tree_nodes(nodes, cursor, limit, keyword, writable, positions)
+        return page, entry["etag"]
+    
+    async def _refresh_device_tree(self, key: str, station_ip: Optional[str]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """按需校验/重建缓存，返回 (缓存项, 是否直接使用了已有的树)"""
+        entry = self._tree_cache.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if now - entry["checked_at"] < DEVICE_TREE_CHECK_INTERVAL:
+                return entry, True
+            if now - entry["built_at"] < DEVICE_TREE_MAX_AGE:
+                try:
+                    fingerprint = await self._get_tree_fingerprint(station_ip)
+                except Exception as e:
+                    # 车站数据库暂时不可用：继续使用缓存，下个周期再检查
+                    logger.warning(f"设备树指纹查询失败，使用缓存 station_ip={key}: {e}")
+                    entry["checked_at"] = now
+                    return entry, True
+                if fingerprint == entry["fingerprint"]:
+                    entry["checked_at"] = now
+                    return entry, True
+        
+        try:
+            # 先取指纹再查树：两者之间发生的变更会在下个周期被发现
+            fingerprint = await self._get_tree_fingerprint(station_ip)
+            tree_nodes = await self._load_device_tree(station_ip)
         except Exception as e:
             logger.error(f"获取设备树失败: {e}")
-            # 连接失败或查询异常时，回退到测试数据
-            test_tree = [
-                DeviceTreeNode(
-                    id="test_project",
-                    label="测试项目 (test_project) [2点]",
-                    children=[
-                        DeviceTreeNode(
-                            id="test_device",
-                            label="测试设备 (test_device) [2点]",
-                            children=[
-                                DeviceTreeNode(
-                                    id="test_device:point1",
-                                    label="✔ point1 (温度点位)",
-                                    meta={
-                                        "object_code": "test_device",
-                                        "data_code": "point1",
-                                        "data_name": "温度点位",
-                                        "unit": "℃",
-                                        "is_writable": True,
-                                        "point_key": "test:point1",
-                                        "data_type": "0",
-                                        "station_ip": station_ip or ""
-                                    }
-                                ),
-                                DeviceTreeNode(
-                                    id="test_device:point2",
-                                    label="point2 (湿度点位)",
-                                    meta={
-                                        "object_code": "test_device",
-                                        "data_code": "point2",
-                                        "data_name": "湿度点位",
-                                        "unit": "%",
-                                        "is_writable": False,
-                                        "point_key": "test:point2",
-                                        "data_type": "0",
-                                        "station_ip": station_ip or ""
-                                    }
-                                )
-                            ],
-                            meta={
-                                "object_code": "test_device",
-                                "object_name": "测试设备",
-                                "object_type": "device"
-                            }
-                        )
-                    ],
-                    meta={
-                        "object_code": "test_project",
-                        "object_name": "测试项目",
-                        "object_type": "project"
-                    }
-                )
-            ]
-            return DeviceTreeResponse(tree=test_tree, count=len(test_tree))
+            if entry is not None:
+                entry["checked_at"] = now
+            return entry, entry is not None
+        
+        response = DeviceTreeResponse(tree=tree_nodes, count=len(tree_nodes))
+        entry = {
+            "fingerprint": fingerprint,
+            "etag": _device_tree_etag(response),
+            "response": response,
+            "index": _index_tree_nodes(tree_nodes),
+            "built_at": now,
+            "checked_at": now,
+        }
+        self._tree_cache[key] = entry
+        return entry, False
+    
+    async def _get_tree_fingerprint(self, station_ip: Optional[str]) -> Tuple:
+        """设备表与点位表的行数、最大ID与列校验和，用于判断设备树是否变化（含原地修改）"""
+        rows = await execute_query_with_host_async(_DEVICE_TREE_FINGERPRINT_SQL, None, station_ip)
+        return tuple(rows[0]) if rows else ()
+    
+    async def _load_device_tree(self, station_ip: Optional[str]) -> List[DeviceTreeNode]:
+        """执行完整查询并组装设备树；查询失败时抛出异常"""
+        # 三条集合查询（根节点、全部子设备、全部点位）并发执行，在内存中按 object_id 组装，
+        # 不再为每个根节点/子设备单独查询
+        root_sql = """
+            SELECT object_id, object_code, object_name, object_type
+            FROM bus_object_info 
+            WHERE status = 1 AND parent_id = 0
+            ORDER BY object_code
+        """
+        children_sql = """
+            SELECT 
+                o.parent_id,
+                o.object_id, 
+                o.object_code, 
+                o.object_name, 
+                o.object_type,
+                COUNT(p.data_id) as point_count
+            FROM bus_object_info o
+            JOIN bus_object_info r ON o.parent_id = r.object_id
+            LEFT JOIN bus_object_point_data p ON o.object_id = p.object_id
+            WHERE o.status = 1 AND r.status = 1 AND r.parent_id = 0
+            GROUP BY o.parent_id, o.object_id, o.object_code, o.object_name, o.object_type
+            ORDER BY o.object_code
+        """
+        points_sql = """
+            SELECT 
+                p.object_id,
+                p.data_code,
+                p.data_name,
+                p.unit,
+                p.is_set,
+                p.lower_control,
+                p.point_key,
+                p.border_min,
+                p.border_max,
+                p.warn_min,
+                p.warn_max,
+                p.error_min,
+                p.error_max,
+                p.data_type,
+                p.data_source
+            FROM bus_object_point_data p
+            JOIN bus_object_info o ON p.object_id = o.object_id
+            JOIN bus_object_info r ON o.parent_id = r.object_id
+            WHERE o.status = 1 AND r.status = 1 AND r.parent_id = 0
+            ORDER BY p.object_id, p.data_code
+        """
+        # 按车站IP切换数据源
+        root_nodes, children, points = await asyncio.gather(
+            execute_query_with_host_async(root_sql, None, station_ip),
+            execute_query_with_host_async(children_sql, None, station_ip),
+            execute_query_with_host_async(points_sql, None, station_ip),
+        )
+        return build_device_tree(root_nodes or [], children or [], points or [])
+    
+    def _fallback_device_tree(self, station_ip: Optional[str]) -> DeviceTreeResponse:
+        """连接失败或查询异常时使用的测试数据"""
+        test_tree = [
+            DeviceTreeNode(
+                id="test_project",
+                label="测试项目 (test_project) [2点]",
+                children=[
+                    DeviceTreeNode(
+                        id="test_device",
+                        label="测试设备 (test_device) [2点]",
+                        children=[
+                            DeviceTreeNode(
+                                id="test_device:point1",
+                                label="✔ point1 (温度点位)",
+                                meta={
+                                    "object_code": "test_device",
+                                    "data_code": "point1",
+                                    "data_name": "温度点位",
+                                    "unit": "℃",
+                                    "is_writable": True,
+                                    "point_key": "test:point1",
+                                    "data_type": "0",
+                                    "station_ip": station_ip or ""
+                                }
+                            ),
+                            DeviceTreeNode(
+                                id="test_device:point2",
+                                label="point2 (湿度点位)",
+                                meta={
+                                    "object_code": "test_device",
+                                    "data_code": "point2",
+                                    "data_name": "湿度点位",
+                                    "unit": "%",
+                                    "is_writable": False,
+                                    "point_key": "test:point2",
+                                    "data_type": "0",
+                                    "station_ip": station_ip or ""
+                                }
+                            )
+                        ],
+                        meta={
+                            "object_code": "test_device",
+                            "object_name": "测试设备",
+                            "object_type": "device"
+                        }
+                    )
+                ],
+                meta={
+                    "object_code": "test_project",
+                    "object_name": "测试项目",
+                    "object_type": "project"
+                }
+            )
+        ]
+        return DeviceTreeResponse(tree=test_tree, count=len(test_tree))
     
     async def query_realtime_point(self, object_code: str, data_code: str, operator_id: str = "system", station_ip: Optional[str] = None) -> RealtimeResponse:
         """查询点位实时值"""
@@ -429,7 +690,7 @@ class DeviceControlService:
             
             # 审计记录
             try:
-                insert_operation_log(
+                await insert_operation_log_async(
                     operator_id=operator_id,
                     point_key=f"{object_code}:{data_code}",
                     object_code=object_code,
@@ -449,7 +710,7 @@ class DeviceControlService:
             logger.error(f"实时查询失败: {e}")
             raise e
     
-    def _get_point_data_source(self, point_key: str, station_ip: str = None) -> Optional[int]:
+    async def _get_point_data_source(self, point_key: str, station_ip: str = None) -> Optional[int]:
         """根据point_key查询数据库获取data_source，支持模糊匹配"""
         try:
             # 首先尝试精确匹配
@@ -461,9 +722,9 @@ class DeviceControlService:
             """
             
             if station_ip:
-                result = execute_query_with_host(sql_exact, (point_key,), station_ip)
+                result = await execute_query_with_host_async(sql_exact, (point_key,), station_ip)
             else:
-                result = execute_query(sql_exact, (point_key,))
+                result = await execute_query_async(sql_exact, (point_key,))
             
             if result and len(result) > 0:
                 return result[0][0]  # 返回data_source值
@@ -480,9 +741,9 @@ class DeviceControlService:
                 fuzzy_pattern = f"%{point_key}"
                 
                 if station_ip:
-                    result = execute_query_with_host(sql_fuzzy, (fuzzy_pattern,), station_ip)
+                    result = await execute_query_with_host_async(sql_fuzzy, (fuzzy_pattern,), station_ip)
                 else:
-                    result = execute_query(sql_fuzzy, (fuzzy_pattern,))
+                    result = await execute_query_async(sql_fuzzy, (fuzzy_pattern,))
                 
                 if result and len(result) > 0:
                     actual_point_key = result[0][1]
@@ -503,7 +764,7 @@ class DeviceControlService:
             return "point_key 必须为非空字符串"
         
         # 动态获取正确的data_source
-        correct_data_source = self._get_point_data_source(cmd.point_key, station_ip)
+        correct_data_source = await self._get_point_data_source(cmd.point_key, station_ip)
         if correct_data_source is not None:
             if cmd.data_source != correct_data_source:
                 logger.info(f"点位 {cmd.point_key} data_source 从 {cmd.data_source} 修正为 {correct_data_source}")
@@ -606,7 +867,7 @@ class DeviceControlService:
                     
                     # 记录成功审计
                     try:
-                        insert_operation_log(
+                        await insert_operation_log_async(
                             operator_id=operator_id,
                             point_key=command.point_key,
                             object_code=command.object_code,
@@ -644,7 +905,7 @@ class DeviceControlService:
                     
                     # 记录失败审计
                     try:
-                        insert_operation_log(
+                        await insert_operation_log_async(
                             operator_id=operator_id,
                             point_key=command.point_key,
                             object_code=command.object_code,
@@ -738,7 +999,7 @@ class DeviceControlService:
         """
         
         try:
-            rows = execute_query(sql, tuple(codes)) or []
+            rows = await execute_query_async(sql, tuple(codes)) or []
         except Exception as e:
             logger.error(f"点位列表查询失败: {e}")
             raise e
@@ -773,7 +1034,7 @@ class DeviceControlService:
         
         # 记录查询审计
         try:
-            insert_operation_log(
+            await insert_operation_log_async(
                 operator_id=operator_id,
                 point_key=":point-list:query",
                 object_code=",".join(codes),
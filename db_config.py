@@ -59,7 +59,14 @@ data_code like 'XiaoHuiFengJiPinLvFanKui%%'
 
 # 可以根据需要添加更多的 SQL 语句
 
-from typing import Dict, Any, cast, Optional
+import asyncio
+import logging
+from typing import Dict, Any, List, cast, Optional
+
+from backend.app.utils.db_executor import DatabaseExecutor
+from backend.app.utils.mysql_pool import MySQLPoolManager
+
+logger = logging.getLogger(__name__)
 
 def get_db_connection():
     """获取数据库连接（使用默认配置）"""
@@ -73,38 +80,75 @@ def get_db_connection_for_host(host: Optional[str] = None):
         cfg['host'] = host
     return pymysql.connect(**cfg)
 
+# 按主机复用连接，避免每条语句都与远端车站数据库重新握手
+_connection_pools = MySQLPoolManager(get_db_connection_for_host)
+# async 接口使用的数据库线程池，同一主机同时占用的线程数有上限
+_db_executor = DatabaseExecutor()
+
+def get_connection_pools() -> MySQLPoolManager:
+    """按主机划分的连接池"""
+    return _connection_pools
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    """各主机连接池的指标"""
+    return _connection_pools.stats()
+
+def evict_idle_connections() -> int:
+    """回收各主机连接池中空闲超时的连接，返回回收数量"""
+    return _connection_pools.evict_idle()
+
+async def run_idle_eviction(interval_seconds: float) -> None:
+    """定时回收空闲连接，直到任务被取消；之后不再访问的主机，其空闲连接同样会被关闭"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            evicted = await asyncio.to_thread(evict_idle_connections)
+            if evicted:
+                logger.info("已回收 %d 个空闲数据库连接", evicted)
+        except Exception as exc:
+            logger.warning("回收空闲数据库连接失败: %s", exc)
+
+def close_connection_pools() -> None:
+    """关闭所有连接池中的空闲连接与数据库线程池（应用关闭时调用）"""
+    _db_executor.shutdown()
+    _connection_pools.close()
+
+def _run_query(conn, query, params):
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        result = cursor.fetchall()
+    conn.commit()
+    return result
+
 def execute_query(query, params=None):
     """执行查询并返回结果"""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(query, params)
-            result = cursor.fetchall()
-        conn.commit()
-        return result
-    except Exception as e:
-        print(f"执行查询时发生错误: {e}")
-        conn.rollback()
-        return None
-    finally:
-        conn.close()
+    with _connection_pools.connection(DB_CONFIG['host']) as conn:
+        try:
+            return _run_query(conn, query, params)
+        except Exception as e:
+            logger.error(f"执行查询时发生错误: {e}")
+            conn.rollback()
+            return None
 
 def execute_query_with_host(query, params=None, host: Optional[str] = None):
     """在指定 host 上执行查询，用于按车站IP切换数据源。"""
-    conn = get_db_connection_for_host(host)
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(query, params)
-            result = cursor.fetchall()
-        conn.commit()
-        return result
-    except Exception as e:
-        print(f"执行查询(指定主机)时发生错误: {e}")
-        conn.rollback()
-        # 将异常抛出，让上层逻辑感知到失败并进行回退
-        raise
-    finally:
-        conn.close()
+    with _connection_pools.connection(host or DB_CONFIG['host']) as conn:
+        try:
+            return _run_query(conn, query, params)
+        except Exception as e:
+            logger.error(f"执行查询(指定主机)时发生错误: {e}")
+            # 将异常抛出，让上层逻辑感知到失败并进行回退（连接池负责回滚）
+            raise
+
+# 异步接口：同步查询放到专用线程池执行，不阻塞事件循环
+async def execute_query_async(query, params=None):
+    """execute_query 的异步版本"""
+    return await _db_executor.run(DB_CONFIG['host'], execute_query, query, params)
+
+async def execute_query_with_host_async(query, params=None, host: Optional[str] = None):
+    """execute_query_with_host 的异步版本"""
+    host = host or DB_CONFIG['host']
+    return await _db_executor.run(host, execute_query_with_host, query, params, host)
 
 def insert_data(device, alias, unit, value, timestamp):
     """插入数据"""
@@ -113,23 +157,21 @@ def insert_data(device, alias, unit, value, timestamp):
 
 def ensure_operation_log_table() -> bool:
     """确保 operation_log 表存在并创建复合索引。O(1) DDL；p99 < 50ms。"""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(CREATE_OPERATION_LOG_TABLE)
-            try:
-                cursor.execute(CREATE_OPERATION_LOG_INDEX)
-            except Exception:
-                # 索引已存在或非致命错误，忽略
-                pass
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"创建审计表/索引失败: {e}")
-        conn.rollback()
-        return False
-    finally:
-        conn.close()
+    with _connection_pools.connection(DB_CONFIG['host']) as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(CREATE_OPERATION_LOG_TABLE)
+                try:
+                    cursor.execute(CREATE_OPERATION_LOG_INDEX)
+                except Exception:
+                    # 索引已存在或非致命错误，忽略
+                    pass
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"创建审计表/索引失败: {e}")
+            conn.rollback()
+            return False
 
 def insert_operation_log(
     operator_id: str,
@@ -158,9 +200,13 @@ def insert_operation_log(
         execute_query(INSERT_OPERATION_LOG, params)
         return True
     except Exception as e:
-        print(f"写入审计日志失败: {e}")
+        logger.error(f"写入审计日志失败: {e}")
         return False
 
+async def insert_operation_log_async(**kwargs: Any) -> bool:
+    """insert_operation_log 的异步版本，参数同 insert_operation_log"""
+    return await _db_executor.run(DB_CONFIG['host'], insert_operation_log, **kwargs)
+
 def select_bus_object_point_data1(object_code, data_code):
     """选择特定的数据点"""
     params = (object_code, data_code)
@@ -1,22 +1,85 @@
 import requests
 import pandas as pd
 from datetime import datetime
-import concurrent.futures
-from functools import partial
 import os
 import logging
 import asyncio
+import contextvars
 import threading
-import config_electricity
+import httpx
 import db_config
-from db_config import select_bus_object_point_data, execute_query, DB_CONFIG
+from db_config import select_bus_object_point_data, execute_query, execute_query_with_host, DB_CONFIG
 from models import ExportResult, StationExportResult
 from logger_config import app_logger
 from task_manager import task_manager, TaskStatus
+from backend.app.config.config_snapshot import load_line_configs
+from backend.app.utils.chunked_fetch import DEFAULT_CHUNK, ChunkCheckpointStore, fetch_in_chunks, split_time_range
+from backend.app.utils.energy_status import encode_status_series
+from backend.app.utils.his_data_index import HisDataIndex
+from backend.app.utils.meter_reading_store import get_meter_reading_store
+from backend.app.utils.meter_readings import fetch_boundary_snapshot
+from backend.app.utils.station_client import get_station_client, close_station_client
+from backend.app.utils.ttl_cache import TTLCache
 
 # 使用配置好的logger
 logger = app_logger
 
+# 当前协程所属的导出任务ID，供分段拉取时检查任务是否已被取消
+_current_export_task = contextvars.ContextVar("current_export_task", default=None)
+# 当前线程所属的任务运行序号，续传后旧运行据此停止
+_current_export_run = contextvars.ContextVar("current_export_run", default=None)
+
+
+def _task_cancelled(task_id):
+    """任务已被取消，或本线程的运行已被续传取代"""
+    return task_manager.is_cancelled(task_id, _current_export_run.get())
+
+
+def _export_should_continue():
+    """当前导出任务未被取消时返回 True（非任务模式下始终为 True）"""
+    task_id = _current_export_task.get()
+    return not (task_id and _task_cancelled(task_id))
+
+
+def _start_export_thread(target, task_id, *args):
+    """登记任务的本次运行后在后台线程中执行 target(task_id, *args)，线程退出时注销"""
+    run_id = task_manager.start_run(task_id)
+
+    def run():
+        _current_export_run.set(run_id)
+        try:
+            target(task_id, *args)
+        finally:
+            task_manager.finish_run(task_id, run_id)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def _station_results_key(store, task_id):
+    """任务内已完成站点记录所在的作业键"""
+    return store.job_key("station_results", task_id)
+
+
+def _load_completed_station(store, task_id, station_key):
+    """续传时读取已成功站点的导出结果；非任务模式或输出文件已不存在时返回 None"""
+    if not task_id:
+        return None
+    record = store.load_record(_station_results_key(store, task_id), station_key)
+    if record and record.get("file_path") and os.path.exists(record["file_path"]):
+        return record
+    return None
+
+
+def _save_completed_station(store, task_id, station_key, file_path):
+    """记录站点已导出成功及其输出文件，任务续传时跳过该站点"""
+    if not task_id or not file_path:
+        return
+    try:
+        store.save_record(_station_results_key(store, task_id), station_key, {"file_path": file_path})
+    except OSError as e:
+        logger.warning(f"保存站点完成记录失败: {station_key}, {e}")
+
 class ElectricityMeter:
     """电表数据模型"""
     def __init__(self, p1, p2, p3, p4, p5, p6, p7):
@@ -33,15 +96,31 @@ class ElectricityMeter:
 
 class ElectricityExportService:
     """电耗数据导出服务"""
+
+    # 节能状态序列布局：接口返回的序列数 -> ((序列下标, 系统名称), ...)
+    # 8号线风水分开，返回4条序列，其中第0条为水系统、第3条为风系统
+    ENERGY_STATUS_SERIES_LAYOUT = {
+        1: ((0, ""),),
+        4: ((0, "水系统"), (3, "风系统")),
+    }
     
     def __init__(self):
-        self.line_configs = config_electricity.line_configs
+        self.line_configs = load_line_configs()
+        # 单条线路内同时处理的站点数上限（协程并发，不再占用线程）
+        self.max_concurrent_stations = int(os.environ.get("EXPORT_MAX_CONCURRENT_STATIONS", "6"))
+        # 全网导出时所有线路共享的站点并发上限
+        self.network_max_concurrent_stations = int(os.environ.get("EXPORT_NETWORK_MAX_CONCURRENT_STATIONS", "12"))
+        # 单个站点每个分段窗口的导出超时（秒），避免一个站点反复重试卡住整条线路
+        self.station_timeout = float(os.environ.get("EXPORT_STATION_TIMEOUT", "60"))
+        # 长时间范围分段拉取与断点续传
+        self.chunk_size = DEFAULT_CHUNK
+        self.checkpoint_store = ChunkCheckpointStore()
 
-    def get_historical_data(self, api_url, obj):
+    async def get_historical_data(self, api_url, obj):
         """获取历史数据"""
         try:
             logger.info(f"开始请求历史数据: {api_url}")
-            response = requests.post(f"{api_url}/data/selectHisData", json=obj, timeout=15)  # 15秒超时，适应M2线路多站点需求
+            response = await get_station_client().select_his_data(api_url, obj, timeout=15)  # 15秒超时，适应M2线路多站点需求
             if response.status_code == 200:
                 data = response.json().get("data", [])
                 logger.info(f"成功获取历史数据: {api_url}, 数据条数: {len(data)}")
@@ -49,18 +128,18 @@ class ElectricityExportService:
             else:
                 logger.error(f"获取数据失败: {api_url}, 状态码: {response.status_code}")
                 return []
-        except requests.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"API请求超时(超过15秒): {api_url}")
             return []
-        except requests.ConnectionError:
+        except httpx.TransportError:
             logger.error(f"API连接失败: {api_url}")
             return []
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"API请求异常: {api_url}, 错误: {e}")
             return []
 
-    def get_energy_status(self, api_url, data_code, object_code, start_time, end_time):
-        """获取节能状态"""
+    async def _fetch_energy_status_chunk(self, api_url, data_code, object_code, start_time, end_time):
+        """获取一个时间窗口内的节能状态原始数据；网络错误返回 None"""
         obj = {
             "dataCodes": data_code,
             "endTime": int(end_time.timestamp() * 1000),
@@ -73,158 +152,88 @@ class ElectricityExportService:
         }
         
         try:
-            logger.info(f"开始请求节能状态数据: {api_url}")
-            response = requests.post(f"{api_url}/data/selectHisData", json=obj, timeout=5)  # 5秒超时
+            logger.info(f"开始请求节能状态数据: {api_url} ({start_time} ~ {end_time})")
+            response = await get_station_client().select_his_data(api_url, obj, timeout=5)  # 5秒超时
             if response.status_code == 200:
-                data = response.json().get("data", [])
-                logger.info(f"节能状态数据数量: {len(data)}")
-                
-                if len(data) == 1:
-                    values = data[0].get("values", [])
-                    status_list = []
-                    if values:
-                        flag = values[0]["value"]
-                        logger.info(f"开始时间: {values[0]['time']}")
-                        status_list.append({
-                            "开始时间": datetime.strptime(values[0]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S"),
-                            "结束时间": "",
-                            "节能状态": "节能" if flag == 1 else "非节能",
-                            "系统": ""
-                        })
-                        for i in range(1, len(values)):
-                            if values[i]["value"] != flag and values[i]["value"] != '' and values[i]["value"] is not None:
-                                logger.info(f"结束时间时间: {values[i]['time']}")
-                                status_list[-1]["结束时间"] = datetime.strptime(values[i]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S")
-                                flag = values[i]["value"]
-                                status_list.append({
-                                    "开始时间": datetime.strptime(values[i]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S"),
-                                    "结束时间": "",
-                                    "节能状态": "节能" if flag == 1 else "非节能",
-                                    "系统": ""
-                                })
-                        if status_list:
-                            logger.info(f"最后时间: {values[-1]['time']}")
-                            status_list[-1]["结束时间"] = datetime.strptime(values[-1]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S")
-                    return status_list
-                    
-                if len(data) == 4:  # 针对8号线风水分开的特殊处理
-                    # 水系统
-                    values = data[0].get("values", [])
-                    status_list = []
-                    if values:
-                        flag = values[0]["value"]
-                        status_list.append({
-                            "开始时间": datetime.strptime(values[0]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S"),
-                            "结束时间": "",
-                            "节能状态": "节能" if flag == 1 else "非节能",
-                            "系统": "水系统"
-                        })
-                        for i in range(1, len(values)):
-                            if values[i]["value"] != flag and values[i]["value"] != '' and values[i]["value"] is not None:
-                                status_list[-1]["结束时间"] = datetime.strptime(values[i]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S")
-                                flag = values[i]["value"]
-                                status_list.append({
-                                    "开始时间": datetime.strptime(values[i]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S"),
-                                    "结束时间": "",
-                                    "节能状态": "节能" if flag == 1 else "非节能",
-                                    "系统": "水系统"
-                                })
-                        if status_list:
-                            status_list[-1]["结束时间"] = datetime.strptime(values[-1]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S")
-                            
-                    # 风系统
-                    values = data[3].get("values", [])
-                    if values:
-                        flag = values[0]["value"]
-                        status_list.append({
-                            "开始时间": datetime.strptime(values[0]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S"),
-                            "结束时间": "",
-                            "节能状态": "节能" if flag == 1 else "非节能",
-                            "系统": "风系统"
-                        })
-                        for i in range(1, len(values)):
-                            if values[i]["value"] != flag and values[i]["value"] != '' and values[i]["value"] is not None:
-                                status_list[-1]["结束时间"] = datetime.strptime(values[i]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S")
-                                flag = values[i]["value"]
-                                status_list.append({
-                                    "开始时间": datetime.strptime(values[i]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S"),
-                                    "结束时间": "",
-                                    "节能状态": "节能" if flag == 1 else "非节能",
-                                    "系统": "风系统"
-                                })
-                        if status_list:
-                            status_list[-1]["结束时间"] = datetime.strptime(values[-1]["time"], "%Y-%m-%d %H:%M:%S.%f").strftime("%Y-%m-%d %H:%M:%S")
-
-                    return status_list
-            else:
-                logger.error(f"获取节能状态数据失败: {api_url}, 状态码: {response.status_code}")
-        except requests.Timeout:
+                return response.json().get("data", [])
+            logger.error(f"获取节能状态数据失败: {api_url}, 状态码: {response.status_code}")
+            return []
+        except httpx.TimeoutException:
             logger.error(f"节能状态API请求超时(超过5秒): {api_url}")
             return None
-        except requests.ConnectionError:
+        except httpx.TransportError:
             logger.error(f"节能状态API连接失败: {api_url}")
             return None
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"节能状态API请求异常: {api_url}, 错误: {e}")
             return None
+
+    async def get_energy_status(self, api_url, data_code, object_code, start_time, end_time):
+        """获取节能状态
+
+        长时间范围按 EXPORT_CHUNK_DAYS 分段拉取，每段单独计时并写检查点，失败后重试可从断点继续。
+        """
+        job_key = self.checkpoint_store.job_key(
+            "energy_status", api_url, data_code, object_code, start_time, end_time, self.chunk_size
+        )
+        try:
+            data = await fetch_in_chunks(
+                lambda s, e: self._fetch_energy_status_chunk(api_url, data_code, object_code, s, e),
+                start_time, end_time, self.checkpoint_store, job_key,
+                chunk=self.chunk_size, should_continue=_export_should_continue,
+            )
+            if data is None:
+                return None
+            logger.info(f"节能状态数据数量: {len(data)}")
+
+            layout = self.ENERGY_STATUS_SERIES_LAYOUT.get(len(data))
+            if layout is None:
+                # 未登记的序列布局无法确定各序列对应的子系统，需在 ENERGY_STATUS_SERIES_LAYOUT 中补充
+                logger.warning(
+                    f"节能状态序列数量 {len(data)} 未配置布局，跳过节能状态: {api_url} "
+                    f"(已支持: {sorted(self.ENERGY_STATUS_SERIES_LAYOUT)})"
+                )
+                return []
+            status_list = encode_status_series(
+                (system, data[i].get("values", [])) for i, system in layout
+            )
+            logger.info(f"节能状态区间数量: {len(status_list)}")
+            return status_list
         except Exception as e:
             logger.error(f"处理节能状态数据错误: {e}")
             return None
-            
-        return []
 
-    def process_data(self, api_url, data_list, data_codes, object_codes, start_time, end_time):
-        """处理数据"""
-        start_timestamp = int(start_time.timestamp() * 1000)
-        end_timestamp = int(end_time.timestamp() * 1000)
+    async def process_data(self, api_url, data_list, data_codes, object_codes, start_time, end_time):
+        """处理数据
+
+        返回填入 p8/p9/p10 的设备数据副本；data_list 来自共享的 line_configs，不在原对象上修改。
+        """
+        # 起码（开始后3分钟）与止码（结束前10分钟）两个窗口并发获取
+        snapshot = await fetch_boundary_snapshot(
+            self.get_historical_data, api_url, object_codes, data_codes, start_time, end_time,
+            store=get_meter_reading_store()
+        )
 
-        # 获取结束时间的数据
-        end_obj = {
-            "dataCodes": data_codes,
-            "endTime": end_timestamp,
-            "fill": "0",
-            "funcName": "mean",
-            "funcTime": "",
-            "measurement": "realData",
-            "objectCodes": object_codes,
-            "startTime": end_timestamp - 10 * 60000  # 10分钟前
-        }
-        end_data = self.get_historical_data(api_url, end_obj)
-        
         # 如果API超时，直接返回空数据
-        if not end_data:
+        if not snapshot.end_data:
             logger.error(f"获取结束时间数据失败，停止处理: {api_url}")
             return []
-        
-        # 获取开始时间的数据
-        start_obj = {
-            "dataCodes": data_codes,
-            "endTime": start_timestamp + 3 * 60000,  # 3分钟后
-            "fill": "0",
-            "funcName": "mean",
-            "funcTime": "",
-            "measurement": "realData",
-            "objectCodes": object_codes,
-            "startTime": start_timestamp
-        }
-        start_data = self.get_historical_data(api_url, start_obj)
-        
-        # 如果API超时，直接返回空数据
-        if not start_data:
+        if not snapshot.start_data:
             logger.error(f"获取开始时间数据失败，停止处理: {api_url}")
             return []
         
         # 计算耗电量
+        data_list = [dict(item) for item in data_list]
         for i in range(len(data_list)):
             for j in range(len(object_codes)):
-                start_entry = next((item for item in start_data if item["tags"]["dataCode"] == data_codes[i] and item["tags"]["objectCode"] == object_codes[j]), None)
-                end_entry = next((item for item in end_data if item["tags"]["dataCode"] == data_codes[i] and item["tags"]["objectCode"] == object_codes[j]), None)
-
-                if start_entry and end_entry and start_entry["values"] and end_entry["values"]:
-                    data_list[i]["p9"] = round(start_entry["values"][0]["value"], 2)
-                    data_list[i]["p10"] = round(end_entry["values"][0]["value"], 2)
-                    if end_entry["values"][0]["value"] - start_entry["values"][0]["value"] >= -1:
-                        data_list[i]["p8"] = round(end_entry["values"][0]["value"] - start_entry["values"][0]["value"], 2)
+                readings = snapshot.readings(data_codes[i], object_codes[j])
+
+                if readings:
+                    start_value, end_value = readings
+                    data_list[i]["p9"] = round(start_value, 2)
+                    data_list[i]["p10"] = round(end_value, 2)
+                    if end_value - start_value >= -1:
+                        data_list[i]["p8"] = round(end_value - start_value, 2)
                     else:
                         data_list[i]["p8"] = "电表异常"
                     break
@@ -289,7 +298,7 @@ class ElectricityExportService:
             logger.error(f"导出数据时出错: {e}")
             return False
 
-    def export_single_ip(self, ip, config, start_time, end_time):
+    async def export_single_ip(self, ip, config, start_time, end_time):
         """导出单个IP的数据"""
         station_name = config.get('station', '未知站名')
         try:
@@ -304,7 +313,7 @@ class ElectricityExportService:
                 return False, "缺少数据点配置", None
             
             logger.info(f"{station_name} ({ip}) 正在获取节能状态数据...")
-            energy_status = self.get_energy_status(
+            energy_status = await self.get_energy_status(
                 api_url, 
                 config["jienengfeijieneng"]["data_codes"], 
                 config["jienengfeijieneng"]["object_codes"], 
@@ -319,7 +328,7 @@ class ElectricityExportService:
                 return False, error_msg, None
             
             logger.info(f"{station_name} ({ip}) 正在处理电耗数据...")
-            processed_data = self.process_data(api_url, data_list, data_codes, object_codes, start_time, end_time)
+            processed_data = await self.process_data(api_url, data_list, data_codes, object_codes, start_time, end_time)
             
             # 检查数据处理是否成功（如果所有API都超时，数据为空）
             if not processed_data or all(d.get("p8") == "" for d in processed_data):
@@ -330,7 +339,8 @@ class ElectricityExportService:
             filename = f"电耗统计_{station_name}_{ip}_{start_time.strftime('%Y%m%d')}_{end_time.strftime('%Y%m%d')}.xlsx"
             
             logger.info(f"{station_name} ({ip}) 正在导出文件: {filename}")
-            if self.export_data(processed_data, energy_status, start_time, end_time, filename):
+            # Excel 写入是阻塞的磁盘操作，放到线程中执行，避免阻塞其他站点的网络协程
+            if await asyncio.to_thread(self.export_data, processed_data, energy_status, start_time, end_time, filename):
                 logger.info(f"{station_name} ({ip}) 导出成功: {filename}")
                 return True, None, filename
             else:
@@ -341,6 +351,39 @@ class ElectricityExportService:
             logger.error(f"{station_name} ({ip}) {error_msg}")
             return False, error_msg, None
 
+    def _station_export_coroutines(self, config_map, start_time, end_time, semaphore=None):
+        """为每个站点生成导出协程，并发数受 max_concurrent_stations 限制，单站耗时受 station_timeout 限制
+
+        每个协程返回 (站点键, export_single_ip 的结果或异常)，便于 as_completed 时定位站点。
+        传入 semaphore 时使用调用方的并发预算（如全网导出跨线路共享）。
+        """
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, self.max_concurrent_stations))
+        task_id = _current_export_task.get()
+        timeout = self.station_timeout * len(split_time_range(start_time, end_time, self.chunk_size))
+
+        async def run(key, config):
+            # 续传：本任务中已成功导出的站点直接复用输出文件
+            done = _load_completed_station(self.checkpoint_store, task_id, key)
+            if done is not None:
+                logger.info(f"续传跳过已完成站点: {key}")
+                return key, (True, None, done["file_path"])
+            async with semaphore:
+                try:
+                    outcome = await asyncio.wait_for(
+                        self.export_single_ip(config['ip'], config, start_time, end_time), timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"{config.get('station', key)} 导出超时（{timeout:.0f} 秒）")
+                    return key, (False, "站点导出超时", None)
+                except Exception as e:
+                    return key, e
+            if outcome[0]:
+                _save_completed_station(self.checkpoint_store, task_id, key, outcome[2])
+            return key, outcome
+
+        return [run(key, config) for key, config in config_map.items()]
+
     async def export_data_async(self, selected_line, start_time, end_time):
         """异步导出数据"""
         try:
@@ -361,68 +404,49 @@ class ElectricityExportService:
                 station_name = config.get('station', '未知站名')
                 logger.info(f"  - {station_name} ({ip})")
             
-            # 使用线程池执行CPU密集型任务
-            loop = asyncio.get_event_loop()
-            
             results = []
             success_count = 0
             fail_count = 0
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:  # 增加并发数以支持M2线路6个站点
-                futures = {
-                    executor.submit(
-                        self.export_single_ip,
-                        ip, config, start_time, end_time
-                    ): ip for ip, config in config_map.items()
-                }
-
-                for future in concurrent.futures.as_completed(futures):
-                    ip = futures[future]
-                    station_name = config_map[ip].get('station', '未知站名')
-                    try:
-                        success, error, filename = future.result(timeout=12)  # 减少到12秒超时，提高并发效率
-                        if success:
-                            success_count += 1
-                            logger.info(f"✓ {station_name} ({ip}) 导出成功 - 文件: {filename}")
-                            results.append(StationExportResult(
-                                station_ip=ip,
-                                station_name=station_name,
-                                success=True,
-                                message="导出成功",
-                                file_path=filename
-                            ))
-                        else:
-                            fail_count += 1
-                            logger.error(f"✗ {station_name} ({ip}) 导出失败: {error}")
-                            results.append(StationExportResult(
-                                station_ip=ip,
-                                station_name=station_name,
-                                success=False,
-                                message=error or "导出失败",
-                                file_path=None
-                            ))
-                    except concurrent.futures.TimeoutError:
-                        fail_count += 1
-                        error_msg = "导出超时(15秒)"
-                        logger.error(f"✗ {station_name} ({ip}) {error_msg}")
+            # 所有站点作为协程在同一事件循环上并发执行，共享站点连接池
+            for future in asyncio.as_completed(self._station_export_coroutines(config_map, start_time, end_time)):
+                ip, outcome = await future
+                station_name = config_map[ip].get('station', '未知站名')
+                try:
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                    success, error, filename = outcome
+                    if success:
+                        success_count += 1
+                        logger.info(f"✓ {station_name} ({ip}) 导出成功 - 文件: {filename}")
                         results.append(StationExportResult(
                             station_ip=ip,
                             station_name=station_name,
-                            success=False,
-                            message=error_msg,
-                            file_path=None
+                            success=True,
+                            message="导出成功",
+                            file_path=filename
                         ))
-                    except Exception as e:
+                    else:
                         fail_count += 1
-                        error_msg = f"未知错误: {str(e)}"
-                        logger.error(f"✗ {station_name} ({ip}) {error_msg}")
+                        logger.error(f"✗ {station_name} ({ip}) 导出失败: {error}")
                         results.append(StationExportResult(
                             station_ip=ip,
                             station_name=station_name,
                             success=False,
-                            message=error_msg,
+                            message=error or "导出失败",
                             file_path=None
                         ))
+                except Exception as e:
+                    fail_count += 1
+                    error_msg = f"未知错误: {str(e)}"
+                    logger.error(f"✗ {station_name} ({ip}) {error_msg}")
+                    results.append(StationExportResult(
+                        station_ip=ip,
+                        station_name=station_name,
+                        success=False,
+                        message=error_msg,
+                        file_path=None
+                    ))
 
             # 打印最终统计结果
             logger.info(f"\n=== 导出统计结果 ===")
@@ -470,13 +494,8 @@ class ElectricityExportService:
             logger.info(f"[DEBUG] 任务创建成功: task_id={task_id}")
             
             # 在后台线程中执行导出
-            thread = threading.Thread(
-                target=self._export_with_progress,
-                args=(task_id, selected_line, start_time, end_time)
-            )
-            thread.daemon = True
             logger.info(f"[DEBUG] 准备启动后台线程")
-            thread.start()
+            _start_export_thread(self._export_with_progress, task_id, selected_line, start_time, end_time)
             logger.info(f"[DEBUG] 后台线程已启动")
             
             logger.info(f"[DEBUG] 准备返回结果")
@@ -487,7 +506,13 @@ class ElectricityExportService:
             return {"error": str(e)}
 
     def _export_with_progress(self, task_id, selected_line, start_time, end_time):
+        """带进度更新的导出执行（后台线程入口，在独立事件循环中运行）"""
+        self.checkpoint_store.cleanup()
+        asyncio.run(self._export_with_progress_async(task_id, selected_line, start_time, end_time))
+
+    async def _export_with_progress_async(self, task_id, selected_line, start_time, end_time):
         """带进度更新的导出执行"""
+        _current_export_task.set(task_id)
         # 预先初始化变量，确保异常时也能返回部分成功结果
         config_map = {}
         total_stations = 0
@@ -517,93 +542,97 @@ class ElectricityExportService:
             success_count = 0
             fail_count = 0
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-                # 提交所有任务
-                future_to_station = {}
-                for station_name, config in config_map.items():
-                    future = executor.submit(
-                        self.export_single_ip,
-                        config['ip'],
-                        config,
-                        start_time,
-                        end_time
-                    )
-                    future_to_station[future] = station_name
-                
-                # 处理完成的任务
-                completed = 0
-                # 当所有站点均完成时，进行一次兜底的提前完结，避免前端出现100%但仍为running且result为空的状态
-                allow_early_finalize = os.environ.get('FORCE_FAIL_AFTER_RESULTS') != '1'
-                early_finalized = False
-                for future in concurrent.futures.as_completed(future_to_station, timeout=120):
-                    station_name = future_to_station[future]
-                    completed += 1
-                    
+            # 处理完成的任务
+            completed = 0
+            # 当所有站点均完成时，进行一次兜底的提前完结，避免前端出现100%但仍为running且result为空的状态
+            allow_early_finalize = os.environ.get('FORCE_FAIL_AFTER_RESULTS') != '1'
+            early_finalized = False
+            coroutines = self._station_export_coroutines(config_map, start_time, end_time)
+            for future in asyncio.as_completed(coroutines, timeout=self._export_timeout(start_time, end_time)):
+                station_name, result = await future
+                completed += 1
+
+                try:
+                    if isinstance(result, BaseException):
+                        raise result
+                    # 统一结果为 StationExportResult，避免后续 r.dict() 报错
+                    s = False
+                    msg = None
+                    file_path = None
                     try:
-                        result = future.result(timeout=15)
-                        # 统一结果为 StationExportResult，避免后续 r.dict() 报错
-                        s = False
-                        msg = None
-                        file_path = None
-                        try:
-                            # export_single_ip 返回格式: (success: bool, message: Optional[str], filename: Optional[str])
-                            s, msg, file_path = result
-                        except Exception:
-                            # 若返回已是对象，做容错提取
-                            s = getattr(result, 'success', False)
-                            msg = getattr(result, 'message', None)
-                            file_path = getattr(result, 'file_path', None)
-
-                        station_result = StationExportResult(
-                            station_name=station_name,
-                            station_ip=config_map[station_name]['ip'],
-                            success=bool(s),
-                            message=(msg if msg else ("导出成功" if s else "导出失败")),
-                            file_path=file_path
-                        )
-                        results.append(station_result)
-
-                        if station_result.success:
-                            success_count += 1
-                            logger.info(f"✓ {station_name}: 导出成功")
-                        else:
-                            fail_count += 1
-                            logger.warning(f"✗ {station_name}: {station_result.message}")
-                            
-                    except Exception as e:
+                        # export_single_ip 返回格式: (success: bool, message: Optional[str], filename: Optional[str])
+                        s, msg, file_path = result
+                    except Exception:
+                        # 若返回已是对象，做容错提取
+                        s = getattr(result, 'success', False)
+                        msg = getattr(result, 'message', None)
+                        file_path = getattr(result, 'file_path', None)
+
+                    station_result = StationExportResult(
+                        station_name=station_name,
+                        station_ip=config_map[station_name]['ip'],
+                        success=bool(s),
+                        message=(msg if msg else ("导出成功" if s else "导出失败")),
+                        file_path=file_path
+                    )
+                    results.append(station_result)
+
+                    if station_result.success:
+                        success_count += 1
+                        logger.info(f"✓ {station_name}: 导出成功")
+                    else:
                         fail_count += 1
-                        error_msg = f"导出超时或出错: {str(e)}"
-                        logger.error(f"✗ {station_name}: {error_msg}")
-                        results.append(StationExportResult(
-                            station_name=station_name,
-                            station_ip=config_map[station_name]['ip'],
-                            success=False,
-                            message=error_msg
-                        ))
-                    
-                    # 更新进度
-                    progress_msg = f"已完成 {completed}/{total_stations} 个站点"
-                    task_manager.update_task_progress(task_id, completed, total_stations, progress_msg)
+                        logger.warning(f"✗ {station_name}: {station_result.message}")
 
-                    # 兜底：若所有站点都已完成，且允许提前完结，则立即设置结果并标记完成
-                    if not early_finalized and allow_early_finalize and completed >= total_stations:
-                        try:
-                            final_result = {
-                                "success": True,
-                                "message": f"导出完成: 成功 {success_count} 个, 失败 {fail_count} 个",
-                                "details": {
-                                    "total": total_stations,
-                                    "success_count": success_count,
-                                    "fail_count": fail_count,
-                                    "results": [r.dict() for r in results]
-                                }
+                except Exception as e:
+                    fail_count += 1
+                    error_msg = f"导出超时或出错: {str(e)}"
+                    logger.error(f"✗ {station_name}: {error_msg}")
+                    results.append(StationExportResult(
+                        station_name=station_name,
+                        station_ip=config_map[station_name]['ip'],
+                        success=False,
+                        message=error_msg
+                    ))
+
+                # 更新进度
+                progress_msg = f"已完成 {completed}/{total_stations} 个站点"
+                task_manager.update_task_progress(task_id, completed, total_stations, progress_msg)
+
+                # 任务已取消：保留已完成站点的结果与未完成分段的检查点，之后可续传
+                if _task_cancelled(task_id):
+                    logger.info(f"异步导出任务 {task_id} 已取消，已完成 {completed}/{total_stations} 个站点")
+                    task_manager.set_task_result(task_id, {
+                        "success": False,
+                        "message": "任务已取消，可续传",
+                        "details": {
+                            "total": total_stations,
+                            "success_count": success_count,
+                            "fail_count": fail_count,
+                            "results": [r.dict() for r in results]
+                        }
+                    })
+                    return
+
+                # 兜底：若所有站点都已完成，且允许提前完结，则立即设置结果并标记完成
+                if not early_finalized and allow_early_finalize and completed >= total_stations:
+                    try:
+                        final_result = {
+                            "success": True,
+                            "message": f"导出完成: 成功 {success_count} 个, 失败 {fail_count} 个",
+                            "details": {
+                                "total": total_stations,
+                                "success_count": success_count,
+                                "fail_count": fail_count,
+                                "results": [r.dict() for r in results]
                             }
-                            task_manager.set_task_result(task_id, final_result)
-                            task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
-                            logger.info(f"异步导出任务 {task_id} 提前完结 (进度=100%)")
-                            early_finalized = True
-                        except Exception as _e:
-                            logger.warning(f"任务 {task_id} 提前完结失败，继续后续流程: {_e}")
+                        }
+                        task_manager.set_task_result(task_id, final_result)
+                        task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+                        logger.info(f"异步导出任务 {task_id} 提前完结 (进度=100%)")
+                        early_finalized = True
+                    except Exception as _e:
+                        logger.warning(f"任务 {task_id} 提前完结失败，继续后续流程: {_e}")
 
             # 调试：可控地在汇总阶段模拟失败，用于联调前端“部分成功下载”
             try:
@@ -629,6 +658,8 @@ class ElectricityExportService:
             logger.info(f"异步导出任务 {task_id} 完成")
             # 标记任务完成，便于前端停止轮询
             task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+            # 已完成的任务不再续传，站点完成记录随之删除
+            self.checkpoint_store.clear(_station_results_key(self.checkpoint_store, task_id))
             
         except Exception as e:
             logger.error(f"异步导出任务 {task_id} 执行失败: {e}")
@@ -646,13 +677,189 @@ class ElectricityExportService:
             })
             # 标记任务失败，便于前端停止轮询
             task_manager.update_task_status(task_id, TaskStatus.FAILED)
+        finally:
+            # 本次导出的事件循环即将结束，释放站点连接池
+            await close_station_client()
+
+    def _export_timeout(self, start_time, end_time):
+        """整条线路导出的超时时间：每个分段窗口 120 秒"""
+        return 120 * len(split_time_range(start_time, end_time, self.chunk_size))
+
+    def resume_export(self, task_id):
+        """续传失败或已取消的电耗导出任务，已完成的分段从检查点读取
+
+        上一次运行的线程尚未退出时抛出 TaskBusyError。
+        """
+        task = task_manager.reset_for_resume(task_id)
+        if task is None:
+            return {"error": "任务不存在或当前状态不可续传"}
+
+        if task.task_type == "electricity_network":
+            target = self._export_network_with_progress
+            args = (task.line.split(","), task.start_time, task.end_time)
+        else:
+            target = self._export_with_progress
+            args = (task.line, task.start_time, task.end_time)
+
+        _start_export_thread(target, task_id, *args)
+        logger.info(f"续传导出任务: {task_id}")
+        return {"task_id": task_id, "status": "resumed"}
+
+    def start_network_export(self, start_time, end_time, lines=None):
+        """启动全网（多线路）电耗导出任务
+
+        Args:
+            lines: 需要导出的线路列表，为空时导出 line_configs 中的全部线路
+        """
+        try:
+            selected_lines = [line for line in self.line_configs if not lines or line in lines]
+            if not selected_lines:
+                return {"error": f"未找到线路配置: {lines}"}
+
+            task_id = task_manager.create_task(
+                task_type="electricity_network",
+                line=",".join(selected_lines),
+                start_time=start_time,
+                end_time=end_time
+            )
+
+            _start_export_thread(self._export_network_with_progress, task_id, selected_lines, start_time, end_time)
+
+            return {"task_id": task_id, "status": "started", "lines": selected_lines}
+
+        except Exception as e:
+            logger.error(f"启动全网导出任务失败: {e}")
+            return {"error": str(e)}
+
+    def _export_network_with_progress(self, task_id, lines, start_time, end_time):
+        """全网导出后台线程入口"""
+        self.checkpoint_store.cleanup()
+        asyncio.run(self._export_network_async(task_id, lines, start_time, end_time))
+
+    async def _export_network_async(self, task_id, lines, start_time, end_time):
+        """全网导出：所有线路的站点共享一个并发预算，按线路汇总进度与结果"""
+        _current_export_task.set(task_id)
+        line_stats = {
+            line: {"total": len(self.line_configs.get(line, {})), "completed": 0,
+                   "success_count": 0, "fail_count": 0, "results": []}
+            for line in lines
+        }
+        # 不同线路可能存在同名站点（换乘站），以 (线路, 站名) 作为键
+        config_map = {
+            (line, station_name): config
+            for line in lines
+            for station_name, config in self.line_configs.get(line, {}).items()
+        }
+        total_stations = len(config_map)
+        completed = 0
+
+        def progress_details():
+            return {
+                "lines": {
+                    line: {k: v for k, v in stats.items() if k != "results"}
+                    for line, stats in line_stats.items()
+                }
+            }
+
+        try:
+            task_manager.update_task_status(task_id, TaskStatus.RUNNING)
+            task_manager.update_task_progress(
+                task_id, 0, total_stations, f"开始全网导出: {len(lines)} 条线路", details=progress_details()
+            )
+            logger.info(f"开始全网导出: 线路={lines}, 共 {total_stations} 个站点, 并发上限 {self.network_max_concurrent_stations}")
+
+            semaphore = asyncio.Semaphore(max(1, self.network_max_concurrent_stations))
+            coroutines = self._station_export_coroutines(config_map, start_time, end_time, semaphore=semaphore)
+            for future in asyncio.as_completed(coroutines):
+                (line, station_name), outcome = await future
+                completed += 1
+                stats = line_stats[line]
+                stats["completed"] += 1
+
+                if isinstance(outcome, BaseException):
+                    success, message, file_path = False, f"导出超时或出错: {outcome}", None
+                else:
+                    success, message, file_path = outcome
+                station_result = StationExportResult(
+                    station_name=station_name,
+                    station_ip=config_map[(line, station_name)]['ip'],
+                    success=bool(success),
+                    message=message or ("导出成功" if success else "导出失败"),
+                    file_path=file_path
+                )
+                stats["results"].append(station_result.dict())
+                if station_result.success:
+                    stats["success_count"] += 1
+                else:
+                    stats["fail_count"] += 1
+                    logger.warning(f"✗ [{line}] {station_name}: {station_result.message}")
+
+                task_manager.update_task_progress(
+                    task_id, completed, total_stations,
+                    f"[{line}] 已完成 {stats['completed']}/{stats['total']} 个站点，全网 {completed}/{total_stations}",
+                    details=progress_details()
+                )
+
+                if _task_cancelled(task_id):
+                    logger.info(f"全网导出任务 {task_id} 已取消，已完成 {completed}/{total_stations} 个站点")
+                    task_manager.set_task_result(task_id, {
+                        "success": False,
+                        "message": "任务已取消，可续传",
+                        "details": {
+                            "total": total_stations,
+                            "lines": line_stats,
+                            "results": [r for stats in line_stats.values() for r in stats["results"]]
+                        }
+                    })
+                    return
+
+            success_count = sum(stats["success_count"] for stats in line_stats.values())
+            fail_count = sum(stats["fail_count"] for stats in line_stats.values())
+            task_manager.set_task_result(task_id, {
+                "success": True,
+                "message": f"全网导出完成: {len(lines)} 条线路, 成功 {success_count} 个, 失败 {fail_count} 个",
+                "details": {
+                    "total": total_stations,
+                    "success_count": success_count,
+                    "fail_count": fail_count,
+                    "lines": line_stats,
+                    "results": [r for stats in line_stats.values() for r in stats["results"]]
+                }
+            })
+            task_manager.update_task_status(task_id, TaskStatus.COMPLETED)
+            self.checkpoint_store.clear(_station_results_key(self.checkpoint_store, task_id))
+            logger.info(f"全网导出任务 {task_id} 完成: 成功 {success_count} 个, 失败 {fail_count} 个")
+
+        except Exception as e:
+            logger.error(f"全网导出任务 {task_id} 执行失败: {e}")
+            task_manager.set_task_result(task_id, {
+                "success": False,
+                "message": f"全网导出失败: {str(e)}",
+                "details": {
+                    "total": total_stations,
+                    "lines": line_stats,
+                    "results": [r for stats in line_stats.values() for r in stats["results"]]
+                }
+            })
+            task_manager.update_task_status(task_id, TaskStatus.FAILED)
+        finally:
+            await close_station_client()
 
 
 class SensorDataExportService:
     """传感器数据导出服务"""
     
     def __init__(self):
-        self.line_configs = config_electricity.line_configs
+        self.line_configs = load_line_configs()
+        # 单条线路内同时处理的站点数上限
+        self.max_concurrent_stations = int(os.environ.get("SENSOR_EXPORT_MAX_CONCURRENT_STATIONS", "6"))
+        # 传感器/风机点位配置很少变化，按站点IP缓存，避免每次导出都对 bus_object_point_data 做 LIKE 扫描
+        self.point_metadata_cache = TTLCache(
+            ttl=float(os.environ.get("SENSOR_METADATA_CACHE_TTL", "3600"))
+        )
+        # 长时间范围分段拉取与断点续传
+        self.chunk_size = DEFAULT_CHUNK
+        self.checkpoint_store = ChunkCheckpointStore()
 
     def process_temperature_humidity_sensor_data(self, point_data, point_pinlv_data, point_mingcheng_data):
         """
@@ -768,97 +975,277 @@ class SensorDataExportService:
             logger.error(f"获取传感器数据时出错: {str(e)}")
             return None
 
-    def export_temperature_humidity_sensor_data_to_csv(self, res_data, point_name_list, point_mingcheng_data, filename):
+    def iter_temperature_humidity_sensor_csv(self, res_data, point_name_list, point_mingcheng_data):
         """
-        将温湿度传感器数据导出为CSV文件
+        逐行生成温湿度传感器CSV内容（表头 + 每个时间点一行）
+
+        按行产出而不是拼接整份字符串，可直接写入文件或作为HTTP流式响应的内容，
+        内存占用与时间范围、传感器数量无关。
         """
-        try:
-            # 构建excelValuesList
-            excel_values_list = []
-            for name_list in point_name_list:
-                for point_name in name_list:
-                    node = None
-                    for element in res_data:
-                        tags = element.get("tags", {})
-                        if (tags.get("dataCode") == point_name["dataCode"] and
-                                tags.get("objectCode") == point_name["objectCode"]):
-                            node = element
-                            break
-
-                    if node:
-                        excel_values_list.append(node["values"])
-
-            # 构建CSV内容
-            csv_content = "时间,"
-
-            # 表头
-            daochu_flag = 0
-            for i in range(len(point_name_list) - 1):
-                fengjimingcheng = point_mingcheng_data[i * 2][1] if i * 2 < len(
-                    point_mingcheng_data) else "" if len(point_mingcheng_data) > i * 2 else ""
-                fengjimingcheng1 = point_mingcheng_data[i * 2 + 1][1] if i * 2 + 1 < len(
-                    point_mingcheng_data) else "" if len(point_mingcheng_data) > i * 2 + 1 else ""
+        # 构建excelValuesList
+        excel_values_list = []
+        res_index = HisDataIndex(res_data)
+        for name_list in point_name_list:
+            for point_name in name_list:
+                node = res_index.get(point_name["objectCode"], point_name["dataCode"])
 
-                if fengjimingcheng != "":
-                    daochu_flag += 1
-                    csv_content += f"{fengjimingcheng}频率,"
+                if node:
+                    excel_values_list.append(node["values"])
 
-                if fengjimingcheng1 != "":
-                    daochu_flag += 1
-                    csv_content += f"{fengjimingcheng1}频率,"
+        # 表头
+        header = ["时间,"]
+        daochu_flag = 0
+        for i in range(len(point_name_list) - 1):
+            fengjimingcheng = point_mingcheng_data[i * 2][1] if i * 2 < len(
+                point_mingcheng_data) else "" if len(point_mingcheng_data) > i * 2 else ""
+            fengjimingcheng1 = point_mingcheng_data[i * 2 + 1][1] if i * 2 + 1 < len(
+                point_mingcheng_data) else "" if len(point_mingcheng_data) > i * 2 + 1 else ""
 
-                for j in range(daochu_flag, len(point_name_list[i])):
-                    csv_content += f"温度传感器{point_name_list[i][j]['dataCode']},"
+            if fengjimingcheng != "":
+                daochu_flag += 1
+                header.append(f"{fengjimingcheng}频率,")
 
-                daochu_flag = 0
+            if fengjimingcheng1 != "":
+                daochu_flag += 1
+                header.append(f"{fengjimingcheng1}频率,")
 
-            # 处理大系统温度传感器
-            dxtwsdcgq_list = point_name_list[-1] if point_name_list else []
-            for i in range(len(dxtwsdcgq_list)):
-                csv_content += f"大系统温度传感器{dxtwsdcgq_list[i]['dataCode']},"
+            for j in range(daochu_flag, len(point_name_list[i])):
+                header.append(f"温度传感器{point_name_list[i][j]['dataCode']},")
 
-            csv_content += "\n"
+            daochu_flag = 0
 
-            # 内容
-            if excel_values_list and len(excel_values_list) > 0 and len(excel_values_list[0]) > 0:
-                for i in range(len(excel_values_list[0])):
-                    # 添加时间
-                    time_str = excel_values_list[0][i]["time"][:16] if "time" in excel_values_list[0][i] else ""
-                    csv_content += f"{time_str}\t,"
+        # 处理大系统温度传感器
+        dxtwsdcgq_list = point_name_list[-1] if point_name_list else []
+        for i in range(len(dxtwsdcgq_list)):
+            header.append(f"大系统温度传感器{dxtwsdcgq_list[i]['dataCode']},")
 
-                    # 添加数值
-                    for j in range(len(excel_values_list)):
-                        if i < len(excel_values_list[j]):
-                            value = excel_values_list[j][i].get("value", 0)
-                            csv_content += f"{value:.2f}\t,"
-                        else:
-                            csv_content += "0.00\t,"
+        header.append("\n")
+        yield "".join(header)
 
-                    csv_content += "\n"
+        # 内容：以第一条序列的时间轴对齐其余序列，缺失值补0
+        if excel_values_list and len(excel_values_list[0]) > 0:
+            for i in range(len(excel_values_list[0])):
+                time_str = excel_values_list[0][i]["time"][:16] if "time" in excel_values_list[0][i] else ""
+                row = [f"{time_str}\t,"]
+                for values in excel_values_list:
+                    if i < len(values):
+                        row.append(f"{values[i].get('value', 0):.2f}\t,")
+                    else:
+                        row.append("0.00\t,")
+                row.append("\n")
+                yield "".join(row)
+
+    async def fetch_sensor_data_chunked(self, api_url, dataCodes, objectCodes, start_time, end_time):
+        """分段获取传感器历史数据，已完成的分段写检查点，失败后重试可从断点继续"""
+        job_key = self.checkpoint_store.job_key(
+            "sensor", api_url, sorted(dataCodes), sorted(objectCodes), start_time, end_time, self.chunk_size
+        )
+        return await fetch_in_chunks(
+            lambda s, e: asyncio.to_thread(self.fetch_sensor_data, api_url, dataCodes, objectCodes, s, e),
+            start_time, end_time, self.checkpoint_store, job_key,
+            chunk=self.chunk_size, should_continue=_export_should_continue,
+        )
+
+    def export_temperature_humidity_sensor_data_to_csv(self, res_data, point_name_list, point_mingcheng_data, filename):
+        """
+        将温湿度传感器数据导出为CSV文件（逐行写入磁盘）
 
-            # 写入文件
-            with open(filename, 'w', encoding='utf-8-sig') as f:
-                f.write(csv_content)
+        先写入同目录下的临时文件，全部写完后再原子替换为目标文件名，
+        生成过程中出错时删除临时文件，不会留下可被下载的半截文件。
+        """
+        tmp_filename = f"{filename}.part"
+        try:
+            with open(tmp_filename, 'w', encoding='utf-8-sig') as f:
+                for line in self.iter_temperature_humidity_sensor_csv(res_data, point_name_list, point_mingcheng_data):
+                    f.write(line)
+            os.replace(tmp_filename, filename)
 
             logger.info(f"成功导出温湿度传感器数据到 {filename}")
             return True
 
         except Exception as e:
             logger.error(f"导出温湿度传感器数据到CSV时出错: {str(e)}")
+            try:
+                os.remove(tmp_filename)
+            except OSError:
+                pass
             return False
 
-    async def export_data_async(self, selected_line, start_time, end_time):
-        """异步导出传感器数据"""
+    def _load_station_point_metadata(self, station_ip):
+        """从站点数据库查询传感器、风机频率、风机名称点位配置"""
+        data_cgq = execute_query_with_host(db_config.SELECT_CGQ_OBJECT_POINT_DATA, host=station_ip)
+        data1_fanfre = execute_query_with_host(db_config.SELECT_FANFRE_OBJECT_POINT_DATA, host=station_ip)
+        data2_fanname = execute_query_with_host(db_config.SELECT_FANNAME_OBJECT_POINT_DATA, host=station_ip)
+        return data_cgq, data1_fanfre, data2_fanname
+
+    def query_station_point_metadata(self, station_ip):
+        """获取站点的点位配置（优先读缓存，查询失败不缓存）"""
+        return self.point_metadata_cache.get_or_load(
+            station_ip, lambda: self._load_station_point_metadata(station_ip)
+        )
+
+    def invalidate_point_metadata(self, station_ip=None):
+        """使点位配置缓存失效；station_ip 为空时清空所有站点"""
+        if station_ip:
+            self.point_metadata_cache.invalidate(station_ip)
+        else:
+            self.point_metadata_cache.clear()
+        logger.info(f"传感器点位配置缓存已失效: {station_ip or '全部站点'}")
+
+    async def warm_up_point_metadata(self, lines=None):
+        """预加载点位配置缓存
+
+        Args:
+            lines: 需要预热的线路列表，为空时预热所有线路
+        Returns:
+            (成功站点数, 失败站点数)
+        """
+        station_ips = {
+            config['ip']
+            for line, config_map in self.line_configs.items()
+            if not lines or line in lines
+            for config in config_map.values()
+            if config.get('ip')
+        }
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_stations))
+
+        async def load(station_ip):
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(self.query_station_point_metadata, station_ip)
+                    return True
+                except Exception as e:
+                    logger.warning(f"预热站点 {station_ip} 点位配置失败: {e}")
+                    return False
+
+        outcomes = await asyncio.gather(*(load(ip) for ip in station_ips))
+        loaded = sum(outcomes)
+        logger.info(f"传感器点位配置缓存预热完成: 成功 {loaded} 个, 失败 {len(outcomes) - loaded} 个")
+        return loaded, len(outcomes) - loaded
+
+    async def export_single_station(self, ip, config, start_time, end_time):
+        """导出单个站点的传感器数据"""
+        station_name = config.get('station', '未知站名')
         try:
+            logger.info(f"正在处理 {station_name} ({ip}) 的传感器数据...")
+            station_ip = config['ip']
+            api_url = f"http://{config['ip']}:9898"
+
+            # 按站点IP直接查询，不修改全局 DB_CONFIG，避免并发站点互相覆盖
+            logger.info(f"{station_name} ({ip}) 正在查询数据库配置...")
+            data_cgq, data1_fanfre, data2_fanname = await asyncio.to_thread(
+                self.query_station_point_metadata, station_ip
+            )
+
+            point_name_list, object_codes, data_codes = self.process_temperature_humidity_sensor_data(data_cgq, data1_fanfre, data2_fanname)
+
+            # 获取传感器数据
+            logger.info(f"{station_name} ({ip}) 正在获取传感器历史数据...")
+            sensor_data = await self.fetch_sensor_data_chunked(api_url, data_codes, object_codes, start_time, end_time)
+
+            if not sensor_data:
+                error_msg = "没有传感器数据"
+                logger.error(f"✗ {station_name} ({ip}) {error_msg}")
+                return StationExportResult(
+                    station_ip=ip,
+                    station_name=station_name,
+                    success=False,
+                    message=error_msg,
+                    file_path=None
+                )
+
+            filename = f"传感器历史数据_{config['station']}_{start_time.strftime('%Y%m%d')}_{end_time.strftime('%Y%m%d')}.csv"
+            logger.info(f"{station_name} ({ip}) 正在导出文件: {filename}")
+            if await asyncio.to_thread(
+                self.export_temperature_humidity_sensor_data_to_csv,
+                sensor_data, point_name_list, data2_fanname, filename
+            ):
+                logger.info(f"✓ {station_name} ({ip}) 传感器数据导出成功 - 文件: {filename}")
+                return StationExportResult(
+                    station_ip=ip,
+                    station_name=station_name,
+                    success=True,
+                    message="导出成功",
+                    file_path=filename
+                )
+
+            error_msg = "导出文件失败"
+            logger.error(f"✗ {station_name} ({ip}) {error_msg}")
+            return StationExportResult(
+                station_ip=ip,
+                station_name=station_name,
+                success=False,
+                message=error_msg,
+                file_path=None
+            )
+        except Exception as e:
+            error_msg = f"处理时出错: {str(e)}"
+            logger.error(f"✗ {station_name} ({ip}) {error_msg}")
+            return StationExportResult(
+                station_ip=ip,
+                station_name=station_name,
+                success=False,
+                message=error_msg,
+                file_path=None
+            )
+
+    def start_async_export(self, selected_line, start_time, end_time):
+        """启动异步导出任务，进度通过 task_manager 查询"""
+        try:
+            task_id = task_manager.create_task(
+                task_type="sensor",
+                line=selected_line,
+                start_time=start_time,
+                end_time=end_time
+            )
+
+            _start_export_thread(self._export_with_progress, task_id, selected_line, start_time, end_time)
+
+            return {"task_id": task_id, "status": "started"}
+
+        except Exception as e:
+            logger.error(f"启动传感器导出任务失败: {e}")
+            return {"error": str(e)}
+
+    def resume_export(self, task_id):
+        """续传失败或已取消的传感器导出任务，已完成的分段从检查点读取
+
+        上一次运行的线程尚未退出时抛出 TaskBusyError。
+        """
+        task = task_manager.reset_for_resume(task_id)
+        if task is None:
+            return {"error": "任务不存在或当前状态不可续传"}
+
+        _start_export_thread(self._export_with_progress, task_id, task.line, task.start_time, task.end_time)
+        logger.info(f"续传传感器导出任务: {task_id}")
+        return {"task_id": task_id, "status": "resumed"}
+
+    def _export_with_progress(self, task_id, selected_line, start_time, end_time):
+        """后台线程入口，在独立事件循环中执行带进度的导出"""
+        self.checkpoint_store.cleanup()
+        asyncio.run(self.export_data_async(selected_line, start_time, end_time, task_id=task_id))
+
+    async def export_data_async(self, selected_line, start_time, end_time, task_id=None):
+        """异步导出传感器数据
+
+        站点之间并发执行（上限 max_concurrent_stations）；传入 task_id 时逐站点更新任务进度并写入最终结果。
+        """
+        if task_id:
+            _current_export_task.set(task_id)
+        try:
+            if task_id:
+                task_manager.update_task_status(task_id, TaskStatus.RUNNING)
+
             config_map = self.line_configs.get(selected_line, {})
             if not config_map:
                 logger.error(f"所选线路 {selected_line} 没有配置信息")
-                return ExportResult(
+                return self._finish_task(task_id, ExportResult(
                     success=False,
                     message=f"所选线路 {selected_line} 没有配置信息"
-                )
+                ))
 
-            logger.info(f"开始导出 {selected_line} 的传感器数据，共 {len(config_map)} 个站点")
+            total_stations = len(config_map)
+            logger.info(f"开始导出 {selected_line} 的传感器数据，共 {total_stations} 个站点")
             logger.info(f"导出时间范围: {start_time} 至 {end_time}")
             
             # 打印所有车站信息
@@ -866,80 +1253,62 @@ class SensorDataExportService:
             for ip, config in config_map.items():
                 station_name = config.get('station', '未知站名')
                 logger.info(f"  - {station_name} ({ip})")
-            
-            # 使用线程池执行CPU密集型任务
-            loop = asyncio.get_event_loop()
+
+            if task_id:
+                task_manager.update_task_progress(task_id, 0, total_stations, "开始导出...")
             
             results = []
             success_count = 0
             fail_count = 0
-            
-            for ip, config in config_map.items():
-                station_name = config.get('station', '未知站名')
-                try:
-                    logger.info(f"正在处理 {station_name} ({ip}) 的传感器数据...")
-                    station_ip = config['ip']
-                    api_url = f"http://{config['ip']}:9898"
-                    DB_CONFIG['host'] = station_ip
-                    
-                    logger.info(f"{station_name} ({ip}) 正在查询数据库配置...")
-                    data_cgq = execute_query(db_config.SELECT_CGQ_OBJECT_POINT_DATA)
-                    data1_fanfre = execute_query(db_config.SELECT_FANFRE_OBJECT_POINT_DATA)
-                    data2_fanname = execute_query(db_config.SELECT_FANNAME_OBJECT_POINT_DATA)
-                    
-                    point_name_list, object_codes, data_codes = self.process_temperature_humidity_sensor_data(data_cgq, data1_fanfre, data2_fanname)
-                    
-                    # 获取传感器数据
-                    logger.info(f"{station_name} ({ip}) 正在获取传感器历史数据...")
-                    sensor_data = self.fetch_sensor_data(api_url, data_codes, object_codes, start_time, end_time)
-                    
-                    if sensor_data:
-                        filename = f"传感器历史数据_{config['station']}_{start_time.strftime('%Y%m%d')}_{end_time.strftime('%Y%m%d')}.csv"
-                        logger.info(f"{station_name} ({ip}) 正在导出文件: {filename}")
-                        if self.export_temperature_humidity_sensor_data_to_csv(sensor_data, point_name_list, data2_fanname, filename):
-                            success_count += 1
-                            logger.info(f"✓ {station_name} ({ip}) 传感器数据导出成功 - 文件: {filename}")
-                            results.append(StationExportResult(
-                                station_ip=ip,
-                                station_name=station_name,
-                                success=True,
-                                message="导出成功",
-                                file_path=filename
-                            ))
-                        else:
-                            fail_count += 1
-                            error_msg = "导出文件失败"
-                            logger.error(f"✗ {station_name} ({ip}) {error_msg}")
-                            results.append(StationExportResult(
-                                station_ip=ip,
-                                station_name=station_name,
-                                success=False,
-                                message=error_msg,
-                                file_path=None
-                            ))
-                    else:
-                        fail_count += 1
-                        error_msg = "没有传感器数据"
-                        logger.error(f"✗ {station_name} ({ip}) {error_msg}")
-                        results.append(StationExportResult(
-                            station_ip=ip,
-                            station_name=station_name,
-                            success=False,
-                            message=error_msg,
-                            file_path=None
-                        ))
+            semaphore = asyncio.Semaphore(max(1, self.max_concurrent_stations))
 
-                except Exception as e:
+            async def run(ip, config):
+                # 续传：本任务中已成功导出的站点直接复用输出文件
+                done = _load_completed_station(self.checkpoint_store, task_id, ip)
+                if done is not None:
+                    logger.info(f"续传跳过已完成站点: {ip}")
+                    return StationExportResult(
+                        station_ip=config['ip'],
+                        station_name=config.get('station', '未知站名'),
+                        success=True,
+                        message="导出成功",
+                        file_path=done["file_path"]
+                    )
+                async with semaphore:
+                    result = await self.export_single_station(ip, config, start_time, end_time)
+                if result.success:
+                    _save_completed_station(self.checkpoint_store, task_id, ip, result.file_path)
+                return result
+
+            completed = 0
+            for future in asyncio.as_completed([run(ip, config) for ip, config in config_map.items()]):
+                result = await future
+                results.append(result)
+                completed += 1
+                if result.success:
+                    success_count += 1
+                else:
                     fail_count += 1
-                    error_msg = f"处理时出错: {str(e)}"
-                    logger.error(f"✗ {station_name} ({ip}) {error_msg}")
-                    results.append(StationExportResult(
-                        station_ip=ip,
-                        station_name=station_name,
-                        success=False,
-                        message=error_msg,
-                        file_path=None
-                    ))
+                if task_id:
+                    task_manager.update_task_progress(
+                        task_id, completed, total_stations,
+                        f"已完成 {completed}/{total_stations} 个站点",
+                        details={"last_station": result.station_name, "success": result.success}
+                    )
+                    if _task_cancelled(task_id):
+                        logger.info(f"传感器导出任务 {task_id} 已取消，已完成 {completed}/{total_stations} 个站点")
+                        export_result = ExportResult(
+                            success=False,
+                            message="任务已取消，可续传",
+                            details={
+                                "total": total_stations,
+                                "success_count": success_count,
+                                "fail_count": fail_count,
+                                "results": [r.dict() for r in results]
+                            }
+                        )
+                        task_manager.set_task_result(task_id, export_result.dict())
+                        return export_result
 
             # 打印最终统计结果
             logger.info(f"\n=== 传感器数据导出统计结果 ===")
@@ -955,7 +1324,7 @@ class SensorDataExportService:
             
             logger.info(f"=== 传感器数据导出完成 ===")
 
-            return ExportResult(
+            return self._finish_task(task_id, ExportResult(
                 success=True,
                 message=f"传感器数据导出完成: 成功 {success_count} 个, 失败 {fail_count} 个",
                 details={
@@ -964,10 +1333,21 @@ class SensorDataExportService:
                     "fail_count": fail_count,
                     "results": [result.dict() for result in results]
                 }
-            )
+            ))
         except Exception as e:
             logger.error(f"异步导出传感器数据时出错: {e}")
-            return ExportResult(
+            return self._finish_task(task_id, ExportResult(
                 success=False,
                 message=f"导出失败: {str(e)}"
-            )
\ No newline at end of file
+            ))
+
+    def _finish_task(self, task_id, export_result):
+        """将导出结果写回任务（若有）并原样返回"""
+        if task_id:
+            task_manager.set_task_result(task_id, export_result.dict())
+            task_manager.update_task_status(
+                task_id, TaskStatus.COMPLETED if export_result.success else TaskStatus.FAILED
+            )
+            if export_result.success:
+                self.checkpoint_store.clear(_station_results_key(self.checkpoint_store, task_id))
+        return export_result
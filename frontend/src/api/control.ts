@@ -296,8 +296,9 @@ export async function exportElectricityData(request: ExportRequest): Promise<Exp
   return unwrap<ExportResult>(data)
 }
 
-export async function exportSensorData(request: ExportRequest): Promise<ExportResult> {
-  const { data } = await http.post('/api/export/sensor', request)
+// asyncTask=true 时后端以后台任务方式执行，返回 task_id 供轮询进度
+export async function exportSensorData(request: ExportRequest, asyncTask = false): Promise<ExportResult> {
+  const { data } = await http.post('/api/export/sensor', request, asyncTask ? { params: { async_task: true } } : undefined)
   return unwrap<ExportResult>(data)
 }
 
@@ -8,9 +8,10 @@ from threading import RLock
 from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env", override=True)
@@ -18,11 +19,16 @@ import hashlib
 
 import requests
 
-import config_electricity
 from audit_service import audit_service
 from backend.app.api.data_upload import router as data_upload_router
 from backend.app.api.energy_dashboard import router as energy_dashboard_router
-from backend.app.core.dependencies import initialize_services, shutdown_services
+from backend.app.config.config_snapshot import load_line_configs
+from backend.app.config.station_registry import StationEntry, get_station_registry
+from backend.app.core.dependencies import (
+    get_energy_service,
+    initialize_services,
+    shutdown_services,
+)
 from backend.app.middleware.error_handler import ErrorHandlerMiddleware
 from backend.app.middleware.logging import (
     RequestLoggingMiddleware,
@@ -37,18 +43,27 @@ from backend.app.middleware.response import (
     ResponseStandardizationMiddleware,
 )
 from backend.app.middleware.validation import RequestValidationMiddleware
-from control_service import device_control_service
-from db_config import ensure_operation_log_table, execute_query, insert_operation_log
+from backend.app.utils.station_client import close_station_client
+from control_service import DeviceTreeUnavailableError, device_control_service, etag_matches
+from db_config import (
+    close_connection_pools,
+    ensure_operation_log_table,
+    execute_query_async,
+    get_pool_stats,
+    insert_operation_log_async,
+    run_idle_eviction,
+)
 from export_service import ElectricityExportService, SensorDataExportService
 from logger_config import app_logger
 from models import (
     BatchWriteRequest,
     ExportRequest,
+    NetworkExportRequest,
     RealtimeQuery,
     SensorExportRequest,
     WriteCommand,
 )
-from task_manager import task_manager
+from task_manager import TaskBusyError, task_manager
 
 # 使用配置好的logger
 logger = app_logger
@@ -62,6 +77,10 @@ app.include_router(energy_dashboard_router, prefix="/api/energy", tags=["能源
 app.include_router(data_upload_router, prefix="/api/data", tags=["数据管理"])
 
 
+# 启动时创建的后台任务；事件循环只持有任务的弱引用，需在此保留强引用直到任务结束
+_background_tasks: set = set()
+
+
 @app.on_event("startup")
 async def _startup_check():
     # 启动时输出 token 加载状态，便于问题定位（不打印明文）
@@ -86,16 +105,61 @@ async def _startup_check():
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
 
+    # 可选：后台预热传感器点位配置缓存（SENSOR_METADATA_WARMUP=all 或逗号分隔的线路）
+    warmup = os.environ.get("SENSOR_METADATA_WARMUP", "").strip()
+    if warmup:
+        lines = None if warmup.lower() == "all" else [x.strip() for x in warmup.split(",") if x.strip()]
+        task = asyncio.create_task(sensor_service.warm_up_point_metadata(lines))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        logger.info(f"[startup] 传感器点位配置缓存预热已启动: {warmup}")
+
+    # 能耗小时/日汇总增量任务（需配置 cache.energy_rollup_path；ENERGY_ROLLUP_INTERVAL=0 关闭）
+    rollup_interval = float(os.environ.get("ENERGY_ROLLUP_INTERVAL", "900"))
+    rollup_service = get_energy_service().rollup_service
+    if rollup_service.enabled and rollup_interval > 0:
+        app.state.energy_rollup_task = asyncio.create_task(
+            rollup_service.run_periodic(rollup_interval)
+        )
+
+    # 定时回收数据库连接池中的空闲连接（DB_POOL_EVICT_INTERVAL=0 关闭）
+    evict_interval = float(os.environ.get("DB_POOL_EVICT_INTERVAL", "60"))
+    if evict_interval > 0:
+        app.state.db_pool_evict_task = asyncio.create_task(run_idle_eviction(evict_interval))
+
+    # 站点功率后台采集（cache.power_collector_interval 或 POWER_COLLECTOR_INTERVAL 开启，默认关闭），
+    # 实时监控接口读取内存中的采样
+    get_energy_service().power_collector.start()
+
 
 @app.on_event("shutdown")
 async def _shutdown_cleanup():
     """应用关闭时的清理工作"""
+    rollup_task = getattr(app.state, "energy_rollup_task", None)
+    if rollup_task is not None:
+        rollup_task.cancel()
+    evict_task = getattr(app.state, "db_pool_evict_task", None)
+    if evict_task is not None:
+        evict_task.cancel()
+    for task in list(_background_tasks):
+        task.cancel()
+    get_energy_service().power_collector.stop()
+
     try:
         await shutdown_services()
         logger.info("Services shutdown successfully")
     except Exception as e:
         logger.error(f"Failed to shutdown services: {e}")
 
+    # 关闭主事件循环上的站点连接池
+    try:
+        await close_station_client()
+    except Exception as e:
+        logger.warning(f"关闭站点连接池失败: {e}")
+
+    # 关闭数据库连接池中的空闲连接
+    close_connection_pools()
+
 
 # 确保审计表存在
 try:
@@ -179,11 +243,17 @@ async def root():
     return {"message": "环控平台维护工具Web版 API"}
 
 
+@app.get("/health")
+async def health():
+    """健康检查，附带各主机数据库连接池的指标"""
+    return {"status": "ok", "db_pools": get_pool_stats()}
+
+
 @app.get("/api/lines")
 async def get_lines():
     """获取所有线路配置"""
     try:
-        lines = list(config_electricity.line_configs.keys())
+        lines = list(load_line_configs().keys())
         return {"lines": lines}
     except Exception as e:
         logger.error(f"获取线路配置失败: {e}")
@@ -194,10 +264,10 @@ async def get_lines():
 async def get_line_config(line_name: str):
     """获取指定线路的配置详情"""
     try:
-        if line_name not in config_electricity.line_configs:
+        if line_name not in load_line_configs():
             raise HTTPException(status_code=404, detail=f"线路 {line_name} 不存在")
 
-        config = config_electricity.line_configs[line_name]
+        config = load_line_configs()[line_name]
         # 只返回基本信息，不返回完整的data_list以减少数据量
         simplified_config = {}
         for station_name, station_config in config.items():
@@ -219,7 +289,7 @@ async def get_line_configs():
     try:
         # 转换为前端需要的格式：{线路名: [{station_name, station_ip}]}
         result = {}
-        for line_name, line_config in config_electricity.line_configs.items():
+        for line_name, line_config in load_line_configs().items():
             stations = []
             for station_name, station_config in line_config.items():
                 stations.append(
@@ -236,38 +306,18 @@ async def get_line_configs():
 
 
 # ===================== 能源驾驶舱接口 =====================
-def _get_station_config(line: str, station_ip: Optional[str]) -> Dict[str, Any]:
-    """根据线路与可选的 station_ip 获取车站配置"""
-    line_map = config_electricity.line_configs.get(line)
-    if not line_map:
+def _get_station_config(line: str, station_ip: Optional[str]) -> StationEntry:
+    """根据线路与可选的 station_ip 获取车站配置（未指定 station_ip 时取线路第一个车站）"""
+    registry = get_station_registry()
+    stations = registry.stations_in(line)
+    if not stations:
         raise HTTPException(status_code=404, detail=f"线路 {line} 不存在")
-    target = None
-    for _station_name, cfg in line_map.items():
-        if station_ip is None:
-            target = cfg
-            break
-        if cfg.get("ip") == station_ip:
-            target = cfg
-            break
-    if not target:
+    if station_ip is None:
+        return stations[0]
+    station = registry.by_ip(station_ip)
+    if station is None or station not in stations:
         raise HTTPException(status_code=404, detail=f"车站 {station_ip} 未找到")
-    return target
-
-
-def _sum_kw_from_data_list(data_list: List[Dict[str, Any]]) -> float:
-    """从 data_list 的 p5 字段中解析额定功率并求和 (单位: kW)"""
-    import re
-
-    total_kw = 0.0
-    for item in data_list or []:
-        p5 = str(item.get("p5", "")).upper()
-        m = re.search(r"(\d+(?:\.\d+)?)\s*KW", p5)
-        if m:
-            try:
-                total_kw += float(m.group(1))
-            except Exception:
-                pass
-    return total_kw
+    return station
 
 
 @app.get("/api/energy/kpi")
@@ -278,7 +328,7 @@ async def get_energy_kpi(line: str, station_ip: Optional[str] = None):
     在无实时平台连接的环境下提供稳定的可视化数据源。
     """
     cfg = _get_station_config(line, station_ip)
-    sum_kw = _sum_kw_from_data_list(cfg.get("data_list", []))
+    sum_kw = cfg.rated_power_kw
     from datetime import datetime
 
     now = datetime.now()
@@ -287,7 +337,7 @@ async def get_energy_kpi(line: str, station_ip: Optional[str] = None):
     total_kwh_today = sum_kw * utilization * max(hours_today, 0.1)
     current_kw = sum_kw * 0.40
     peak_kw = sum_kw * 0.75
-    station_count = len(config_electricity.line_configs.get(line, {}))
+    station_count = len(get_station_registry().stations_in(line))
     return {
         "total_kwh_today": round(total_kwh_today, 2),
         "current_kw": round(current_kw, 2),
@@ -300,7 +350,7 @@ async def get_energy_kpi(line: str, station_ip: Optional[str] = None):
 async def get_energy_realtime(line: str, station_ip: Optional[str] = None):
     """实时能耗监测数据，返回最近 60 分钟按 5 分钟分辨率的功率曲线。"""
     cfg = _get_station_config(line, station_ip)
-    sum_kw = _sum_kw_from_data_list(cfg.get("data_list", []))
+    sum_kw = cfg.rated_power_kw
     import math
     from datetime import datetime, timedelta
 
@@ -315,47 +365,11 @@ async def get_energy_realtime(line: str, station_ip: Optional[str] = None):
     return {"timestamps": timestamps, "series": [{"name": "总功率", "points": points}]}
 
 
-@app.get("/api/energy/trend")
-async def get_energy_trend(
-    line: str, station_ip: Optional[str] = None, period: str = "24h"
-):
-    """历史能耗趋势：支持 24h / 7d / 30d。返回按周期聚合的 kWh。"""
-    cfg = _get_station_config(line, station_ip)
-    sum_kw = _sum_kw_from_data_list(cfg.get("data_list", []))
-    import math
-
-    timestamps: List[str] = []
-    values: List[float] = []
-    base_util = 0.35
-    if period == "7d":
-        count = 7 * 24
-        for i in range(count):
-            timestamps.append(f"H{i+1}")
-            util = base_util * (0.8 + 0.2 * math.sin(i / 8.0))
-            kwh = sum_kw * util
-            values.append(round(kwh, 2))
-    elif period == "30d":
-        count = 30
-        for i in range(count):
-            timestamps.append(f"D{i+1}")
-            util = base_util * (0.9 + 0.2 * math.sin(i / 5.0))
-            kwh = sum_kw * util * 24.0 * 0.7
-            values.append(round(kwh, 2))
-    else:
-        count = 24
-        for i in range(count):
-            timestamps.append(f"{i}:00")
-            util = base_util * (0.8 + 0.2 * math.sin(i / 6.0))
-            kwh = sum_kw * util
-            values.append(round(kwh, 2))
-    return {"timestamps": timestamps, "values": values}
-
-
 @app.get("/api/energy/suggestions")
 async def get_energy_suggestions(line: str, station_ip: Optional[str] = None):
     """节能优化建议：基于设备额定功率与通用策略生成可执行建议。"""
     cfg = _get_station_config(line, station_ip)
-    sum_kw = _sum_kw_from_data_list(cfg.get("data_list", []))
+    sum_kw = cfg.rated_power_kw
     from datetime import datetime
 
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -394,7 +408,7 @@ async def energy_compare(
     依据配置的设备额定功率进行近似估算。
     """
     cfg = _get_station_config(line, station_ip)
-    sum_kw = _sum_kw_from_data_list(cfg.get("data_list", []))
+    sum_kw = cfg.rated_power_kw
 
     # 估算周期小时数
     period_hours_map = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24, "90d": 90 * 24}
@@ -433,18 +447,11 @@ async def energy_classification(
 ):
     """分类分项能耗分析：按设备类别聚合能耗估算。"""
     cfg = _get_station_config(line, station_ip)
-    data_list = cfg.get("data_list", [])
 
     # 估算周期小时数
     period_hours_map = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24, "90d": 90 * 24}
     hours = period_hours_map.get(period, 24)
 
-    import re
-
-    def parse_kw(p5: str) -> float:
-        m = re.search(r"(\d+(?:\.\d+)?)\s*KW", str(p5).upper())
-        return float(m.group(1)) if m else 0.0
-
     def classify(name: str) -> str:
         n = str(name)
         if "冷机" in n:
@@ -479,11 +486,9 @@ async def energy_classification(
         }.get(cat, 0.30)
 
     agg: Dict[str, float] = {}
-    for item in data_list:
-        name = item.get("p3", "")
-        cat = classify(name)
-        kw = parse_kw(item.get("p5", "0"))
-        kwh = kw * hours * load_factor(cat)
+    for device in cfg.devices:
+        cat = classify(device.name)
+        kwh = device.rated_power * hours * load_factor(cat)
         agg[cat] = agg.get(cat, 0.0) + kwh
 
     result = [{"name": k, "value": round(v, 2)} for k, v in agg.items()]
@@ -515,14 +520,53 @@ async def export_electricity_data(request: ExportRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/export/electricity/network")
+async def export_network_electricity_data(request: NetworkExportRequest):
+    """全网电耗导出 - 所有（或指定）线路作为一个异步任务，共享站点并发预算"""
+    try:
+        logger.info(
+            f"开始全网导出电耗数据: 线路={request.lines or '全部'}, 时间范围={request.start_time} 到 {request.end_time}"
+        )
+
+        result = electricity_service.start_network_export(
+            request.start_time, request.end_time, request.lines
+        )
+
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+
+        return {
+            "success": True,
+            "message": "全网导出任务已启动",
+            "task_id": result["task_id"],
+            "lines": result["lines"],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"启动全网导出任务失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/export/sensor")
-async def export_sensor_data(request: SensorExportRequest):
-    """导出传感器数据"""
+async def export_sensor_data(request: SensorExportRequest, async_task: bool = False):
+    """导出传感器数据
+
+    默认等待导出完成后返回结果；async_task=true 时改为后台任务模式，返回 task_id 供轮询进度。
+    """
     try:
         logger.info(
             f"开始导出传感器数据: 线路={request.line}, 时间范围={request.start_time} 到 {request.end_time}"
         )
 
+        if async_task:
+            result = sensor_service.start_async_export(
+                request.line, request.start_time, request.end_time
+            )
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=result["error"])
+            return {"success": True, "message": "导出任务已启动", "task_id": result["task_id"]}
+
         # 异步执行导出任务
         result = await sensor_service.export_data_async(
             request.line, request.start_time, request.end_time
@@ -534,6 +578,13 @@ async def export_sensor_data(request: SensorExportRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.delete("/api/export/sensor/metadata-cache")
+async def invalidate_sensor_metadata_cache(station_ip: Optional[str] = None):
+    """使传感器点位配置缓存失效；不传 station_ip 时清空所有站点"""
+    sensor_service.invalidate_point_metadata(station_ip)
+    return {"success": True, "message": "点位配置缓存已失效", "station_ip": station_ip}
+
+
 @app.get("/api/tasks/{task_id}")
 async def get_task_status(task_id: str):
     """获取任务状态和进度"""
@@ -610,6 +661,23 @@ async def cancel_task(task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/tasks/{task_id}/resume")
+async def resume_task(task_id: str):
+    """续传失败或已取消的导出任务，已完成的分段直接读取检查点"""
+    task = task_manager.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    service = sensor_service if task.task_type == "sensor" else electricity_service
+    try:
+        result = service.resume_export(task_id)
+    except TaskBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return {"success": True, "message": "任务已续传", "task_id": task_id}
+
+
 @app.get("/api/download/{filename}")
 async def download_file(filename: str):
     """下载导出的文件"""
@@ -659,16 +727,83 @@ async def download_file(filename: str):
 
 @app.get("/control/device-tree")
 async def get_device_tree_endpoint(request: Request, station_ip: Optional[str] = None):
-    """获取设备树结构（支持按 station_ip 切换数据源）"""
+    """获取设备树结构（支持按 station_ip 切换数据源，带 ETag，未变化时返回 304）"""
     operator_id = request.headers.get("x-operator-id", "system")
     try:
-        result = await device_control_service.get_device_tree(operator_id, station_ip)
-        return result.dict()
+        if_none_match = request.headers.get("if-none-match")
+        result, etag = await device_control_service.get_device_tree_versioned(
+            operator_id, station_ip, if_none_match
+        )
+        if etag is None:
+            # 测试数据不参与协商缓存
+            return result.dict()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=jsonable_encoder(result.dict()), headers=headers)
     except Exception as e:
         logger.error(f"获取设备树失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _device_tree_page_response(request: Request, station_ip: Optional[str], **options):
+    """逐层展开接口的公共处理：分页结果带完整设备树的 ETag"""
+    try:
+        page, etag = await device_control_service.get_device_tree_page(station_ip, **options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DeviceTreeUnavailableError as e:
+        # 不用测试数据冒充真实设备树
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"获取设备树分页失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(page.dict()), headers=headers)
+
+
+@app.get("/control/device-tree/nodes")
+async def get_device_tree_nodes_endpoint(
+    request: Request,
+    station_ip: Optional[str] = None,
+    parent_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    q: Optional[str] = None,
+):
+    """逐层展开设备树：不传 parent_id 返回项目，传项目编码返回其下设备"""
+    return await _device_tree_page_response(
+        request, station_ip, parent_id=parent_id, cursor=cursor, limit=limit, keyword=q
+    )
+
+
+@app.get("/control/device-tree/points")
+async def get_device_tree_points_endpoint(
+    request: Request,
+    object_code: str,
+    station_ip: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    q: Optional[str] = None,
+    writable: Optional[bool] = None,
+):
+    """分页获取设备下的点位，可按关键字与是否可写过滤"""
+    return await _device_tree_page_response(
+        request,
+        station_ip,
+        parent_id=object_code,
+        cursor=cursor,
+        limit=limit,
+        keyword=q,
+        writable=writable,
+        parent_kind="device",
+    )
+
+
 @app.get("/control/points/real-time")
 async def get_point_realtime_endpoint(
     object_code: str, data_code: str, request: Request
@@ -781,7 +916,7 @@ async def get_audit_logs(
 ):
     """查询操作审计日志"""
     try:
-        logs, total = audit_service.query_operation_logs(
+        logs, total = await audit_service.query_operation_logs(
             operator_id=operator_id,
             point_key=point_key,
             object_code=object_code,
@@ -1171,7 +1306,7 @@ async def get_point_realtime(object_code: str, data_code: str, request: Request)
     # 审计只记录查询操作概要（不写before/after）
     operator_id = request.headers.get("x-operator-id", "system")
     try:
-        insert_operation_log(
+        await insert_operation_log_async(
             operator_id=operator_id,
             point_key=f"{object_code}:{data_code}",
             object_code=object_code,
@@ -1317,7 +1452,7 @@ async def _write_one(
                     "retries": tries - 1,
                 }
                 try:
-                    insert_operation_log(
+                    await insert_operation_log_async(
                         operator_id=operator_id,
                         point_key=cmd["point_key"],
                         object_code=cmd.get("object_code"),
@@ -1350,7 +1485,7 @@ async def _write_one(
                     "retries": tries - 1,
                 }
                 try:
-                    insert_operation_log(
+                    await insert_operation_log_async(
                         operator_id=operator_id,
                         point_key=cmd.get("point_key") or "",
                         object_code=cmd.get("object_code"),
@@ -1411,13 +1546,13 @@ async def get_default_points(object_codes: str, request: Request):
     """
     )
     try:
-        rows = execute_query(sql, tuple(codes)) or []
+        rows = await execute_query_async(sql, tuple(codes)) or []
     except Exception as e:
         logger.error(f"默认数据源查询失败: {e}")
         raise HTTPException(status_code=500, detail="查询点位清单失败")
     result = []
     for row in rows:
-        # execute_query 默认返回 tuple，按选取顺序映射
+        # execute_query_async 默认返回 tuple，按选取顺序映射
         (
             object_code,
             data_code,
@@ -1454,7 +1589,7 @@ async def get_default_points(object_codes: str, request: Request):
     # 记录一次只读审计
     operator_id = request.headers.get("x-operator-id", "system")
     try:
-        insert_operation_log(
+        await insert_operation_log_async(
             operator_id=operator_id,
             point_key=":default:list",
             object_code=",".join(codes),
@@ -1608,7 +1743,7 @@ async def get_device_tree(request: Request):
             WHERE status = 1 AND parent_id = 0
             ORDER BY object_code
         """
-        root_nodes = execute_query(root_sql) or []
+        root_nodes = await execute_query_async(root_sql) or []
 
         # 构建设备树
         tree_nodes = []
@@ -1630,7 +1765,7 @@ async def get_device_tree(request: Request):
                 GROUP BY o.object_id, o.object_code, o.object_name, o.object_type
                 ORDER BY o.object_code
             """
-            children = execute_query(children_sql, (object_id,)) or []
+            children = await execute_query_async(children_sql, (object_id,)) or []
 
             child_nodes = []
             total_points = 0
@@ -1737,7 +1872,7 @@ async def get_device_tree(request: Request):
 
         # 记录审计
         try:
-            insert_operation_log(
+            await insert_operation_log_async(
                 operator_id=operator_id,
                 point_key=":device-tree:load",
                 object_code=None,
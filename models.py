@@ -10,6 +10,12 @@ class ExportRequest(BaseModel):
     start_time: datetime
     end_time: datetime
 
+class NetworkExportRequest(BaseModel):
+    """全网（多线路）电耗导出请求模型"""
+    start_time: datetime
+    end_time: datetime
+    lines: Optional[List[str]] = None  # 为空时导出全部线路
+
 class SensorExportRequest(BaseModel):
     """传感器数据导出请求模型"""
     line: str
@@ -113,6 +119,12 @@ class DeviceTreeResponse(BaseModel):
     tree: List[DeviceTreeNode] = Field(..., description="设备树节点列表")
     count: int = Field(..., description="根节点数量")
 
+class DeviceTreePage(BaseModel):
+    """设备树逐层展开的分页响应模型"""
+    items: List[DeviceTreeNode] = Field(..., description="当前层节点（不含下级，meta.child_count 为下级数量）")
+    total: int = Field(..., description="过滤后的节点总数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多")
+
 class PointListResponse(BaseModel):
     """点位列表响应模型"""
     items: List[PointMetadata] = Field(..., description="点位元数据列表")
@@ -96,6 +96,10 @@ echo [信息] 启动后端服务...
 set "PYTHONIOENCODING=utf-8"
 set "PYTHONUNBUFFERED=1"
 
+REM 预编译电力配置快照（失败时后端回退为加载 config_electricity.py）
+python -m backend.app.config.config_snapshot >nul 2>&1
+if errorlevel 1 echo [警告] 电力配置快照生成失败，将直接加载 config_electricity.py
+
 REM 启动后端服务
 start /B "" cmd /c "python main.py > "%BACKEND_LOG%" 2>&1"
 
@@ -207,6 +207,17 @@ class ServiceManager:
         else:
             python_cmd = sys.executable
 
+        # 预编译电力配置快照（失败时后端回退为加载 config_electricity.py）
+        snapshot = subprocess.run(
+            [python_cmd, "-m", "backend.app.config.config_snapshot"],
+            cwd=self.project_root,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if snapshot.returncode != 0:
+            Logger.warning("电力配置快照生成失败，将直接加载 config_electricity.py")
+
         # 启动后端服务
         cmd = [python_cmd, "main.py"]
 
@@ -163,8 +163,14 @@ start_backend() {
         PYTHON_CMD=python
     fi
     
+    # 预编译电力配置快照（失败时后端回退为加载 config_electricity.py）
+    # 快照输出覆盖写入日志，后端进程随后追加，每次重启日志只保留本次运行的内容
+    if ! $PYTHON_CMD -m backend.app.config.config_snapshot > "$BACKEND_LOG" 2>&1; then
+        print_warning "电力配置快照生成失败，将直接加载 config_electricity.py"
+    fi
+    
     # 启动后端服务（后台运行）
-    nohup $PYTHON_CMD main.py > "$BACKEND_LOG" 2>&1 &
+    nohup $PYTHON_CMD main.py >> "$BACKEND_LOG" 2>&1 &
     echo $! > "$PROJECT_ROOT/logs/backend.pid"
     
     print_info "后端PID: $(cat $PROJECT_ROOT/logs/backend.pid)"
@@ -14,6 +14,9 @@ from logger_config import app_logger
 
 logger = app_logger
 
+class TaskBusyError(RuntimeError):
+    """任务上一次运行的后台线程尚未退出"""
+
 class TaskStatus(Enum):
     """任务状态枚举"""
     PENDING = "pending"      # 等待中
@@ -41,7 +44,7 @@ class TaskProgress:
 class ExportTask:
     """导出任务信息"""
     task_id: str
-    task_type: str           # 'electricity' 或 'sensor'
+    task_type: str           # 'electricity'、'electricity_network' 或 'sensor'
     line: str               # 线路名称
     start_time: datetime
     end_time: datetime
@@ -53,6 +56,7 @@ class ExportTask:
     error_message: Optional[str] = None
     result_data: Optional[Dict[str, Any]] = None
     download_urls: Optional[Dict[str, str]] = None  # 下载链接
+    run_id: int = 0         # 运行序号，每次续传加一，旧运行据此判断自己已被取代
     
     def to_dict(self):
         """转换为字典格式"""
@@ -71,6 +75,8 @@ class TaskManager:
     
     def __init__(self):
         self.tasks: Dict[str, ExportTask] = {}
+        # 后台线程尚未退出的运行 {task_id: run_id}
+        self._active_runs: Dict[str, int] = {}
         self._lock = threading.Lock()
         self._cleanup_interval = 3600  # 1小时清理一次过期任务
         self._task_ttl = 24 * 3600     # 任务保留24小时
@@ -155,6 +161,48 @@ class TaskManager:
                     return True
         return False
     
+    def is_cancelled(self, task_id: str, run_id: Optional[int] = None) -> bool:
+        """任务是否已被取消；传入 run_id 时，该运行已被续传取代也视为取消"""
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return False
+            return task.status == TaskStatus.CANCELLED or (run_id is not None and run_id != task.run_id)
+
+    def start_run(self, task_id: str) -> int:
+        """登记任务的一次运行（启动后台线程前调用），返回本次运行的 run_id"""
+        with self._lock:
+            run_id = self.tasks[task_id].run_id
+            self._active_runs[task_id] = run_id
+            return run_id
+
+    def finish_run(self, task_id: str, run_id: int) -> None:
+        """后台线程退出时注销本次运行"""
+        with self._lock:
+            if self._active_runs.get(task_id) == run_id:
+                del self._active_runs[task_id]
+
+    def reset_for_resume(self, task_id: str) -> Optional[ExportTask]:
+        """
+        将失败或已取消的任务重置为等待状态以便续传；任务不存在或状态不允许时返回 None
+
+        上一次运行的线程仍未退出（如刚取消、正在收尾）时抛出 TaskBusyError，避免两个线程同时
+        写同一任务的检查点与输出文件。
+        """
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if not task or task.status not in [TaskStatus.FAILED, TaskStatus.CANCELLED]:
+                return None
+            if task_id in self._active_runs:
+                raise TaskBusyError(f"任务 {task_id} 的上一次运行尚未结束，请稍后再续传")
+            task.run_id += 1
+            task.status = TaskStatus.PENDING
+            task.completed_at = None
+            task.error_message = None
+            task.progress = TaskProgress(message="任务续传中，等待执行")
+            logger.info(f"任务重置以续传: {task_id}")
+            return task
+
     def list_tasks(self, limit: int = 50) -> list:
         """列出最近的任务"""
         with self._lock:
@@ -0,0 +1,12 @@
+"""
+测试公共配置
+"""
+
+import os
+import tempfile
+
+# 电力配置在导入时加载并写出快照，测试期间写到临时目录，避免在仓库 data/ 下生成文件
+os.environ.setdefault(
+    "CONFIG_SNAPSHOT_PATH",
+    os.path.join(tempfile.mkdtemp(prefix="hk_tool_test_"), "config_electricity.snapshot.json"),
+)
@@ -0,0 +1,214 @@
+"""
+分段拉取与断点续传测试
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app.utils.chunked_fetch import (
+    ChunkCheckpointStore,
+    fetch_in_chunks,
+    merge_series_chunks,
+    split_time_range,
+)
+from export_service import ElectricityExportService
+from task_manager import TaskBusyError, TaskStatus, task_manager
+
+
+def _series(object_code, data_code, *times):
+    return {
+        "tags": {"objectCode": object_code, "dataCode": data_code},
+        "values": [{"time": t, "value": 1} for t in times],
+    }
+
+
+class TestSplitTimeRange:
+    """测试时间范围切分"""
+
+    def test_windows_are_contiguous(self) -> None:
+        start = datetime(2024, 1, 1)
+        windows = split_time_range(start, datetime(2024, 1, 17), timedelta(days=7))
+        assert windows == [
+            (start, datetime(2024, 1, 8)),
+            (datetime(2024, 1, 8), datetime(2024, 1, 15)),
+            (datetime(2024, 1, 15), datetime(2024, 1, 17)),
+        ]
+
+    def test_short_range_single_window(self) -> None:
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+        assert split_time_range(start, end, timedelta(days=7)) == [(start, end)]
+
+    def test_invalid_chunk(self) -> None:
+        with pytest.raises(ValueError):
+            split_time_range(datetime(2024, 1, 1), datetime(2024, 1, 2), timedelta(0))
+
+
+class TestMergeSeriesChunks:
+    """测试分段序列合并"""
+
+    def test_concatenates_and_drops_boundary_duplicate(self) -> None:
+        merged = merge_series_chunks([
+            [_series("O1", "A", "t1", "t2"), _series("O1", "B", "t1")],
+            [_series("O1", "A", "t2", "t3")],
+        ])
+        assert [s["tags"]["dataCode"] for s in merged] == ["A", "B"]
+        assert [v["time"] for v in merged[0]["values"]] == ["t1", "t2", "t3"]
+
+
+class TestFetchInChunks:
+    """测试检查点续传"""
+
+    def test_resume_skips_completed_chunks(self, tmp_path) -> None:
+        store = ChunkCheckpointStore(str(tmp_path))
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 22)
+        chunk = timedelta(days=7)
+        job_key = store.job_key("sensor", "http://10.0.0.1:9898", start, end)
+        calls = []
+        fail_on = {datetime(2024, 1, 15)}
+
+        async def fetch_chunk(window_start, window_end):
+            calls.append(window_start)
+            if window_start in fail_on:
+                return None
+            return [_series("O1", "A", window_start.isoformat())]
+
+        # 第一次：第三段失败，前两段写入检查点
+        assert asyncio.run(fetch_in_chunks(fetch_chunk, start, end, store, job_key, chunk)) is None
+        assert store.completed(job_key) == [0, 1]
+
+        # 续传：只拉取剩余分段，完成后清除检查点
+        fail_on.clear()
+        calls.clear()
+        merged = asyncio.run(fetch_in_chunks(fetch_chunk, start, end, store, job_key, chunk))
+        assert calls == [datetime(2024, 1, 15)]
+        assert len(merged[0]["values"]) == 3
+        assert store.completed(job_key) == []
+
+    def test_stops_when_cancelled(self, tmp_path) -> None:
+        store = ChunkCheckpointStore(str(tmp_path))
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 15)
+        job_key = store.job_key("energy_status", start, end)
+        calls = []
+
+        async def fetch_chunk(window_start, window_end):
+            calls.append(window_start)
+            return []
+
+        result = asyncio.run(
+            fetch_in_chunks(
+                fetch_chunk, start, end, store, job_key, timedelta(days=7),
+                should_continue=lambda: not calls,
+            )
+        )
+        assert result is None
+        assert calls == [start]
+        assert store.completed(job_key) == [0]
+
+
+class TestTaskResume:
+    """测试任务续传状态"""
+
+    def test_only_failed_or_cancelled_tasks_resume(self) -> None:
+        task_id = task_manager.create_task("electricity", "M3", datetime(2024, 1, 1), datetime(2024, 4, 1))
+        assert task_manager.reset_for_resume(task_id) is None
+
+        task_manager.cancel_task(task_id)
+        assert task_manager.is_cancelled(task_id)
+
+        task = task_manager.reset_for_resume(task_id)
+        assert task is not None
+        assert task.status == TaskStatus.PENDING
+        assert task.completed_at is None
+        assert not task_manager.is_cancelled(task_id)
+
+    def test_resume_waits_for_previous_run(self) -> None:
+        task_id = task_manager.create_task("electricity", "M3", datetime(2024, 1, 1), datetime(2024, 1, 2))
+        old_run = task_manager.start_run(task_id)
+        task_manager.cancel_task(task_id)
+
+        # 旧线程还在收尾：不允许续传
+        with pytest.raises(TaskBusyError):
+            task_manager.reset_for_resume(task_id)
+        task_manager.finish_run(task_id, old_run)
+
+        assert task_manager.reset_for_resume(task_id) is not None
+        new_run = task_manager.start_run(task_id)
+        # 旧运行已被取代，即使任务不再是取消状态也应停止
+        assert task_manager.is_cancelled(task_id, old_run)
+        assert not task_manager.is_cancelled(task_id, new_run)
+        task_manager.finish_run(task_id, new_run)
+
+
+class TestStationResume:
+    """测试站点级续传与检查点回收"""
+
+    def test_resume_skips_completed_stations(self, tmp_path) -> None:
+        service = ElectricityExportService()
+        service.checkpoint_store = ChunkCheckpointStore(str(tmp_path / "checkpoints"))
+        service.line_configs = {"MX": {f"站点{i}": {"ip": f"10.0.0.{i}", "station": f"站点{i}"} for i in range(3)}}
+        calls = []
+        failing = {"10.0.0.2"}
+
+        async def fake_export_single_ip(ip, config, start_time, end_time):
+            calls.append(ip)
+            if ip in failing:
+                # 最后一个站点导出期间任务被取消
+                await asyncio.sleep(0.05)
+                task_manager.cancel_task(task_id)
+                return False, "API超时，导出失败", None
+            path = tmp_path / f"{ip}.xlsx"
+            path.write_text("ok")
+            return True, None, str(path)
+
+        service.export_single_ip = fake_export_single_ip
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+        task_id = task_manager.create_task("electricity", "MX", start, end)
+        asyncio.run(service._export_with_progress_async(task_id, "MX", start, end))
+        assert sorted(calls) == ["10.0.0.0", "10.0.0.1", "10.0.0.2"]
+
+        assert task_manager.get_task(task_id).status == TaskStatus.CANCELLED
+
+        # 续传：只重新导出未成功的站点，成功站点沿用原输出文件
+        assert task_manager.reset_for_resume(task_id) is not None
+        failing.clear()
+        calls.clear()
+        asyncio.run(service._export_with_progress_async(task_id, "MX", start, end))
+
+        task = task_manager.get_task(task_id)
+        assert calls == ["10.0.0.2"]
+        assert task.result_data["details"]["success_count"] == 3
+        # 任务完成后站点完成记录被清除
+        assert os.listdir(service.checkpoint_store.root_dir) == []
+
+    def test_stalled_station_times_out(self, tmp_path) -> None:
+        service = ElectricityExportService()
+        service.checkpoint_store = ChunkCheckpointStore(str(tmp_path / "checkpoints"))
+        service.line_configs = {"MX": {f"站点{i}": {"ip": f"10.0.0.{i}", "station": f"站点{i}"} for i in range(2)}}
+        service.station_timeout = 0.05
+
+        async def fake_export_single_ip(ip, config, start_time, end_time):
+            if ip == "10.0.0.1":
+                await asyncio.sleep(60)
+            return True, None, str(tmp_path / f"{ip}.xlsx")
+
+        service.export_single_ip = fake_export_single_ip
+        result = asyncio.run(service.export_data_async("MX", datetime(2024, 1, 1), datetime(2024, 1, 2)))
+
+        outcomes = {r["station_ip"]: (r["success"], r["message"]) for r in result.details["results"]}
+        assert outcomes == {"站点0": (True, "导出成功"), "站点1": (False, "站点导出超时")}
+
+    def test_cleanup_removes_abandoned_jobs(self, tmp_path) -> None:
+        store = ChunkCheckpointStore(str(tmp_path))
+        store.save("old", 0, [])
+        store.save_record("fresh", "站点1", {"file_path": "a.xlsx"})
+        stale = time.time() - 3 * 86400
+        for path in (tmp_path / "old", tmp_path / "old" / "0.json"):
+            os.utime(path, (stale, stale))
+
+        assert store.cleanup(max_age=86400) == 1
+        assert sorted(os.listdir(tmp_path)) == ["fresh"]
+        assert store.load_record("fresh", "站点1") == {"file_path": "a.xlsx"}
@@ -0,0 +1,47 @@
+"""
+电力配置快照测试
+"""
+
+from backend.app.config import config_snapshot
+
+SOURCE = 'line_configs={\n    # 注释\n    "M3": {"振华路": {"ip": "10.0.3.1", "data_list": []}},\n}\n'
+
+
+class TestConfigSnapshot:
+    """测试快照构建与校验"""
+
+    def test_snapshot_round_trip(self, tmp_path) -> None:
+        source = tmp_path / "config_electricity.py"
+        source.write_text(SOURCE, encoding="utf-8")
+        snapshot = str(tmp_path / "snapshot.json")
+
+        config_snapshot.build_snapshot(str(source), snapshot)
+        checksum = config_snapshot.source_checksum(str(source))
+
+        expected = {"M3": {"振华路": {"ip": "10.0.3.1", "data_list": []}}}
+        assert config_snapshot.read_snapshot(checksum, snapshot) == expected
+        # 源文件不存在时信任快照
+        assert config_snapshot.read_snapshot(None, snapshot) == expected
+
+    def test_snapshot_invalidated_by_source_change(self, tmp_path) -> None:
+        source = tmp_path / "config_electricity.py"
+        source.write_text(SOURCE, encoding="utf-8")
+        snapshot = str(tmp_path / "snapshot.json")
+        config_snapshot.build_snapshot(str(source), snapshot)
+
+        source.write_text(SOURCE.replace("10.0.3.1", "10.0.3.9"), encoding="utf-8")
+        checksum = config_snapshot.source_checksum(str(source))
+        assert config_snapshot.read_snapshot(checksum, snapshot) is None
+        assert config_snapshot.read_snapshot(checksum, str(tmp_path / "missing.json")) is None
+
+    def test_load_line_configs_matches_source(self, tmp_path, monkeypatch) -> None:
+        import config_electricity
+
+        snapshot = tmp_path / "snapshot.json"
+        monkeypatch.setenv("CONFIG_SNAPSHOT_PATH", str(snapshot))
+        monkeypatch.setattr(config_snapshot, "_line_configs", None)
+
+        assert config_snapshot.load_line_configs() == config_electricity.line_configs
+        # 首次加载源文件后写出快照，之后的进程直接读取
+        checksum = config_snapshot.source_checksum()
+        assert config_snapshot.read_snapshot(checksum) == config_electricity.line_configs
@@ -0,0 +1,303 @@
+"""
+设备树组装测试
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import control_service
+from control_service import (
+    DeviceControlService,
+    DeviceTreeUnavailableError,
+    build_device_tree,
+    paginate_tree_nodes,
+)
+
+ROOTS = [(1, "PRJ_A", "项目A", "project"), (2, "PRJ_B", "项目B", "project")]
+CHILDREN = [
+    (1, 11, "DEV_1", "设备1", "device", 2),
+    (2, 21, "DEV_2", "设备2", "device", 150),
+    (1, 12, "DEV_3", "设备3", "device", 0),
+]
+
+
+def _point(object_id, data_code, is_set=0):
+    return (
+        object_id, data_code, f"{data_code}名称", "℃", is_set, 0, f"C:{data_code}",
+        None, None, None, None, None, None, "0", 1,
+    )
+
+
+POINTS = [_point(11, "P1", is_set=1), _point(11, "P2")] + [
+    _point(21, f"Q{i:03d}") for i in range(150)
+]
+
+
+class TestBuildDeviceTree:
+    """测试按 object_id 挂接"""
+
+    def test_assembles_levels_without_truncation(self) -> None:
+        tree = build_device_tree(ROOTS, CHILDREN, POINTS)
+
+        assert [node.id for node in tree] == ["PRJ_A", "PRJ_B"]
+        assert [child.id for child in tree[0].children] == ["DEV_1", "DEV_3"]
+        assert tree[0].meta["total_points"] == 2
+        assert tree[0].label == "项目A (PRJ_A) [2点]"
+
+        dev1 = tree[0].children[0]
+        assert [p.id for p in dev1.children] == ["DEV_1:P1", "DEV_1:P2"]
+        assert dev1.children[0].meta["is_writable"] is True
+        assert dev1.children[0].label.startswith("✔ ")
+        assert tree[0].children[1].children == []
+
+        # 不再截断为 100 个点位
+        assert len(tree[1].children[0].children) == 150
+
+
+def _fake_database(fingerprint):
+    """按 SQL 内容返回固定结果；fingerprint 为列表，可在测试中修改"""
+
+    async def fake_query(sql, params=None, host=None):
+        if "MAX(data_id)" in sql:
+            return [tuple(fingerprint)]
+        if "COUNT(p.data_id)" in sql:
+            return CHILDREN
+        return POINTS if "p.data_source" in sql else ROOTS
+
+    return AsyncMock(side_effect=fake_query)
+
+
+def _patched(query):
+    return patch.object(control_service, "execute_query_with_host_async", query), patch.object(
+        control_service, "insert_operation_log_async", AsyncMock(return_value=True)
+    )
+
+
+def test_get_device_tree_uses_three_queries() -> None:
+    query = _fake_database([5, 21, 7, 152, 300, 9])
+    db_patch, log_patch = _patched(query)
+    with db_patch, log_patch:
+        response = asyncio.run(DeviceControlService().get_device_tree("tester", "10.0.0.1"))
+
+    # 一次表指纹 + 三条集合查询
+    assert query.await_count == 4
+    assert all(call.args[2] == "10.0.0.1" for call in query.await_args_list)
+    assert response.count == 2
+
+
+class TestDeviceTreeCache:
+    """测试按车站缓存与指纹校验"""
+
+    def test_cache_hit_and_fingerprint_change(self) -> None:
+        fingerprint = [5, 21, 7, 152, 300, 9]
+        query = _fake_database(fingerprint)
+        service = DeviceControlService()
+        db_patch, log_patch = _patched(query)
+
+        async def main():
+            first, etag = await service.get_device_tree_versioned("tester", "10.0.0.1")
+            # 检查周期内直接命中缓存，不访问数据库
+            again, same_etag = await service.get_device_tree_versioned("tester", "10.0.0.1")
+            assert again is first and same_etag == etag
+            assert query.await_count == 4
+
+            # 到期后指纹未变：只多一次指纹查询
+            with patch.object(control_service, "DEVICE_TREE_CHECK_INTERVAL", -1):
+                await service.get_device_tree_versioned("tester", "10.0.0.1")
+                assert query.await_count == 5
+
+                # 点位原地修改（如可写标记）只改变校验和列：重建；内容相同则 ETag 不变
+                fingerprint[5] = 10
+                rebuilt, rebuilt_etag = await service.get_device_tree_versioned("tester", "10.0.0.1")
+                assert rebuilt is not first and rebuilt_etag == etag
+                assert query.await_count == 10
+
+            # 其他车站单独缓存
+            await service.get_device_tree_versioned("tester", "10.0.0.2")
+            assert query.await_count == 14
+
+        with db_patch, log_patch:
+            asyncio.run(main())
+
+    def test_database_failure_keeps_last_tree(self) -> None:
+        query = _fake_database([5, 21, 7, 152, 300, 9])
+        service = DeviceControlService()
+        db_patch, log_patch = _patched(query)
+        with db_patch, log_patch:
+            cached, etag = asyncio.run(service.get_device_tree_versioned("tester", "10.0.0.1"))
+            query.side_effect = ConnectionError("down")
+            with patch.object(control_service, "DEVICE_TREE_CHECK_INTERVAL", -1):
+                stale, stale_etag = asyncio.run(service.get_device_tree_versioned("tester", "10.0.0.1"))
+            fallback, no_etag = asyncio.run(service.get_device_tree_versioned("tester", "10.0.0.9"))
+
+        assert stale is cached and stale_etag == etag
+        # 没有缓存时回退到测试数据，且不带 ETag
+        assert fallback.tree[0].id == "test_project" and no_etag is None
+
+
+def test_endpoint_returns_304_for_matching_etag() -> None:
+    from main import app, device_control_service
+
+    db_patch = patch.object(
+        control_service, "execute_query_with_host_async", _fake_database([5, 21, 7, 152, 300, 9])
+    )
+    audit = AsyncMock(return_value=True)
+    with db_patch, patch.object(control_service, "insert_operation_log_async", audit):
+        device_control_service._tree_cache.pop("10.0.0.1", None)
+        client = TestClient(app)
+        first = client.get("/control/device-tree", params={"station_ip": "10.0.0.1"})
+        etag = first.headers["etag"]
+        second = client.get(
+            "/control/device-tree",
+            params={"station_ip": "10.0.0.1"},
+            headers={"If-None-Match": f"W/{etag}"},
+        )
+        device_control_service._tree_cache.pop("10.0.0.1", None)
+
+    assert first.status_code == 200 and first.json()["data"]["count"] == 2
+    assert second.status_code == 304 and second.headers["etag"] == etag
+    assert second.content == b""
+    # 304 响应不写查询审计
+    assert audit.await_count == 1
+
+
+class TestDeviceTreePagination:
+    """测试逐层展开与游标分页"""
+
+    def test_cursor_pagination_and_filters(self) -> None:
+        tree = build_device_tree(ROOTS, CHILDREN, POINTS)
+        points = tree[1].children[0].children
+
+        first = paginate_tree_nodes(points, limit=100)
+        assert [p.id for p in first.items][:2] == ["DEV_2:Q000", "DEV_2:Q001"]
+        assert first.total == 150 and first.next_cursor
+        second = paginate_tree_nodes(points, cursor=first.next_cursor, limit=100)
+        assert len(second.items) == 50 and second.next_cursor is None
+        assert second.items[0].id == "DEV_2:Q100"
+
+        # 只返回当前层，附带下级数量
+        roots = paginate_tree_nodes(tree)
+        assert all(node.children is None for node in roots.items)
+        assert [node.meta["child_count"] for node in roots.items] == [2, 1]
+
+        assert paginate_tree_nodes(points, keyword="q14").total == 10
+        writable = paginate_tree_nodes(tree[0].children[0].children, writable=True)
+        assert [p.id for p in writable.items] == ["DEV_1:P1"]
+
+    def test_cursor_uses_position_index(self) -> None:
+        """传入位置索引时直接定位游标，结果与逐个查找一致"""
+        tree = build_device_tree(ROOTS, CHILDREN, POINTS)
+        points = tree[1].children[0].children
+        positions = control_service._index_tree_nodes(tree)["position"][("device", "DEV_2")]
+
+        first = paginate_tree_nodes(points, limit=40, positions=positions)
+        second = paginate_tree_nodes(points, cursor=first.next_cursor, limit=40, positions=positions)
+        assert second == paginate_tree_nodes(points, cursor=first.next_cursor, limit=40)
+        assert second.items[0].id == "DEV_2:Q040"
+
+        filtered = paginate_tree_nodes(points, limit=5, keyword="q1", positions=positions)
+        rest = paginate_tree_nodes(
+            points, cursor=filtered.next_cursor, limit=5, keyword="q1", positions=positions
+        )
+        unindexed = paginate_tree_nodes(points, cursor=filtered.next_cursor, limit=5, keyword="q1")
+        assert rest == unindexed
+        assert rest.total == filtered.total and rest.items[0].id > filtered.items[-1].id
+        # 索引中的位置已不对应该节点（树已重建）时视为失效游标
+        with pytest.raises(ValueError):
+            paginate_tree_nodes(points[1:], cursor=first.next_cursor, positions=positions)
+
+    def test_invalid_cursor(self) -> None:
+        tree = build_device_tree(ROOTS, CHILDREN, POINTS)
+        page = paginate_tree_nodes(tree, limit=1)
+        with pytest.raises(ValueError):
+            paginate_tree_nodes(tree[0].children, cursor=page.next_cursor)
+        with pytest.raises(ValueError):
+            paginate_tree_nodes(tree, cursor="%%%")
+
+    def test_pages_share_the_cached_tree(self) -> None:
+        query = _fake_database([5, 21, 7, 152, 300, 9])
+        service = DeviceControlService()
+        db_patch, log_patch = _patched(query)
+
+        async def main():
+            _, etag = await service.get_device_tree_versioned("tester", "10.0.0.1")
+            devices, page_etag = await service.get_device_tree_page("10.0.0.1", parent_id="PRJ_A")
+            points, _ = await service.get_device_tree_page(
+                "10.0.0.1", parent_id="DEV_2", limit=20, parent_kind="device"
+            )
+            with pytest.raises(LookupError):
+                await service.get_device_tree_page("10.0.0.1", parent_id="MISSING")
+            # 项目与设备编码不混用
+            with pytest.raises(LookupError):
+                await service.get_device_tree_page("10.0.0.1", parent_id="DEV_2")
+            with pytest.raises(LookupError):
+                await service.get_device_tree_page(
+                    "10.0.0.1", parent_id="PRJ_A", parent_kind="device"
+                )
+            return etag, devices, page_etag, points
+
+        with db_patch, log_patch:
+            etag, devices, page_etag, points = asyncio.run(main())
+
+        assert query.await_count == 4
+        assert page_etag == etag
+        assert [node.id for node in devices.items] == ["DEV_1", "DEV_3"]
+        assert len(points.items) == 20 and points.total == 150
+
+    def test_database_failure_without_cache(self) -> None:
+        query = _fake_database([5, 21, 7, 152, 300, 9])
+        query.side_effect = ConnectionError("down")
+        service = DeviceControlService()
+        db_patch, log_patch = _patched(query)
+        # 分页接口不返回测试数据
+        with db_patch, log_patch, pytest.raises(DeviceTreeUnavailableError):
+            asyncio.run(service.get_device_tree_page("10.0.0.9"))
+
+
+def test_points_endpoint() -> None:
+    from main import app, device_control_service
+
+    db_patch, log_patch = _patched(_fake_database([5, 21, 7, 152, 300, 9]))
+    with db_patch, log_patch:
+        device_control_service._tree_cache.pop("10.0.0.1", None)
+        client = TestClient(app)
+        params = {"station_ip": "10.0.0.1", "object_code": "DEV_2", "limit": 60}
+        first = client.get("/control/device-tree/points", params=params)
+        cursor = first.json()["data"]["next_cursor"]
+        second = client.get("/control/device-tree/points", params={**params, "cursor": cursor})
+        missing = client.get("/control/device-tree/points", params={**params, "object_code": "X"})
+        project = client.get(
+            "/control/device-tree/points", params={**params, "object_code": "PRJ_A"}
+        )
+        device = client.get(
+            "/control/device-tree/nodes", params={"station_ip": "10.0.0.1", "parent_id": "DEV_2"}
+        )
+        device_control_service._tree_cache.pop("10.0.0.1", None)
+
+    assert first.status_code == 200 and "etag" in first.headers
+    assert len(first.json()["data"]["items"]) == 60
+    assert second.json()["data"]["items"][0]["id"] == "DEV_2:Q060"
+    # 错误由标准化中间件包装，状态码在 code 字段
+    assert missing.json()["code"] == 404
+    assert project.json()["code"] == 404 and device.json()["code"] == 404
+
+
+def test_paged_endpoints_unavailable_without_database() -> None:
+    from main import app, device_control_service
+
+    query = _fake_database([5, 21, 7, 152, 300, 9])
+    query.side_effect = ConnectionError("down")
+    db_patch, log_patch = _patched(query)
+    with db_patch, log_patch:
+        device_control_service._tree_cache.pop("10.0.0.9", None)
+        client = TestClient(app)
+        nodes = client.get("/control/device-tree/nodes", params={"station_ip": "10.0.0.9"})
+        points = client.get(
+            "/control/device-tree/points",
+            params={"station_ip": "10.0.0.9", "object_code": "test_device"},
+        )
+
+    assert nodes.json()["code"] == 503 and points.json()["code"] == 503
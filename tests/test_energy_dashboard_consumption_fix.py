@@ -14,12 +14,16 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
+import json  # noqa: E402
 from datetime import datetime  # noqa: E402
-from unittest.mock import MagicMock, patch  # noqa: E402
+from unittest.mock import patch  # noqa: E402
+
+import httpx  # noqa: E402
 
 from backend.app.services.realtime_energy_service import (  # noqa: E402
     RealtimeEnergyService,
 )
+from backend.app.utils.station_client import StationHttpClient  # noqa: E402
 
 
 def test_energy_consumption_calculation_method_exists():
@@ -59,8 +63,7 @@ def test_consumption_uses_correct_config():
     print(f"  - object_codes数量: {len(config['object_codes'])}")
 
 
-@patch("backend.app.services.realtime_energy_service.requests")
-def test_consumption_calculation_logic(mock_requests):
+def test_consumption_calculation_logic():
     """测试能耗计算逻辑与export_service一致"""
 
     # 模拟API响应数据
@@ -87,26 +90,26 @@ def test_consumption_calculation_logic(mock_requests):
         },
     ]
 
-    # 配置mock响应
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.elapsed.total_seconds.return_value = 0.5
-
-    # 第一次调用返回end_data，第二次调用返回start_data
-    mock_response.json.side_effect = [
-        {"data": mock_end_data},
-        {"data": mock_start_data},
-    ]
+    # 配置mock响应：起码、止码两个窗口并发请求，按请求窗口返回对应数据
+    calls = []
 
-    mock_requests.post.return_value = mock_response
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append((str(request.url), payload, request.extensions["timeout"]["read"]))
+        is_start_window = payload["endTime"] - payload["startTime"] == 3 * 60000
+        data = mock_start_data if is_start_window else mock_end_data
+        return httpx.Response(200, json={"data": data})
 
+    client = StationHttpClient(transport=httpx.MockTransport(handler))
     service = RealtimeEnergyService()
 
     # 测试站点配置
     station = {"name": "测试站", "ip": "192.168.1.100", "line": "M11"}
 
     # 模拟_get_jieneng_config返回配置
-    with patch.object(service, "_get_jieneng_config") as mock_config:
+    with patch.object(service, "_get_jieneng_config") as mock_config, patch(
+        "backend.app.services.realtime_energy_service.get_station_client", return_value=client
+    ):
         mock_config.return_value = {
             "data_codes": ["LSA1_28", "LSA2_28"],
             "object_codes": ["OBJ001"],
@@ -164,25 +167,22 @@ def test_consumption_calculation_logic(mock_requests):
                 "startTime": start_timestamp,
             }
 
-            calls = mock_requests.post.call_args_list
             assert len(calls) == 2, "应调用两次/data/selectHisData接口"
 
-            first_call_args, first_call_kwargs = calls[0]
-            second_call_args, second_call_kwargs = calls[1]
-
-            assert first_call_args[0] == endpoint
-            assert second_call_args[0] == endpoint
-            assert first_call_kwargs.get("json") == expected_end_payload
-            assert second_call_kwargs.get("json") == expected_start_payload
-            assert first_call_kwargs.get("timeout") == 5.0
-            assert second_call_kwargs.get("timeout") == 5.0
+            # 两个窗口并发请求，不再约束先后顺序
+            for url, _, timeout in calls:
+                assert url == endpoint
+                assert timeout == 5.0
+            payloads = [payload for _, payload, _ in calls]
+            assert expected_end_payload in payloads
+            assert expected_start_payload in payloads
 
             print("✓ API请求payload与export_service一致")
             print(
-                f"  - 第一次请求: 结束时间窗口 {expected_end_payload['startTime']} ~ {expected_end_payload['endTime']}"
+                f"  - 止码请求: 结束时间窗口 {expected_end_payload['startTime']} ~ {expected_end_payload['endTime']}"
             )
             print(
-                f"  - 第二次请求: 开始时间窗口 {expected_start_payload['startTime']} ~ {expected_start_payload['endTime']}"
+                f"  - 起码请求: 开始时间窗口 {expected_start_payload['startTime']} ~ {expected_start_payload['endTime']}"
             )
 
         # 运行异步测试
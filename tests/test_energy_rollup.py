@@ -0,0 +1,196 @@
+"""
+能耗小时/日汇总测试
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from backend.app.services.energy_rollup_service import EnergyRollupService
+from backend.app.services.realtime_energy_service import RealtimeEnergyService
+from backend.app.utils.energy_rollup_store import DAY, HOUR, EnergyRollupStore
+
+STATION = {"name": "测试站", "ip": "10.0.0.1", "line": "M3"}
+
+
+def _ms(value):
+    return int(value.timestamp() * 1000)
+
+
+class _FakeRealtimeService:
+    """每个小时返回固定的设备电耗；failing 中的小时返回 None"""
+
+    def __init__(self):
+        self.requested = []
+        self.failing = set()
+        # 有读数但没有有效设备的小时
+        self.empty = set()
+
+    async def get_station_period_device_consumptions(self, station, periods, start_boundaries=()):
+        self.requested.extend(start for start, _ in periods)
+        return [
+            None if start in self.failing
+            else {} if start in self.empty
+            else {"P1": 1.5, "P2": float(start.hour)}
+            for start, _ in periods
+        ]
+
+
+class TestEnergyRollupStore:
+    """测试汇总存储"""
+
+    def test_daily_rollup_follows_hours(self, tmp_path) -> None:
+        store = EnergyRollupStore(str(tmp_path / "rollup.sqlite3"))
+        day = datetime(2024, 1, 1)
+        next_hour = day + timedelta(hours=1)
+        store.save_hours("ip", [(day, {"P1": 1.0}), (next_hour, {"P1": 2.0, "P2": 4.0})])
+        # 重写同一小时覆盖旧值，日汇总随之更新
+        store.save_hours("ip", [(day, {"P1": 3.0})])
+
+        day_end = day + timedelta(days=1)
+        hours = store.series(["ip"], HOUR, day, day_end)
+        assert hours == {_ms(day): 3.0, _ms(next_hour): 6.0}
+        # 当天尚未汇总完整时没有日值
+        assert store.series(["ip"], DAY, day, day_end) == {}
+
+        rest = [(day + timedelta(hours=h), {"P1": 0.5}) for h in range(2, 24)]
+        store.save_hours("ip", rest)
+        assert store.series(["ip"], DAY, day, day_end) == {_ms(day): 20.0}
+        # 已完成汇总但没有该设备的小时记为 0
+        assert store.series(["ip"], DAY, day, day_end, device="P2") == {_ms(day): 4.0}
+        assert store.series(["ip"], HOUR, day, next_hour, device="P2") == {_ms(day): 0.0}
+        assert len(store.completed_hours("ip", day, day + timedelta(days=1))) == 24
+
+    def test_bucket_requires_every_station(self, tmp_path) -> None:
+        store = EnergyRollupStore(str(tmp_path / "rollup.sqlite3"))
+        hour = datetime(2024, 1, 1, 8)
+        store.save_hours("a", [(hour, {"P1": 1.0})])
+
+        end = hour + timedelta(hours=1)
+        assert store.series(["a", "b"], HOUR, hour, end) == {}
+        assert store.series_by_station(["a", "b"], HOUR, hour, end) == {_ms(hour): {"a": 1.0}}
+        store.save_hours("b", [(hour, {"P1": 2.0})])
+        assert store.series(["a", "b"], HOUR, hour, end) == {_ms(hour): 3.0}
+
+
+class TestEnergyRollupService:
+    """测试回填与读取"""
+
+    def test_backfill_skips_completed_and_retries_failed_hours(self, tmp_path) -> None:
+        realtime = _FakeRealtimeService()
+        store = EnergyRollupStore(str(tmp_path / "rollup.sqlite3"))
+        service = EnergyRollupService(realtime, store)
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 3)
+        realtime.failing = {datetime(2024, 1, 2, 5)}
+        realtime.empty = {datetime(2024, 1, 2, 6)}
+
+        summary = asyncio.run(service.backfill([STATION], start, end))
+        assert (summary["completed_hours"], summary["failed_hours"]) == (46, 2)
+
+        realtime.failing.clear()
+        realtime.empty.clear()
+        realtime.requested.clear()
+        summary = asyncio.run(service.backfill([STATION], start, end))
+        assert realtime.requested == [datetime(2024, 1, 2, 5), datetime(2024, 1, 2, 6)]
+        assert summary["completed_hours"] == 2
+
+        daily = asyncio.run(service.get_series([STATION], start, end, "daily"))
+        # 每天: P1 1.5*24 + P2 0+1+...+23
+        assert daily == [(start, 36.0 + 276.0, 1), (datetime(2024, 1, 2), 36.0 + 276.0, 1)]
+
+        hourly = asyncio.run(
+            service.get_series(
+                [STATION], datetime(2024, 1, 2, 22), end + timedelta(hours=1), "hourly",
+                fill_missing=False,
+            )
+        )
+        assert hourly == [
+            (datetime(2024, 1, 2, 22), 23.5, 1),
+            (datetime(2024, 1, 2, 23), 24.5, 1),
+            (datetime(2024, 1, 3, 0), None, 0),
+        ]
+
+        monthly = asyncio.run(service.get_series([STATION], start, end, "monthly"))
+        assert monthly == [(start, 624.0, 1)]
+
+    def test_update_recent_only_fetches_finished_hours(self, tmp_path) -> None:
+        realtime = _FakeRealtimeService()
+        store = EnergyRollupStore(str(tmp_path / "rollup.sqlite3"))
+        service = EnergyRollupService(realtime, store)
+
+        asyncio.run(service.update_recent([STATION], now=datetime(2024, 1, 2, 10, 5)))
+        assert max(realtime.requested) == datetime(2024, 1, 2, 8)
+
+        realtime.requested.clear()
+        asyncio.run(service.update_recent([STATION], now=datetime(2024, 1, 2, 11, 15)))
+        assert realtime.requested == [datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 10)]
+
+    def test_hourly_rollup_sums_to_the_day(self, tmp_path) -> None:
+        """相邻小时共用整点读数，当天 24 个小时值之和等于按整天直接计算的电耗"""
+        service = RealtimeEnergyService()
+        store = EnergyRollupStore(str(tmp_path / "rollup.sqlite3"))
+        rollup = EnergyRollupService(service, store)
+        config = {"object_codes": ["OBJ"], "data_codes": ["P"]}
+        day = datetime(2024, 3, 8)
+
+        async def fetch(api_url, payload):
+            # 电表按每分钟 0.5 kWh 走字，读数取窗口结束时刻的值
+            value = (payload["endTime"] - _ms(day)) / 60000 * 0.5
+            return [{"tags": {"objectCode": "OBJ", "dataCode": "P"}, "values": [{"value": value}]}]
+
+        async def run():
+            with patch.object(service, "_get_jieneng_config", return_value=config), patch.object(
+                service, "_fetch_select_his_data", side_effect=fetch
+            ):
+                await rollup.rollup_station(STATION, day, day + timedelta(hours=12))
+                await rollup.rollup_station(STATION, day, day + timedelta(days=1))
+                return await service.get_station_energy_consumption(
+                    STATION, day, day + timedelta(days=1)
+                )
+
+        direct = asyncio.run(run())
+        hourly = store.series([STATION["ip"]], HOUR, day, day + timedelta(days=1))
+        assert len(hourly) == 24
+        assert sum(hourly.values()) == pytest.approx(direct)
+        assert store.series([STATION["ip"]], DAY, day, day + timedelta(days=1)) == {
+            _ms(day): pytest.approx(direct)
+        }
+
+    def test_dead_station_gives_partial_coverage(self, tmp_path) -> None:
+        """已结束的小时只读汇总，缺失的站点在后台回填；当前小时实时计算，不可达的站点不计入"""
+        realtime = _FakeRealtimeService()
+        store = EnergyRollupStore(str(tmp_path / "rollup.sqlite3"))
+        service = EnergyRollupService(realtime, store)
+        other = {"name": "另一站", "ip": "10.0.0.2", "line": "M3"}
+        start = datetime(2024, 1, 1, 8)
+        now = datetime(2024, 1, 1, 10, 30)
+        store.save_hours(
+            STATION["ip"], [(start, {"P1": 1.0}), (start + timedelta(hours=1), {"P1": 2.0})]
+        )
+        realtime.failing = {start, datetime(2024, 1, 1, 9)}
+
+        async def run():
+            series = await service.get_series([STATION, other], start, now, "hourly", now=now)
+            live_requests = list(realtime.requested)
+            # 已结束的缺口在后台自动回填
+            await asyncio.gather(*list(service._background_tasks))
+            backfill_requests = realtime.requested[len(live_requests):]
+            # 缓存期内再次请求不重复实时计算当前小时
+            realtime.requested.clear()
+            service.auto_backfill = False
+            again = await service.get_series([STATION, other], start, now, "hourly", now=now)
+            return series, live_requests, backfill_requests, again
+
+        series, live_requests, backfill_requests, again = asyncio.run(run())
+        assert series == [
+            (start, 1.0, 1),
+            (datetime(2024, 1, 1, 9), 2.0, 1),
+            (datetime(2024, 1, 1, 10), 11.5 * 2, 2),
+        ]
+        # 读取时只对当前小时实时计算，已结束的小时由后台回填
+        assert live_requests == [datetime(2024, 1, 1, 10)] * 2
+        assert backfill_requests == [start, datetime(2024, 1, 1, 9)]
+        assert again == series
+        assert realtime.requested == []
@@ -0,0 +1,229 @@
+"""
+selectHisData 结果处理工具测试
+覆盖点位索引、电表起止码快照、读数本地存储与节能状态编码
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from backend.app.utils.energy_status import encode_status_runs, encode_status_series
+from backend.app.utils.his_data_index import HisDataIndex
+from backend.app.utils.meter_reading_store import MeterReadingStore
+from backend.app.utils.meter_readings import (
+    MeterBoundarySnapshot,
+    fetch_boundary_snapshot,
+    fetch_period_snapshots,
+    plan_boundary_windows,
+)
+
+
+def _series(object_code, data_code, *values):
+    return {
+        "tags": {"objectCode": object_code, "dataCode": data_code},
+        "values": [{"time": "2024-01-01 00:00:00.000", "value": v} for v in values],
+    }
+
+
+class TestHisDataIndex:
+    """测试 (objectCode, dataCode) 索引"""
+
+    def test_lookup_by_point(self) -> None:
+        index = HisDataIndex([_series("OBJ1", "A", 1.0), _series("OBJ2", "A", 2.0)])
+        assert len(index) == 2
+        assert index.values("OBJ2", "A")[0]["value"] == 2.0
+        assert index.get("OBJ1", "B") is None
+        assert index.values("OBJ1", "B") == []
+
+    def test_duplicate_point_keeps_first(self) -> None:
+        """重复点位与线性查找保持一致，取第一条"""
+        index = HisDataIndex([_series("OBJ1", "A", 1.0), _series("OBJ1", "A", 9.0)])
+        assert index.values("OBJ1", "A")[0]["value"] == 1.0
+
+    def test_missing_tags_ignored(self) -> None:
+        index = HisDataIndex([{"values": []}, _series("OBJ1", "A", 1.0)])
+        assert index.get("OBJ1", "A") is not None
+        assert not HisDataIndex(None)
+
+
+class TestMeterBoundarySnapshot:
+    """测试起止码快照"""
+
+    def test_readings(self) -> None:
+        snapshot = MeterBoundarySnapshot(
+            start_data=[_series("OBJ1", "A", 100.0), _series("OBJ1", "B")],
+            end_data=[_series("OBJ1", "A", 150.0), _series("OBJ1", "B", 5.0)],
+        )
+        assert snapshot.complete
+        assert snapshot.readings("A", "OBJ1") == (100.0, 150.0)
+        # 起码序列为空
+        assert snapshot.readings("B", "OBJ1") is None
+        # 点位不存在
+        assert snapshot.readings("C", "OBJ1") is None
+
+    def test_incomplete_snapshot(self) -> None:
+        snapshot = MeterBoundarySnapshot(end_data=[_series("OBJ1", "A", 1.0)])
+        assert not snapshot.complete
+        assert snapshot.readings("A", "OBJ1") is None
+
+
+class TestPeriodSnapshots:
+    """测试多区间共用起止码"""
+
+    def test_adjacent_periods_share_boundary_reading(self) -> None:
+        start, end = datetime(2024, 3, 1), datetime(2024, 3, 2)
+        year = timedelta(days=365)
+        periods = [(start, end), (start - year, end - year), (start - (end - start), start), (start, end)]
+
+        # 当前周期起点即环比止点：只读一次起码窗口；重复的区间不重复请求
+        plan = plan_boundary_windows(periods)
+        assert len(plan) == 5
+        assert (start, "start") in plan and (start, "end") not in plan
+
+        calls = []
+
+        async def fetch(api_url, payload):
+            calls.append(payload)
+            return [_series("OBJ1", "A", payload["endTime"])]
+
+        snapshots = asyncio.run(
+            fetch_period_snapshots(fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A"], periods)
+        )
+        assert len(calls) == 5
+        assert snapshots[0].start_data is snapshots[3].start_data
+        assert snapshots[0].start_data is snapshots[2].end_data
+
+        # 当前周期与单独查询的结果一致
+        single = asyncio.run(
+            fetch_boundary_snapshot(fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A"], start, end)
+        )
+        assert snapshots[0].readings("A", "OBJ1") == single.readings("A", "OBJ1")
+        # 环比周期止于当前周期的起码读数，两个周期首尾相接
+        mom_start, mom_end = snapshots[2].readings("A", "OBJ1")
+        assert mom_end == snapshots[0].readings("A", "OBJ1")[0]
+
+    def test_chained_hours_sum_to_the_day(self) -> None:
+        day = datetime(2024, 3, 1)
+        hours = [(day + timedelta(hours=h), day + timedelta(hours=h + 1)) for h in range(24)]
+        calls = []
+
+        async def fetch(api_url, payload):
+            calls.append(payload)
+            # 读数为窗口结束时刻（毫秒），即累计电量随时间线性增长
+            return [_series("OBJ1", "A", payload["endTime"])]
+
+        snapshots = asyncio.run(
+            fetch_period_snapshots(fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A"], hours)
+        )
+        assert len(calls) == 25
+        hourly = [end - start for start, end in (s.readings("A", "OBJ1") for s in snapshots)]
+        daily = asyncio.run(fetch_boundary_snapshot(
+            fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A"], day, day + timedelta(days=1)
+        )).readings("A", "OBJ1")
+        assert sum(hourly) == daily[1] - daily[0]
+
+        # 只补算其中一小时时，通过 start_boundaries 使用与整天汇总相同的边界读数
+        retried = asyncio.run(fetch_period_snapshots(
+            fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A"], [hours[5]],
+            start_boundaries=[hours[5][1]],
+        ))
+        start, end = retried[0].readings("A", "OBJ1")
+        assert end - start == hourly[5]
+
+
+class TestEnergyStatusEncoding:
+    """测试节能状态游程编码"""
+
+    @staticmethod
+    def _samples(*values):
+        return [
+            {"time": f"2024-01-01 00:{minute:02d}:00.000", "value": value}
+            for minute, value in enumerate(values)
+        ]
+
+    def test_runs_skip_empty_values(self) -> None:
+        runs = encode_status_runs(self._samples(1, 1, "", None, 0, 0, 1), "水系统")
+        assert [(r["开始时间"], r["结束时间"], r["节能状态"]) for r in runs] == [
+            ("2024-01-01 00:00:00", "2024-01-01 00:04:00", "节能"),
+            ("2024-01-01 00:04:00", "2024-01-01 00:06:00", "非节能"),
+            ("2024-01-01 00:06:00", "2024-01-01 00:06:00", "节能"),
+        ]
+        assert all(r["系统"] == "水系统" for r in runs)
+
+    def test_values_keep_original_types(self) -> None:
+        # 整列均为整数、或混入字符串时，比较语义与逐采样比较一致
+        assert len(encode_status_runs(self._samples(1, 1, 0, 0))) == 2
+        runs = encode_status_runs(self._samples(1, "1", None, "1"))
+        assert [r["节能状态"] for r in runs] == ["节能", "非节能"]
+
+    def test_multiple_series(self) -> None:
+        runs = encode_status_series(
+            [("水系统", self._samples(1, 1)), ("风系统", []), ("其他", self._samples(0))]
+        )
+        assert [(r["系统"], r["节能状态"]) for r in runs] == [("水系统", "节能"), ("其他", "非节能")]
+
+
+class TestMeterReadingStore:
+    """测试电表读数本地存储"""
+
+    def test_read_through_fetches_each_window_once(self, tmp_path) -> None:
+        store = MeterReadingStore(str(tmp_path / "readings.sqlite3"))
+        calls = []
+
+        backfilled = set()
+
+        async def fetch(api_url, payload):
+            calls.append(payload["dataCodes"])
+            value = 100.0 if payload["endTime"] - payload["startTime"] == 3 * 60000 else 150.0
+            # OBJ1/B 起初在站点没有数据，之后被补录
+            return [_series("OBJ1", code, value) for code in payload["dataCodes"]
+                    if code == "A" or code in backfilled]
+
+        async def run():
+            return await fetch_boundary_snapshot(
+                fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A", "B"],
+                datetime(2024, 1, 1), datetime(2024, 1, 2), store=store,
+            )
+
+        first = asyncio.run(run())
+        second = asyncio.run(run())
+
+        # 已入库的点位不再回源，缺失的点位每次只单独回源
+        assert calls == [["A", "B"], ["A", "B"], ["B"], ["B"]]
+        assert first.readings("A", "OBJ1") == second.readings("A", "OBJ1") == (100.0, 150.0)
+        assert second.readings("B", "OBJ1") is None
+
+        backfilled.add("B")
+        calls.clear()
+        third = asyncio.run(run())
+        fourth = asyncio.run(run())
+        assert third.readings("B", "OBJ1") == fourth.readings("B", "OBJ1") == (100.0, 150.0)
+        assert calls == [["B"], ["B"]]
+
+    def test_recent_windows_not_stored(self, tmp_path) -> None:
+        store = MeterReadingStore(str(tmp_path / "readings.sqlite3"))
+        now = datetime.now()
+        calls = []
+
+        async def fetch(api_url, payload):
+            calls.append(payload["startTime"])
+            return [_series("OBJ1", "A", 1.0)]
+
+        for _ in range(2):
+            asyncio.run(fetch_boundary_snapshot(
+                fetch, "http://10.0.0.1:9898", ["OBJ1"], ["A"],
+                now - timedelta(days=1), now, store=store,
+            ))
+
+        # 起码窗口已定型只请求一次，止码窗口临近当前时间每次都回源
+        assert len(calls) == 3
+
+    def test_failed_fetch_not_stored(self, tmp_path) -> None:
+        store = MeterReadingStore(str(tmp_path / "readings.sqlite3"))
+        end_ms = int(datetime(2024, 1, 1).timestamp() * 1000)
+        payload = {"objectCodes": ["OBJ1"], "dataCodes": ["A"], "startTime": end_ms - 600000, "endTime": end_ms}
+
+        async def failing(api_url, payload):
+            return None
+
+        assert asyncio.run(store.read_through(failing, "http://x:9898", payload, "end", end_ms)) is None
+        assert store.lookup("http://x:9898", "end", end_ms, ["OBJ1"], ["A"]) is None
@@ -0,0 +1,153 @@
+"""
+数据库连接池与线程池测试
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import db_config
+from backend.app.utils.db_executor import DatabaseExecutor
+from backend.app.utils.mysql_pool import HostConnectionPool, MySQLPoolManager, PoolTimeoutError
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.rollback_fails = False
+        self.pings = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise ConnectionError("gone away")
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise ConnectionError("lost connection")
+
+    def close(self):
+        self.closed = True
+
+
+class TestHostConnectionPool:
+    """测试借还、健康检查与回收"""
+
+    def test_reuses_connections(self) -> None:
+        created = []
+        pool = HostConnectionPool("db", lambda: created.append(_FakeConnection()) or created[-1])
+
+        for _ in range(3):
+            with pool.connection():
+                pass
+
+        stats = pool.stats()
+        assert len(created) == 1
+        assert (stats["created"], stats["reused"], stats["idle"], stats["in_use"]) == (1, 2, 1, 0)
+
+    def test_bounded_size_times_out(self) -> None:
+        pool = HostConnectionPool("db", _FakeConnection, max_size=1, acquire_timeout=0.05)
+        conn = pool.acquire()
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+
+        # 归还后等待者可以拿到连接
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        pool.acquire_timeout = 1.0
+        waiter.start()
+        pool.release(conn)
+        waiter.join()
+        assert acquired == [conn]
+        assert pool.stats()["timeouts"] == 1
+
+    def test_health_check_and_broken_connections(self) -> None:
+        pool = HostConnectionPool("db", _FakeConnection, ping_interval=0)
+        with pool.connection() as first:
+            pass
+        first.alive = False
+        with pool.connection() as second:
+            pass
+        assert second is not first and first.closed
+
+        second.rollback_fails = True
+        with pytest.raises(ValueError):
+            with pool.connection() as conn:
+                raise ValueError("bad sql")
+        assert conn is second and second.closed
+
+        stats = pool.stats()
+        assert (stats["health_check_failures"], stats["discarded"], stats["idle"]) == (1, 2, 0)
+
+    def test_idle_eviction(self) -> None:
+        pool = HostConnectionPool("db", _FakeConnection, idle_timeout=-1)
+        conn = pool.acquire()
+        pool.release(conn)
+        assert conn.closed
+        assert pool.stats()["evicted"] == 1
+
+
+def test_manager_keys_pools_by_host() -> None:
+    hosts = []
+    manager = MySQLPoolManager(lambda host: hosts.append(host) or _FakeConnection())
+    for host in ("10.0.0.1", "10.0.0.2", "10.0.0.1"):
+        with manager.connection(host):
+            pass
+
+    assert hosts == ["10.0.0.1", "10.0.0.2"]
+    assert sorted(s["host"] for s in manager.stats()) == ["10.0.0.1", "10.0.0.2"]
+    manager.close()
+    assert manager.stats() == []
+
+
+def test_periodic_eviction_closes_quiet_hosts(monkeypatch) -> None:
+    """定时回收关闭不再访问的主机上超时的空闲连接"""
+    manager = MySQLPoolManager(lambda host: _FakeConnection(), idle_timeout=0.01)
+    monkeypatch.setattr(db_config, "_connection_pools", manager)
+    with manager.connection("10.0.0.1") as conn:
+        pass
+
+    async def run():
+        task = asyncio.create_task(db_config.run_idle_eviction(0.02))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert conn.closed
+    assert db_config.get_pool_stats()[0]["evicted"] == 1
+
+
+def test_executor_limits_threads_per_host() -> None:
+    executor = DatabaseExecutor(max_workers=4, max_per_host=2)
+    active = {"slow": 0}
+    peak = {"slow": 0}
+    lock = threading.Lock()
+
+    def slow_query():
+        with lock:
+            active["slow"] += 1
+            peak["slow"] = max(peak["slow"], active["slow"])
+        time.sleep(0.2)
+        with lock:
+            active["slow"] -= 1
+        return "slow"
+
+    async def main():
+        slow = [asyncio.ensure_future(executor.run("slow", slow_query)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        # 慢主机占满自己的配额后，其他主机的查询仍可立即执行，事件循环也未被阻塞
+        started = time.monotonic()
+        fast = await executor.run("fast", lambda: "fast")
+        elapsed = time.monotonic() - started
+        return fast, elapsed, await asyncio.gather(*slow)
+
+    try:
+        fast, elapsed, slow_results = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert fast == "fast" and elapsed < 0.1
+    assert slow_results == ["slow"] * 4
+    assert peak["slow"] == 2
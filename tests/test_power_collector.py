@@ -0,0 +1,94 @@
+"""
+站点功率后台采集测试
+"""
+
+import asyncio
+import time
+
+from backend.app.services.station_power_collector import StationPowerCollector
+from backend.app.utils.power_ring_buffer import PowerRingBuffer
+
+
+class TestPowerRingBuffer:
+    """测试环形缓冲区"""
+
+    def test_overwrites_oldest_samples(self) -> None:
+        buffer = PowerRingBuffer(3)
+        for second in range(5):
+            buffer.append(float(second), second * 10.0)
+
+        assert len(buffer) == 3
+        assert buffer.latest() == (4.0, 40.0)
+        assert buffer.since(0.0) == [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0)]
+        assert buffer.since(3.5) == [(4.0, 40.0)]
+
+    def test_bucket_means(self) -> None:
+        buffer = PowerRingBuffer(10)
+        for timestamp, value in [(5, 1.0), (10, 3.0), (15, 10.0), (30, 7.0)]:
+            buffer.append(float(timestamp), value)
+
+        # 时间段 (0,10] (10,20] (20,30]
+        assert buffer.bucket_means(30.0, 10.0, 3) == [2.0, 10.0, 7.0]
+        assert buffer.bucket_means(40.0, 10.0, 2) == [7.0, None]
+
+
+class _FakeRealtimeService:
+    def __init__(self, powers):
+        self.powers = powers
+        self.active = 0
+        self.max_active = 0
+
+    async def get_station_realtime_power(self, station):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        power = self.powers[station["ip"]]
+        if isinstance(power, Exception):
+            raise power
+        return power
+
+
+class TestStationPowerCollector:
+    """测试采集与读取"""
+
+    def test_poll_once_records_successful_samples(self) -> None:
+        stations = [{"name": f"站{i}", "ip": f"10.0.0.{i}"} for i in range(6)]
+        powers = {s["ip"]: float(i) for i, s in enumerate(stations)}
+        powers["10.0.0.4"] = None
+        powers["10.0.0.5"] = RuntimeError("timeout")
+        realtime = _FakeRealtimeService(powers)
+        collector = StationPowerCollector(realtime, interval=60, max_concurrent=2)
+
+        assert asyncio.run(collector.poll_once(stations)) == 4
+        assert realtime.max_active == 2
+        assert collector.latest("10.0.0.3") == 3.0
+        assert collector.latest("10.0.0.4") is None
+        assert collector.latest("10.0.0.5") is None
+        # 采样超过 3 个周期视为过期
+        assert collector.latest("10.0.0.3", max_age=-1) is None
+
+        hourly = collector.hourly_means("10.0.0.3", 3, now=time.time() + 1)
+        assert hourly == [None, None, 3.0]
+        assert collector.hourly_means("10.0.0.9", 2) == [None, None]
+
+    def test_capacity_covers_retention(self) -> None:
+        collector = StationPowerCollector(
+            _FakeRealtimeService({}), interval=30, retention_hours=2
+        )
+        assert collector.capacity == 240
+
+    def test_disabled_unless_configured(self, monkeypatch) -> None:
+        from backend.app.core.config import get_config
+
+        collector = StationPowerCollector(_FakeRealtimeService({}))
+        assert collector.interval == 0
+
+        async def start():
+            collector.start()
+            return collector.running
+
+        assert asyncio.run(start()) is False
+
+        monkeypatch.setitem(get_config().get_cache_config(), "power_collector_interval", 30)
+        assert StationPowerCollector(_FakeRealtimeService({})).interval == 30
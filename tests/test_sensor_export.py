@@ -0,0 +1,154 @@
+"""
+传感器数据导出测试
+"""
+
+import asyncio
+from datetime import datetime
+
+from export_service import SensorDataExportService
+from models import StationExportResult
+from task_manager import TaskStatus, task_manager
+
+
+def _series(object_code, data_code, *values):
+    return {
+        "tags": {"objectCode": object_code, "dataCode": data_code},
+        "values": [
+            {"time": f"2024-01-01 0{hour}:00:00.000", "value": value}
+            for hour, value in enumerate(values)
+        ],
+    }
+
+
+class TestSensorCsvWriter:
+    """测试温湿度传感器CSV逐行输出"""
+
+    def test_rows_aligned_to_first_series(self, tmp_path) -> None:
+        service = SensorDataExportService()
+        point_name_list = [
+            [{"objectCode": "F1", "dataCode": "FRE"}, {"objectCode": "T1", "dataCode": "T01"}],
+            [{"objectCode": "D1", "dataCode": "D01"}],
+        ]
+        res_data = [
+            _series("F1", "FRE", 40.0, 45.5),
+            _series("T1", "T01", 21.234),
+            _series("D1", "D01", 25.0, 26.0),
+        ]
+        fan_names = [(0, "风机1")]
+
+        lines = list(service.iter_temperature_humidity_sensor_csv(res_data, point_name_list, fan_names))
+        assert lines == [
+            "时间,风机1频率,温度传感器T01,大系统温度传感器D01,\n",
+            "2024-01-01 00:00\t,40.00\t,21.23\t,25.00\t,\n",
+            "2024-01-01 01:00\t,45.50\t,0.00\t,26.00\t,\n",
+        ]
+
+        filename = tmp_path / "sensor.csv"
+        assert service.export_temperature_humidity_sensor_data_to_csv(
+            res_data, point_name_list, fan_names, str(filename)
+        )
+        assert filename.read_text(encoding="utf-8-sig") == "".join(lines)
+
+    def test_failed_export_leaves_no_file(self, tmp_path) -> None:
+        service = SensorDataExportService()
+
+        def broken_rows(*args):
+            yield "时间,\n"
+            raise ValueError("bad series")
+
+        service.iter_temperature_humidity_sensor_csv = broken_rows
+        filename = tmp_path / "sensor.csv"
+        assert not service.export_temperature_humidity_sensor_data_to_csv([], [], [], str(filename))
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestSensorExportConcurrency:
+    """测试传感器导出的站点并发与任务进度"""
+
+    def test_stations_run_concurrently_with_progress(self) -> None:
+        service = SensorDataExportService()
+        service.max_concurrent_stations = 2
+        service.line_configs = {
+            "MX": {f"站点{i}": {"ip": f"10.0.0.{i}", "station": f"站点{i}"} for i in range(5)}
+        }
+        state = {"running": 0, "peak": 0}
+
+        async def fake_export_single_station(ip, config, start_time, end_time):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.01)
+            state["running"] -= 1
+            return StationExportResult(
+                station_ip=ip, station_name=config["station"], success=ip != "站点3", message="ok"
+            )
+
+        service.export_single_station = fake_export_single_station
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+        task_id = task_manager.create_task("sensor", "MX", start, end)
+
+        result = asyncio.run(service.export_data_async("MX", start, end, task_id=task_id))
+
+        assert state["peak"] == 2
+        assert result.success
+        assert result.details["success_count"] == 4
+        assert result.details["fail_count"] == 1
+
+        task = task_manager.get_task(task_id)
+        assert task.status == TaskStatus.COMPLETED
+        assert task.progress.current == task.progress.total == 5
+        assert task.result_data["details"]["total"] == 5
+
+    def test_unknown_line_marks_task_failed(self) -> None:
+        service = SensorDataExportService()
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+        task_id = task_manager.create_task("sensor", "UNKNOWN", start, end)
+
+        result = asyncio.run(service.export_data_async("UNKNOWN", start, end, task_id=task_id))
+
+        assert not result.success
+        assert task_manager.get_task(task_id).status == TaskStatus.FAILED
+
+
+class TestSensorPointMetadataCache:
+    """测试站点点位配置缓存"""
+
+    def test_metadata_cached_per_station(self) -> None:
+        service = SensorDataExportService()
+        calls = []
+
+        def fake_load(station_ip):
+            calls.append(station_ip)
+            return ((station_ip, "fSmallFan1"),), (), ()
+
+        service._load_station_point_metadata = fake_load
+
+        service.query_station_point_metadata("10.0.0.1")
+        service.query_station_point_metadata("10.0.0.1")
+        service.query_station_point_metadata("10.0.0.2")
+        assert calls == ["10.0.0.1", "10.0.0.2"]
+
+        service.invalidate_point_metadata("10.0.0.1")
+        service.query_station_point_metadata("10.0.0.1")
+        assert calls == ["10.0.0.1", "10.0.0.2", "10.0.0.1"]
+
+        service.invalidate_point_metadata()
+        assert len(service.point_metadata_cache) == 0
+
+    def test_warm_up_selected_lines(self) -> None:
+        service = SensorDataExportService()
+        service.line_configs = {
+            "MA": {"站点1": {"ip": "10.0.1.1"}, "站点2": {"ip": "10.0.1.2"}},
+            "MB": {"站点3": {"ip": "10.0.2.1"}},
+        }
+
+        def fake_load(station_ip):
+            if station_ip == "10.0.1.2":
+                raise RuntimeError("unreachable")
+            return (), (), ()
+
+        service._load_station_point_metadata = fake_load
+
+        loaded, failed = asyncio.run(service.warm_up_point_metadata(["MA"]))
+        assert (loaded, failed) == (1, 1)
+        assert "10.0.1.1" in service.point_metadata_cache
+        assert "10.0.2.1" not in service.point_metadata_cache
@@ -0,0 +1,166 @@
+"""
+服务层缓存测试
+验证 service_method 的缓存命中、过期与统计
+"""
+
+import asyncio
+
+from backend.app.services import base
+from backend.app.services.base import CacheableService, service_method
+from backend.app.utils.ttl_cache import TTLCache
+
+
+class _CountingService(CacheableService):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    @service_method(cache_timeout=60)
+    async def load(self, station_ip=None):
+        self.calls += 1
+        return {"station": station_ip, "values": [1, 2, 3]}
+
+    @service_method(cache_timeout=60)
+    async def slow_load(self, station_ip=None, fail=False):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("站点超时")
+        return {"station": station_ip}
+
+
+class TestServiceCache:
+    """测试 CacheableService 的进程内缓存"""
+
+    def setup_method(self) -> None:
+        self.now = [1000.0]
+        base._service_cache = TTLCache(ttl=300, max_entries=2, clock=lambda: self.now[0])
+
+    def teardown_method(self) -> None:
+        base._service_cache = None
+
+    def test_hits_until_expired(self) -> None:
+        service = _CountingService()
+
+        first = asyncio.run(service.load("10.0.0.1"))
+        first["values"].append(4)  # 修改返回值不影响缓存
+        second = asyncio.run(service.load("10.0.0.1"))
+        assert service.calls == 1
+        assert second == {"station": "10.0.0.1", "values": [1, 2, 3]}
+
+        self.now[0] += 61
+        asyncio.run(service.load("10.0.0.1"))
+        assert service.calls == 2
+
+    def test_lru_eviction_and_stats(self) -> None:
+        service = _CountingService()
+        for ip in ("a", "b", "a", "c", "b"):
+            asyncio.run(service.load(ip))
+
+        # b 在写入 c 时被淘汰，再次访问需要重新加载
+        assert service.calls == 4
+        stats = service.get_cache_stats()
+        assert stats["entries"] == 2
+        assert stats["max_entries"] == 2
+        assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 4, 2)
+        assert stats["enabled"] is True
+
+    def test_delete_cache(self) -> None:
+        service = _CountingService()
+        asyncio.run(service.load("a"))
+        asyncio.run(service.delete_cache(service.get_cache_key("_CountingService.load", "a")))
+        asyncio.run(service.load("a"))
+        assert service.calls == 2
+
+
+class TestSingleFlight:
+    """测试并发相同请求的合并"""
+
+    def setup_method(self) -> None:
+        base._service_cache = TTLCache(ttl=300, max_entries=16)
+
+    def teardown_method(self) -> None:
+        base._service_cache = None
+
+    def test_concurrent_identical_calls_share_one_execution(self) -> None:
+        service = _CountingService()
+
+        async def run_test():
+            return await asyncio.gather(
+                *[service.slow_load("a") for _ in range(10)], service.slow_load("b")
+            )
+
+        results = asyncio.run(run_test())
+        assert service.calls == 2
+        assert results[:10] == [{"station": "a"}] * 10
+        assert results[0] is not results[1]
+        assert base._inflight_calls == {}
+
+    def test_failure_propagates_to_all_waiters_and_is_not_cached(self) -> None:
+        service = _CountingService()
+
+        async def run_test():
+            return await asyncio.gather(
+                *[service.slow_load("a", fail=True) for _ in range(3)], return_exceptions=True
+            )
+
+        results = asyncio.run(run_test())
+        assert service.calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        asyncio.run(run_test())
+        assert service.calls == 2
+
+
+class _StaleService(CacheableService):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.fail = False
+
+    @service_method(cache_timeout=60, stale_timeout=600)
+    async def overview(self, station_ip=None):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            return self.format_error_response("站点超时")
+        return self.format_response({"version": self.calls})
+
+
+class TestStaleWhileRevalidate:
+    """测试过期数据先返回、后台刷新"""
+
+    def setup_method(self) -> None:
+        self.now = [1000.0]
+        base._service_cache = TTLCache(ttl=300, max_entries=16, clock=lambda: self.now[0])
+
+    def teardown_method(self) -> None:
+        base._service_cache = None
+
+    def test_stale_entry_served_then_refreshed(self) -> None:
+        service = _StaleService()
+
+        async def run_test():
+            first = await service.overview("a")
+            self.now[0] += 90
+            stale = await service.overview("a")
+            # 等待后台刷新完成
+            await asyncio.gather(*base._inflight_calls.values())
+            fresh = await service.overview("a")
+            return first, stale, fresh
+
+        first, stale, fresh = asyncio.run(run_test())
+        assert first["cache_info"] == {"age_seconds": 0.0, "stale": False}
+        assert stale["data"] == {"version": 1}
+        assert stale["cache_info"] == {"age_seconds": 90.0, "stale": True}
+        assert fresh["data"] == {"version": 2}
+        assert fresh["cache_info"]["stale"] is False
+        assert service.calls == 2
+
+    def test_error_results_are_not_cached(self) -> None:
+        service = _StaleService()
+        service.fail = True
+        asyncio.run(service.overview("a"))
+        service.fail = False
+        result = asyncio.run(service.overview("a"))
+        assert result["success"] is True
+        assert service.calls == 2
@@ -0,0 +1,212 @@
+"""
+站点 HTTP 客户端测试
+验证连接池按站点复用，以及电耗导出的并发上限
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx
+
+from backend.app.services.realtime_energy_service import RealtimeEnergyService
+from backend.app.utils.chunked_fetch import ChunkCheckpointStore
+from backend.app.utils.station_client import StationHttpClient
+from export_service import ElectricityExportService
+from task_manager import TaskStatus, task_manager
+
+
+class TestStationHttpClient:
+    """测试共享站点客户端"""
+
+    def test_reuses_pool_per_host(self) -> None:
+        """同一站点的多次请求复用同一个连接池"""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(str(request.url))
+            return httpx.Response(200, json=[])
+
+        async def run_test():
+            client = StationHttpClient(transport=httpx.MockTransport(handler))
+            async with client:
+                await client.select_his_data("http://10.0.0.1:9898", [{"a": 1}])
+                await client.select_his_data("http://10.0.0.1:9898/", [{"a": 2}])
+                await client.select_his_data("http://10.0.0.2:9898", [{"a": 3}])
+                assert client.host_count == 2
+            assert client.host_count == 0
+
+        asyncio.run(run_test())
+        assert seen == [
+            "http://10.0.0.1:9898/data/selectHisData",
+            "http://10.0.0.1:9898/data/selectHisData",
+            "http://10.0.0.2:9898/data/selectHisData",
+        ]
+
+
+class TestElectricityExportConcurrency:
+    """测试电耗导出的站点并发控制"""
+
+    def test_station_concurrency_is_bounded(self) -> None:
+        """同时运行的站点导出协程数不超过 max_concurrent_stations"""
+        service = ElectricityExportService()
+        service.max_concurrent_stations = 2
+        state = {"running": 0, "peak": 0}
+
+        async def fake_export_single_ip(ip, config, start_time, end_time):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.01)
+            state["running"] -= 1
+            return True, None, f"{ip}.xlsx"
+
+        service.export_single_ip = fake_export_single_ip
+        config_map = {f"站点{i}": {"ip": f"10.0.0.{i}"} for i in range(6)}
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+
+        async def run_test():
+            results = []
+            coroutines = service._station_export_coroutines(config_map, start, end)
+            for future in asyncio.as_completed(coroutines):
+                results.append(await future)
+            return results
+
+        results = asyncio.run(run_test())
+        assert state["peak"] == 2
+        assert sorted(key for key, _ in results) == sorted(config_map)
+        assert all(outcome[0] is True for _, outcome in results)
+
+    def test_network_export_shares_budget_across_lines(self, tmp_path) -> None:
+        """全网导出跨线路共享并发预算，并按线路汇总结果"""
+        service = ElectricityExportService()
+        service.checkpoint_store = ChunkCheckpointStore(str(tmp_path))
+        service.network_max_concurrent_stations = 3
+        service.line_configs = {
+            "MA": {f"站点{i}": {"ip": f"10.0.1.{i}", "station": f"站点{i}"} for i in range(4)},
+            # 与MA同名的换乘站
+            "MB": {"站点0": {"ip": "10.0.2.0", "station": "站点0"}, "站点9": {"ip": "10.0.2.9", "station": "站点9"}},
+        }
+        state = {"running": 0, "peak": 0}
+
+        async def fake_export_single_ip(ip, config, start_time, end_time):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.01)
+            state["running"] -= 1
+            if ip == "10.0.2.9":
+                return False, "API超时，导出失败", None
+            return True, None, f"{ip}.xlsx"
+
+        service.export_single_ip = fake_export_single_ip
+        start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+        task_id = task_manager.create_task("electricity", "MA,MB", start, end)
+
+        asyncio.run(service._export_network_async(task_id, ["MA", "MB"], start, end))
+
+        task = task_manager.get_task(task_id)
+        assert state["peak"] == 3
+        assert task.status == TaskStatus.COMPLETED
+        assert task.progress.current == task.progress.total == 6
+        details = task.result_data["details"]
+        assert (details["success_count"], details["fail_count"]) == (5, 1)
+        assert details["lines"]["MA"]["success_count"] == 4
+        assert details["lines"]["MB"]["fail_count"] == 1
+        assert len(details["results"]) == 6
+        assert task.progress.details["lines"]["MB"]["completed"] == 2
+
+
+class TestRealtimePowerFanOut:
+    """测试实时功率查询走共享异步客户端"""
+
+    def test_line_fan_out_runs_concurrently(self) -> None:
+        """多个站点的实时功率请求同时进行，不受线程池大小限制"""
+        state = {"running": 0, "peak": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.02)
+            state["running"] -= 1
+            return httpx.Response(200, json={"data": [{"values": [{"value": 10.5}]}]})
+
+        service = RealtimeEnergyService()
+        stations = [{"name": f"站点{i}", "ip": f"10.0.3.{i}", "line": "M3"} for i in range(40)]
+        config = {"object_codes": ["OBJ"], "data_codes": ["P"]}
+
+        async def run_test():
+            async with StationHttpClient(transport=httpx.MockTransport(handler)) as client:
+                with patch.object(service, "_get_jieneng_config", return_value=config), patch(
+                    "backend.app.services.realtime_energy_service.get_station_client",
+                    return_value=client,
+                ):
+                    return await service.get_multiple_stations_power(stations)
+
+        power_map = asyncio.run(run_test())
+        assert state["peak"] == len(stations)
+        assert set(power_map.values()) == {10.5}
+
+    def test_device_powers_use_one_multi_code_query(self) -> None:
+        """站点全部设备合并为一次查询，不再限制设备数量"""
+        data_codes = [f"P{i}" for i in range(25)]
+        requests_seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests_seen.append(request)
+            # P3 无数据
+            data = [
+                {"tags": {"objectCode": "OBJ", "dataCode": code}, "values": [{"value": i}]}
+                for i, code in enumerate(data_codes)
+                if code != "P3"
+            ]
+            return httpx.Response(200, json={"data": data})
+
+        service = RealtimeEnergyService()
+        resolved = ("http://10.0.3.1:9898", ["OBJ"], data_codes, [{"p3": "冷机1"}])
+
+        async def run_test():
+            async with StationHttpClient(transport=httpx.MockTransport(handler)) as client:
+                with patch.object(service, "_resolve_station_config", return_value=resolved), patch(
+                    "backend.app.services.realtime_energy_service.get_station_client",
+                    return_value=client,
+                ):
+                    return await service.get_station_device_powers({"name": "站点1"})
+
+        devices = asyncio.run(run_test())
+        assert len(requests_seen) == 1
+        assert len(devices) == 25
+        assert devices[0]["device_name"] == "冷机1"
+        assert devices[24]["power"] == 24.0
+        assert (devices[3]["status"], devices[3]["power"]) == ("offline", 0.0)
+
+    def test_compare_reads_each_boundary_once(self) -> None:
+        """同比/环比对比：当前周期起点与环比止点共用一次读数，每个站点共 5 个窗口"""
+        from backend.app.services.energy_service import EnergyService
+
+        windows = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payload = json.loads(request.content)
+            windows.append((payload["startTime"], payload["endTime"]))
+            data = [{"tags": {"objectCode": "OBJ", "dataCode": "P"},
+                     "values": [{"value": payload["endTime"] / 3600000}]}]
+            return httpx.Response(200, json={"data": data})
+
+        service = EnergyService()
+        station = {"name": "站点1", "ip": "10.0.3.1", "line": "M3"}
+        config = {"object_codes": ["OBJ"], "data_codes": ["P"]}
+        start, end = datetime(2024, 3, 8), datetime(2024, 3, 15)
+
+        async def run_test():
+            async with StationHttpClient(transport=httpx.MockTransport(handler)) as client:
+                with patch.object(service, "_get_stations", return_value=[station]), patch.object(
+                    service.realtime_service, "_get_jieneng_config", return_value=config
+                ), patch(
+                    "backend.app.services.realtime_energy_service.get_station_client",
+                    return_value=client,
+                ):
+                    return await service.get_comparison_data(start, end)
+
+        result = asyncio.run(run_test())
+        assert len(windows) == len(set(windows)) == 5
+        assert result["data"]["current_kwh"] == 7 * 24 - 0.1
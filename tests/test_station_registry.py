@@ -0,0 +1,109 @@
+"""
+站点注册表测试
+"""
+
+import asyncio
+import copy
+import dataclasses
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from backend.app.config.electricity_config import ElectricityConfig
+from backend.app.config.station_registry import StationRegistry, get_station_registry
+from backend.app.utils.meter_readings import MeterBoundarySnapshot
+from export_service import ElectricityExportService
+
+LINE_CONFIGS = {
+    "M3": {
+        "振华路": {
+            "ip": "10.0.3.1",
+            "object_codes": ["S_D_ZJ"],
+            "data_codes": ["LS01_26", "LD/1_8"],
+            "data_list": [
+                {"p3": "冷机LS01电表", "p5": "137KW", "p6": "电控柜后方"},
+                {"p3": "冷冻水泵LD01电表", "p5": "30.5kw"},
+                {"p3": "照明配电", "p5": ""},
+            ],
+        },
+        "新华路": {"ip": "10.0.3.2", "data_list": []},
+    },
+    "8号线电耗数据配置": {
+        "苗岭路": {"ip": "10.0.8.1", "data_list": [{"name": "风机", "power": 15}]},
+    },
+}
+
+
+class TestStationRegistry:
+    """测试索引与预解析字段"""
+
+    def test_indexes(self) -> None:
+        registry = StationRegistry(LINE_CONFIGS)
+
+        assert registry.line_names == ("M3", "8号线电耗数据配置")
+        assert [s.name for s in registry.stations_in("M3")] == ["振华路", "新华路"]
+        assert [s.name for s in registry.by_line("M8")] == ["苗岭路"]
+        assert registry.stations_in("M99") == ()
+        assert registry.by_ip("10.0.8.1").line_name == "8号线电耗数据配置"
+        assert registry.by_name("M3", "新华路").ip == "10.0.3.2"
+        assert registry.by_name("M3", "苗岭路") is None
+
+    def test_parsed_devices(self) -> None:
+        station = StationRegistry(LINE_CONFIGS).by_ip("10.0.3.1")
+
+        assert [d.rated_power for d in station.devices] == [137.0, 30.5, 0.0]
+        assert [d.category for d in station.devices] == ["冷机", "水泵", "照明"]
+        assert [d.data_code for d in station.devices] == ["LS01_26", "LD/1_8", None]
+        assert station.rated_power_kw == 167.5
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            station.ip = "10.0.0.1"
+        with pytest.raises(TypeError):
+            station.config["ip"] = "10.0.0.1"
+
+    def test_data_list_is_a_frozen_copy(self) -> None:
+        """注册表中的设备列表只读，且不与原始 line_configs 共享字典"""
+        line_configs = copy.deepcopy(LINE_CONFIGS)
+        station = StationRegistry(line_configs).by_ip("10.0.3.1")
+
+        with pytest.raises(TypeError):
+            station.data_list[0]["p8"] = 1.0
+        line_configs["M3"]["振华路"]["data_list"][0]["p3"] = "已修改"
+        assert station.data_list[0]["p3"] == "冷机LS01电表"
+        assert station.config["object_codes"] == ("S_D_ZJ",)
+
+    def test_export_processing_leaves_config_untouched(self) -> None:
+        """导出计算 p8/p9/p10 时使用副本，不改写共享的站点配置"""
+        config = copy.deepcopy(LINE_CONFIGS["M3"]["振华路"])
+        # 导出按 data_codes 逐项对应设备，取有点位配置的设备
+        config["data_list"] = config["data_list"][:2]
+        original = copy.deepcopy(config)
+        tags = {"objectCode": "S_D_ZJ", "dataCode": "LS01_26"}
+        snapshot = MeterBoundarySnapshot(
+            start_data=[{"tags": tags, "values": [{"value": 100.0}]}],
+            end_data=[{"tags": tags, "values": [{"value": 112.5}]}],
+        )
+
+        async def fake_snapshot(*args, **kwargs):
+            return snapshot
+
+        service = ElectricityExportService()
+        with patch("export_service.fetch_boundary_snapshot", side_effect=fake_snapshot):
+            processed = asyncio.run(
+                service.process_data(
+                    "http://10.0.3.1:9898", config["data_list"], config["data_codes"],
+                    config["object_codes"], datetime(2024, 1, 1), datetime(2024, 1, 2),
+                )
+            )
+
+        assert [processed[0][key] for key in ("p8", "p9", "p10")] == [12.5, 100.0, 112.5]
+        assert config == original
+
+    def test_electricity_config_uses_shared_registry(self) -> None:
+        config = ElectricityConfig()
+        registry = get_station_registry()
+        assert config.registry is registry
+
+        station = registry.stations[0]
+        assert config.get_station_by_ip(station.ip)["line_name"] == station.line_name
+        assert len(config.get_station_devices(station.ip)) == len(station.devices)
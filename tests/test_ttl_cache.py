@@ -0,0 +1,105 @@
+"""
+进程内 TTL 缓存测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from backend.app.utils.ttl_cache import TTLCache, approximate_size
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """测试过期、淘汰与并发加载"""
+
+    def test_entries_expire(self) -> None:
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=30)
+        assert cache.get("a") == 1
+
+        clock.now = 10
+        assert cache.get("a") is None
+        assert "b" in cache
+        assert len(cache) == 1
+
+    def test_lru_eviction(self) -> None:
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_byte_limit_eviction(self) -> None:
+        cache = TTLCache(ttl=60, max_bytes=100, sizeof=len)
+        cache.set("a", "x" * 40)
+        cache.set("b", "x" * 40)
+        cache.get("a")
+        # 超出字节上限时淘汰最久未使用的 b
+        cache.set("c", "x" * 40)
+        assert "a" in cache and "b" not in cache and "c" in cache
+        assert cache.stats()["bytes"] == 80
+
+        # 单个值超过上限时不缓存
+        cache.set("big", "x" * 101)
+        assert "big" not in cache
+        cache.set("a", "x" * 10)
+        assert cache.stats()["bytes"] == 50
+        cache.clear()
+        assert cache.stats()["bytes"] == 0
+
+    def test_approximate_size_counts_nested_values(self) -> None:
+        rows = [{"value": str(i) * 1000} for i in range(10)]
+        assert approximate_size(rows) > 10 * 1000
+        assert approximate_size({"rows": rows}) > approximate_size(rows)
+        assert approximate_size(1) < approximate_size(rows[0])
+
+    def test_invalidate_and_clear(self) -> None:
+        cache = TTLCache(ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.invalidate("a")
+        assert not cache.invalidate("a")
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_get_or_load_runs_loader_once(self) -> None:
+        cache = TTLCache(ttl=60)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+
+        threads = [threading.Thread(target=cache.get_or_load, args=("k", loader)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert cache.get("k") == "value"
+
+    def test_loader_errors_not_cached(self) -> None:
+        cache = TTLCache(ttl=60)
+
+        def failing():
+            raise RuntimeError("db down")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("k", failing)
+        assert cache.get_or_load("k", lambda: 42) == 42